@@ -1,27 +1,11 @@
 import streamlit as st
-import streamlit.components.v1 as components
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import json
-import os
-from PIL import Image
-import requests
-import base64
-import io
-
-# Import custom modules
-from modules.disease_detection import DiseaseDetection
-from modules.crop_recommendation import CropRecommendation
-from modules.ai_chatbot import AIChatbot
-from modules.weather_analytics import WeatherAnalytics
-from modules.farm_management import FarmManagement
-from modules.market_prices import MarketPrices
-from modules.soil_health import SoilHealthAssessment
-from modules.government_schemes import GovernmentSchemes
-from modules.community_platform import CommunityPlatform
+
+# Page modules are imported on first navigation, see modules/page_loader.py
+from modules.instrumentation import page_timer, render_diagnostics_page
+from modules.dashboard_loader import CACHED, UNAVAILABLE, load_widgets
+from modules.page_loader import get_engine, render_page
+from modules.kpi_engine import get_kpi_engine
+from modules.refresh_scheduler import get_published, get_scheduler
 
 # Page configuration
 st.set_page_config(
@@ -388,6 +372,11 @@ load_css()
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'dashboard'
 
+# The diagnostics page is not in the navigation; open it with ?page=diagnostics
+if st.query_params.get("page") == "diagnostics":
+    st.session_state.current_page = 'diagnostics'
+    del st.query_params["page"]
+
 def render_dashboard():
     st.markdown("""
     <div class="page-header">
@@ -396,99 +385,35 @@ def render_dashboard():
     </div>
     """, unsafe_allow_html=True)
 
-    # Metrics Grid
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown("""
-        <div class="metric-card">
-            <div class="metric-title">Crop Health Index</div>
-            <div class="metric-value">85.2%</div>
-            <div class="metric-trend trend-up">
-                <span class="trend-icon">↗</span>
-                3.2% than last month
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    with col2:
-        st.markdown("""
-        <div class="metric-card">
-            <div class="metric-title">Soil Quality Score</div>
-            <div class="metric-value">78.5/100</div>
-            <div class="metric-trend trend-down">
-                <span class="trend-icon">↘</span>
-                1.4% than last month
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    with col3:
-        st.markdown("""
-        <div class="metric-card">
-            <div class="metric-title">Market Revenue</div>
-            <div class="metric-value">₹2,45,670</div>
-            <div class="metric-trend trend-up">
-                <span class="trend-icon">↗</span>
-                5.1% than last month
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+    # Metrics Grid, read from the latest precomputed KPI snapshot
+    kpis = get_kpi_engine().get_kpis()["kpis"]
+    metric_cards = [
+        ("Crop Health Index", kpis["crop_health"], lambda value: f"{value:.1f}%"),
+        ("Soil Quality Score", kpis["soil_quality"], lambda value: f"{value:.1f}/100"),
+        ("Market Revenue", kpis["market_revenue"], format_rupees)
+    ]
+    for column, (title, kpi, formatter) in zip(st.columns(3), metric_cards):
+        with column:
+            render_metric_card(title, kpi, formatter)
 
     st.markdown("<br>", unsafe_allow_html=True)
 
-    # Charts
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        with st.container():
-            st.markdown("""
-            <div class="chart-container">
-                <div class="chart-title">Crop Yield Progress</div>
-            </div>
-            """, unsafe_allow_html=True)
-            # Placeholder for chart
-            chart_data = pd.DataFrame(
-                np.random.randn(20, 3),
-                columns=['Rice', 'Wheat', 'Coconut'])
-            st.line_chart(chart_data)
-
-    with col2:
-        with st.container():
-            st.markdown("""
-            <div class="chart-container">
-                <div class="chart-title">Weather Forecast</div>
-            </div>
-            """, unsafe_allow_html=True)
-            weather_analytics = WeatherAnalytics()
-            forecast_data = weather_analytics.get_weather_forecast("Kozhikode")
-            daily_forecast = weather_analytics._process_forecast_data(forecast_data)
-            weather_analytics._render_weather_chart(daily_forecast)
-
-    with col3:
-        with st.container():
-            st.markdown("""
+    # Charts: titles and empty slots now, filled in as their data arrives
+    chart_titles = {
+        "yield": "Crop Yield Progress",
+        "weather": "Weather Forecast",
+        "market": "Market Prices"
+    }
+    chart_slots = {}
+    for column, (widget, title) in zip(st.columns(3), chart_titles.items()):
+        with column:
+            st.markdown(f"""
             <div class="chart-container">
-                <div class="chart-title">Market Prices</div>
+                <div class="chart-title">{title}</div>
             </div>
             """, unsafe_allow_html=True)
-            market_prices = MarketPrices()
-            trend_df = market_prices.get_price_trends("Rice")
-            fig = px.line(
-                trend_df,
-                x="date",
-                y="price_per_kg",
-                title="Rice Price Trend",
-                markers=True
-            )
-            fig.update_layout(
-                height=300,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='white',
-                title_font_color='white',
-                xaxis_title="Date",
-                yaxis_title="Price (₹/kg)"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            chart_slots[widget] = st.empty()
+            chart_slots[widget].caption("Loading...")
 
     st.markdown("<br>", unsafe_allow_html=True)
 
@@ -533,6 +458,111 @@ def render_dashboard():
             st.session_state.current_page = 'community'
             st.rerun()
 
+    render_dashboard_charts(chart_slots)
+
+def format_rupees(amount):
+    """
+    Format an amount in rupees with Indian digit grouping, e.g. ₹2,45,670
+    """
+    digits = f"{round(amount):d}"
+    head, tail = digits[:-3], digits[-3:]
+    groups = []
+    while head:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    return "₹" + ",".join(groups + [tail])
+
+def render_metric_card(title, kpi, formatter):
+    if kpi["value"] is None:
+        value, trend = "—", '<div class="metric-trend">No data yet</div>'
+    else:
+        value = formatter(kpi["value"])
+        change = kpi["change"]
+        if change is None:
+            trend = '<div class="metric-trend">No data for last month</div>'
+        else:
+            direction, icon = ("trend-up", "↗") if change >= 0 else ("trend-down", "↘")
+            trend = f"""
+            <div class="metric-trend {direction}">
+                <span class="trend-icon">{icon}</span>
+                {abs(change):.1f}% than last month
+            </div>"""
+    st.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-title">{title}</div>
+        <div class="metric-value">{value}</div>
+        {trend}
+    </div>
+    """, unsafe_allow_html=True)
+
+# Dashboard widget data, loaded concurrently in worker threads; no st.* calls here
+def load_yield_chart():
+    import pandas as pd
+
+    yields = pd.DataFrame(get_kpi_engine().get_kpis()["yields"], columns=["crop", "expected", "actual"])
+    yields = yields.groupby("crop")[["expected", "actual"]].sum(min_count=1)
+    return yields.rename(columns={"expected": "Expected", "actual": "Actual"})
+
+def load_weather_chart():
+    # fetch_weather raises on upstream errors, leaving them to load_widgets,
+    # where get_weather_forecast would report them with st.error
+    weather_analytics = get_engine("weather")
+    weather = get_published(("weather", "Kozhikode")) or weather_analytics.fetch_weather("Kozhikode")
+    return weather_analytics._process_forecast_data(weather["forecast"])
+
+def load_market_chart():
+    trends = get_published(("market", "trends"))
+    if trends:
+        return trends["Rice"]
+    return get_engine("market").get_price_trends("Rice")
+
+def render_market_chart(trend_df):
+    from modules.charts import cached_figure, fingerprint
+
+    fig = cached_figure(
+        "dashboard.rice_price_trend",
+        fingerprint(trend_df),
+        lambda: build_market_chart(trend_df)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+def build_market_chart(trend_df):
+    import plotly.express as px
+    from modules.charts import MAX_POINTS, apply_layout, downsample
+
+    fig = px.line(
+        downsample(trend_df, "date", "price_per_kg"),
+        x="date",
+        y="price_per_kg",
+        title="Rice Price Trend",
+        markers=len(trend_df) <= MAX_POINTS
+    )
+    return apply_layout(fig, height=300, xaxis_title="Date", yaxis_title="Price (₹/kg)")
+
+def render_dashboard_charts(chart_slots):
+    """
+    Load every chart's data at once and draw each chart as soon as its data
+    arrives, so the charts take as long as the slowest one
+    """
+    loaders = {
+        "yield": load_yield_chart,
+        "weather": load_weather_chart,
+        "market": load_market_chart
+    }
+    renderers = {
+        "yield": st.bar_chart,
+        "weather": lambda daily_forecast: get_engine("weather")._render_weather_chart(daily_forecast),
+        "market": render_market_chart
+    }
+    for widget, data, source in load_widgets(loaders):
+        with chart_slots[widget].container():
+            if source == UNAVAILABLE:
+                st.info("Data is unavailable right now. Please try again shortly.")
+                continue
+            renderers[widget](data)
+            if source == CACHED:
+                st.caption("Showing the last loaded data; live data is taking longer than usual.")
+
 # Sidebar navigation
 def render_sidebar():
     st.sidebar.markdown("""
@@ -577,41 +607,24 @@ def render_sidebar():
 
 # Main content area
 def render_main_content():
-    # Page routing
-    if st.session_state.current_page == 'dashboard':
-        render_dashboard()
-    elif st.session_state.current_page == 'disease':
-        disease_detector = DiseaseDetection()
-        disease_detector.render_disease_detection_ui()
-    elif st.session_state.current_page == 'crops':
-        crop_recommender = CropRecommendation()
-        crop_recommender.render_crop_recommendation_ui()
-    elif st.session_state.current_page == 'weather':
-        weather_analytics = WeatherAnalytics()
-        weather_analytics.render_weather_dashboard()
-    elif st.session_state.current_page == 'farm':
-        farm_manager = FarmManagement()
-        farm_manager.render_farm_dashboard()
-    elif st.session_state.current_page == 'market':
-        market_prices = MarketPrices()
-        market_prices.render_market_dashboard()
-    elif st.session_state.current_page == 'soil':
-        soil_health = SoilHealthAssessment()
-        soil_health.render_soil_health_ui()
-    elif st.session_state.current_page == 'schemes':
-        government_schemes = GovernmentSchemes()
-        government_schemes.render_schemes_dashboard()
-    elif st.session_state.current_page == 'community':
-        community_platform = CommunityPlatform()
-        community_platform.render_community_dashboard()
-    elif st.session_state.current_page == 'chatbot':
-        ai_chatbot = AIChatbot()
-        ai_chatbot.render_chatbot_ui()
+    page = st.session_state.current_page
+    with page_timer(page):
+        # Page routing
+        if page == 'dashboard':
+            render_dashboard()
+        elif page == 'diagnostics':
+            render_diagnostics_page()
+        else:
+            render_page(page)
 
 # Main app
 def main():
     render_sidebar()
     render_main_content()
+    # Weather, market and KPI data are refreshed in the background, once per
+    # process. Started after the page is drawn, so the page modules its jobs
+    # import do not delay the first page.
+    get_scheduler()
 
 if __name__ == "__main__":
     main()
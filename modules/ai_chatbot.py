@@ -1,12 +1,53 @@
 import streamlit as st
+import html
 import json
 import random
-from datetime import datetime
 import os
 
+from modules.conversation_store import Conversation, get_conversation_store
+from modules.instrumentation import timed
+from modules.intent_classifier import classify_intents
+from modules.knowledge_base import get_knowledge_base
+
+# Conversation summary label of each intent
+TOPIC_LABELS = {
+    "weather": "Weather",
+    "disease": "Disease",
+    "crop": "Crop Selection",
+    "soil": "Soil Health",
+    "market": "Market"
+}
+
+# Knowledge base sources that can answer each intent. Small talk, live
+# weather and market prices have no fact source and are never looked up.
+INTENT_SOURCES = {
+    "crop": {"Crop Recommendations", "Community Q&A"},
+    "soil": {"Soil Health", "Crop Recommendations", "Community Q&A"},
+    "disease": {"Disease Detection", "Community Q&A"},
+    "government": {"Government Schemes", "Community Q&A"},
+    "default": {"Community Q&A"}
+}
+
+# The indexed facts are in English only
+RETRIEVAL_LANGUAGES = {"en"}
+
+def get_session_conversation():
+    """
+    Get the conversation of the current Streamlit session
+
+    Sessions opened with a ?farmer_id= query parameter keep their history
+    on disk for that farmer; others keep it in memory only.
+    """
+    if "conversation" not in st.session_state:
+        farmer_id = st.query_params.get("farmer_id")
+        store = get_conversation_store() if farmer_id else None
+        st.session_state.conversation = Conversation(farmer_id, store)
+    return st.session_state.conversation
+
 class AIChatbot:
-    def __init__(self):
-        self.conversation_history = []
+    @timed()
+    def __init__(self, conversation=None):
+        self.conversation = conversation if conversation is not None else get_session_conversation()
         self.languages = {
             "English": "en",
             "Malayalam": "ml", 
@@ -96,48 +137,51 @@ class AIChatbot:
             }
         }
     
+    @timed()
     def get_response(self, user_input, language="en"):
         """
         Get AI response based on user input and language
         """
-        user_input_lower = user_input.lower()
-        
-        # Determine response category
-        if any(word in user_input_lower for word in ["hello", "hi", "namaste", "vanakkam", "namaskaram"]):
-            category = "greeting"
-        elif any(word in user_input_lower for word in ["weather", "rain", "temperature", "മഴ", "வானிலை", "मौसम"]):
-            category = "weather"
-        elif any(word in user_input_lower for word in ["disease", "sick", "problem", "രോഗം", "நோய்", "रोग"]):
-            category = "disease"
-        elif any(word in user_input_lower for word in ["crop", "plant", "cultivate", "വിള", "பயிர்", "फसल"]):
-            category = "crop"
-        elif any(word in user_input_lower for word in ["soil", "fertilizer", "nutrient", "മണ്ണ്", "மண்", "मिट्टी"]):
-            category = "soil"
-        elif any(word in user_input_lower for word in ["market", "price", "sell", "വില", "விலை", "बाजार"]):
-            category = "market"
-        elif any(word in user_input_lower for word in ["government", "scheme", "subsidy", "സർക്കാർ", "அரசு", "सरकार"]):
-            category = "government"
-        else:
-            category = "default"
-        
-        # Get response in selected language
-        if language in self.responses and category in self.responses[language]:
-            response = random.choice(self.responses[language][category])
-        else:
-            response = random.choice(self.responses["en"]["default"])
+        return self._respond(user_input, classify_intents([user_input])[0], language)
+    
+    def _respond(self, user_input, category, language):
+        """
+        Get the response to a message of a known intent
+        """
+        # Answer with a concrete fact from the app's own data when one matches
+        sources = INTENT_SOURCES.get(category)
+        if sources and language in RETRIEVAL_LANGUAGES:
+            results = get_knowledge_base().search(user_input, limit=1, sources=sources)
+            if results:
+                document, _ = results[0]
+                return f"Here's what I found in {document['source']}: {document['text']}"
         
-        return response
+        return self._canned_response(category, language)
+    
+    def _canned_response(self, category, language):
+        """
+        Get a predefined response for an intent in the selected language
+        """
+        responses = self.responses.get(language, self.responses["en"])
+        if category in responses:
+            return random.choice(responses[category])
+        return random.choice(responses["default"])
     
-    def add_to_history(self, user_input, bot_response, language="en"):
+    def add_to_history(self, user_input, bot_response, language="en", intent=None):
         """
         Add conversation to history
         """
-        self.conversation_history.append({
-            "timestamp": datetime.now().strftime("%H:%M"),
-            "user": user_input,
-            "bot": bot_response,
-            "language": language
-        })
+        self.conversation.add(user_input, bot_response, language, intent)
+    
+    def chat(self, user_input, language="en"):
+        """
+        Answer a message and record the exchange in the conversation
+        """
+        # Local classifier, with the keyword matcher for low-confidence input
+        intent = classify_intents([user_input])[0]
+        response = self._respond(user_input, intent, language)
+        self.add_to_history(user_input, response, language, intent)
+        return response
     
     def render_chatbot_ui(self):
         """
@@ -166,13 +210,14 @@ class AIChatbot:
         chat_container = st.container()
         
         with chat_container:
-            # Display conversation history
-            for message in self.conversation_history[-10:]:  # Show last 10 messages
+            # Display conversation history. Messages and forum answers quoted
+            # by the bot are user text, so they are escaped before rendering.
+            for message in self.conversation.recent(10):  # Show last 10 messages
                 if message["user"]:
                     st.markdown(f"""
                     <div style="display: flex; justify-content: flex-end; margin-bottom: 10px;">
                         <div style="background: #2C5555; color: white; padding: 10px 15px; border-radius: 18px 18px 5px 18px; max-width: 70%; word-wrap: break-word;">
-                            {message["user"]}
+                            {html.escape(message["user"])}
                         </div>
                     </div>
                     """, unsafe_allow_html=True)
@@ -181,7 +226,7 @@ class AIChatbot:
                     st.markdown(f"""
                     <div style="display: flex; justify-content: flex-start; margin-bottom: 10px;">
                         <div style="background: #1A3636; color: white; padding: 10px 15px; border-radius: 18px 18px 18px 5px; max-width: 70%; word-wrap: break-word;">
-                            {message["bot"]}
+                            {html.escape(message["bot"])}
                         </div>
                     </div>
                     """, unsafe_allow_html=True)
@@ -221,15 +266,12 @@ class AIChatbot:
         
         with col2:
             if st.button("Clear Chat", use_container_width=True):
-                self.conversation_history = []
+                self.conversation.clear()
                 st.rerun()
         
         # Handle user input
         if send_button and user_input:
-            language_code = self.languages[selected_language]
-            bot_response = self.get_response(user_input, language_code)
-            
-            self.add_to_history(user_input, bot_response, language_code)
+            self.chat(user_input, self.languages[selected_language])
             st.rerun()
     
     def _handle_quick_action(self, action, language):
@@ -237,34 +279,27 @@ class AIChatbot:
         Handle quick action button clicks
         """
         language_code = self.languages[language]
-        response = self.get_response(action, language_code)
+        # The button label is not a question, so it is never looked up
+        response = self._canned_response(action, language_code)
         
-        self.add_to_history(f"Quick action: {action}", response, language_code)
+        self.add_to_history(f"Quick action: {action}", response, language_code, action)
         st.rerun()
     
     def get_conversation_summary(self):
         """
         Get a summary of the conversation
         """
-        if not self.conversation_history:
+        if not self.conversation:
             return "No conversation yet."
         
-        topics = []
-        for message in self.conversation_history:
-            if message["user"]:
-                user_input = message["user"].lower()
-                if any(word in user_input for word in ["weather", "rain", "temperature"]):
-                    topics.append("Weather")
-                elif any(word in user_input for word in ["disease", "sick", "problem"]):
-                    topics.append("Disease")
-                elif any(word in user_input for word in ["crop", "plant", "cultivate"]):
-                    topics.append("Crop Selection")
-                elif any(word in user_input for word in ["soil", "fertilizer", "nutrient"]):
-                    topics.append("Soil Health")
-                elif any(word in user_input for word in ["market", "price", "sell"]):
-                    topics.append("Market")
+        # Counted as messages arrive, so this never rescans the history
+        topics = [
+            TOPIC_LABELS[intent]
+            for intent, _ in self.conversation.topic_counts.most_common()
+            if intent in TOPIC_LABELS
+        ]
         
         if topics:
-            return f"Discussed topics: {', '.join(set(topics))}"
+            return f"Discussed topics: {', '.join(topics)}"
         else:
             return "General farming discussion"
@@ -0,0 +1,417 @@
+"""
+Headless JSON API over the feature engines
+
+Usage:
+    python -m modules.api --host 0.0.0.0 --port 8600
+
+Serves the crop, soil, scheme, market price, weather and disease engines
+without Streamlit, for the SMS/IVR gateway and the mobile app:
+
+    POST /v1/crops/recommend      {"soil_ph": 6.0, "soil_type": "Loam", "rainfall": 2500,
+                                   "temperature": 27, "season": "Kharif", "location": "Thrissur"}
+    POST /v1/soil/assess          {"pH": 6.2, "Nitrogen": 22, "Potassium": 180, ...}
+    POST /v1/schemes/eligible     {"farmer_type": "Small", "landholding": 2.5, "state": "Kerala", ...}
+    GET  /v1/prices/trends?crop=Rice&market=Kollam&days=30
+    GET  /v1/prices/forecast?crop=Rice&days=7
+    GET  /v1/weather/summary?district=Thrissur
+    POST /v1/disease/detect       raw image bytes
+    GET  /health
+
+The three POST endpoints for crops, soil and schemes also accept a JSON
+list and answer with a list in the same order. The price endpoints accept
+days from 1 to 365.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+
+import anyio
+import numpy as np
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from modules.cache import cached
+from modules.page_loader import get_engine
+from modules.refresh_scheduler import get_scheduler
+
+# Requests handled at once; the rest are refused with 503 so that callers
+# retry rather than queue behind a slow backend
+MAX_CONCURRENT_REQUESTS = int(os.getenv("KERALA_API_MAX_CONCURRENCY", "256"))
+
+# Worker threads for engine calls and for calls out to weather and model APIs
+CPU_THREADS = os.cpu_count() or 4
+NETWORK_THREADS = 16
+
+# Micro-batching: concurrent requests to one endpoint are grouped for up to
+# MAX_BATCH_WAIT seconds into a single worker-thread call
+MAX_BATCH_SIZE = 64
+MAX_BATCH_WAIT = 0.002
+
+# Weather summaries are reused for this long per district
+WEATHER_TTL_SECONDS = 600
+
+# Price trends and forecasts are reused for this long, and never across a
+# change of the market engine's price data
+PRICE_TTL_SECONDS = 3600
+
+# Longest price history or forecast served, in days
+MAX_DAYS = 365
+
+CROP_FIELDS = ["soil_ph", "soil_type", "rainfall", "temperature", "season", "location"]
+PROFILE_FIELDS = ["farmer_type", "landholding", "state", "crop_type", "annual_income", "has_bank_account"]
+# Accepted values of the profile fields, as offered by the scheme matcher form
+PROFILE_CHOICES = {
+    "farmer_type": ["Small", "Marginal", "Medium", "Large", "Farmer Producer Organization", "All"],
+    "state": ["Kerala", "Tamil Nadu", "Karnataka", "Other"],
+    "crop_type": ["Food Crops", "Cash Crops", "Horticulture", "All"],
+    "annual_income": ["Below ₹1 lakh", "₹1-2 lakh", "₹2-5 lakh", "Above ₹5 lakh"],
+    "has_bank_account": ["Yes", "No"]
+}
+SCHEME_FIELDS = ["id", "name", "category", "description", "benefits", "deadline", "status"]
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class APIResponse(JSONResponse):
+    """
+    JSON response that also encodes numpy scalars and dates
+    """
+
+    def render(self, content):
+        return json.dumps(content, ensure_ascii=False, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+class MicroBatcher:
+    """
+    Group concurrent requests into one worker-thread call
+
+    The first request of a batch waits up to max_wait for others to join,
+    then the whole batch runs in one worker thread. This trades a couple of
+    milliseconds of latency for one thread hop per batch instead of one per
+    request under load. The handler takes one item; an exception fails only
+    the request whose item raised it.
+    """
+
+    def __init__(self, handler, limiter, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_BATCH_WAIT):
+        self.handler = handler
+        self.limiter = limiter
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending = []
+        self._flush_handle = None
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    def _handle_all(self, items):
+        results = []
+        for item in items:
+            try:
+                results.append((self.handler(item), None))
+            except Exception as error:
+                results.append((None, error))
+        return results
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = await anyio.to_thread.run_sync(self._handle_all, items, limiter=self.limiter)
+        except Exception as error:
+            results = [(None, error)] * len(batch)
+        for (_, future), (result, error) in zip(batch, results):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def _required(payload, fields):
+    if not isinstance(payload, dict):
+        raise BadRequest("expected a JSON object")
+    missing = [field for field in fields if field not in payload]
+    if missing:
+        raise BadRequest(f"missing fields: {', '.join(missing)}")
+    return payload
+
+
+def _number(value, name):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f"{name} must be a number")
+
+
+def recommend_crops(payload):
+    return get_engine("crops").calculate_crop_suitability(
+        _number(payload["soil_ph"], "soil_ph"), payload["soil_type"],
+        _number(payload["rainfall"], "rainfall"), _number(payload["temperature"], "temperature"),
+        payload["season"], payload["location"]
+    )
+
+
+def assess_soil(payload):
+    return get_engine("soil").assess_soil_health({
+        nutrient: _number(value, nutrient) if value is not None else None
+        for nutrient, value in payload.items()
+    })
+
+
+def _profile(payload):
+    profile = {field: payload[field] for field in PROFILE_FIELDS if field in payload}
+    for field, choices in PROFILE_CHOICES.items():
+        value = profile.get(field)
+        if value is not None and (not isinstance(value, str) or value not in choices):
+            raise BadRequest(f"{field} must be one of: {', '.join(choices)}")
+    if profile.get("landholding") is not None:
+        landholding = profile["landholding"]
+        if isinstance(landholding, bool) or _number(landholding, "landholding") < 0:
+            raise BadRequest("landholding must be a non-negative number")
+        profile["landholding"] = float(landholding)
+    return profile
+
+
+def match_schemes(payload):
+    profile = _profile(payload)
+    return [
+        dict(
+            {field: scheme[field] for field in SCHEME_FIELDS},
+            eligibility_score=scheme["eligibility_score"],
+            unmet_rule=scheme["unmet_rule"]
+        )
+        for scheme in get_engine("schemes").get_eligible_schemes(profile)
+    ]
+
+
+def _market(crop, market=None):
+    engine = get_engine("market")
+    if crop not in engine.crops:
+        raise BadRequest(f"unknown crop: {crop}")
+    if market is not None and market not in engine.kerala_markets:
+        raise BadRequest(f"unknown market: {market}")
+    return engine
+
+
+def day_count(value):
+    """
+    Parse a days query parameter, which must be from 1 to MAX_DAYS
+    """
+    days = int(value)
+    if not 1 <= days <= MAX_DAYS:
+        raise BadRequest(f"days must be between 1 and {MAX_DAYS}")
+    return days
+
+
+def _price_key(*args):
+    return (get_engine("market").data_version, *args)
+
+
+@cached("api.price_trends", key=_price_key, ttl=PRICE_TTL_SECONDS)
+def price_trends(crop, market, days):
+    trend_df = _market(crop, market).get_price_trends(crop, market, days)
+    return [
+        {"date": row.date.strftime("%Y-%m-%d"), "price_per_kg": round(float(row.price_per_kg), 2)}
+        for row in trend_df.itertuples()
+    ]
+
+
+@cached("api.price_forecast", key=_price_key, ttl=PRICE_TTL_SECONDS)
+def price_forecast(crop, days):
+    return _market(crop).predict_prices(crop, days)
+
+
+@cached("api.weather_summary", ttl=WEATHER_TTL_SECONDS)
+def weather_summary(district):
+    engine = get_engine("weather")
+    if district not in engine.kerala_districts:
+        raise BadRequest(f"unknown district: {district}")
+    current = engine.get_current_weather(district)
+    return {
+        "district": district,
+        "current": {
+            "temperature": current["main"]["temp"],
+            "humidity": current["main"]["humidity"],
+            "condition": current["weather"][0]["main"],
+            "wind_speed": current["wind"]["speed"]
+        },
+        "forecast": engine._process_forecast_data(engine.get_weather_forecast(district)),
+        "recommendations": engine.get_farming_recommendations(current)
+    }
+
+
+def detect_disease(image_bytes):
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    except UnidentifiedImageError:
+        raise BadRequest("body must be an image")
+    return get_engine("disease").detect_disease(image)
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Refuse requests beyond max_concurrent with 503 and Retry-After
+    """
+
+    def __init__(self, app, max_concurrent=MAX_CONCURRENT_REQUESTS):
+        self.app = app
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.in_flight >= self.max_concurrent:
+            response = APIResponse({"error": "server busy"}, status_code=503, headers={"Retry-After": "1"})
+            await response(scope, receive, send)
+            return
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+
+def create_app():
+    """
+    Build the API application
+    """
+    cpu_limiter = anyio.CapacityLimiter(CPU_THREADS)
+    network_limiter = anyio.CapacityLimiter(NETWORK_THREADS)
+    batchers = {
+        "crops": MicroBatcher(recommend_crops, cpu_limiter),
+        "soil": MicroBatcher(assess_soil, cpu_limiter),
+        "schemes": MicroBatcher(match_schemes, cpu_limiter)
+    }
+    required = {"crops": CROP_FIELDS, "soil": [], "schemes": []}
+
+    def batch_endpoint(name):
+        batcher = batchers[name]
+
+        async def endpoint(request):
+            try:
+                payload = await request.json()
+            except ValueError:
+                return APIResponse({"error": "body must be JSON"}, status_code=400)
+            try:
+                if isinstance(payload, list):
+                    items = [_required(item, required[name]) for item in payload]
+                    result = await anyio.to_thread.run_sync(
+                        lambda: [batcher.handler(item) for item in items], limiter=cpu_limiter
+                    )
+                else:
+                    result = await batcher.submit(_required(payload, required[name]))
+            except BadRequest as error:
+                return APIResponse({"error": str(error)}, status_code=400)
+            return APIResponse(result)
+        return endpoint
+
+    def query(request, name, default=None, convert=str):
+        value = request.query_params.get(name, default)
+        if value is None:
+            raise BadRequest(f"missing query parameter: {name}")
+        try:
+            return convert(value)
+        except ValueError:
+            raise BadRequest(f"invalid query parameter: {name}")
+
+    async def run_query(request, func, limiter):
+        try:
+            return APIResponse(await anyio.to_thread.run_sync(func, limiter=limiter))
+        except BadRequest as error:
+            return APIResponse({"error": str(error)}, status_code=400)
+
+    async def trends(request):
+        try:
+            args = (query(request, "crop"), request.query_params.get("market"), query(request, "days", 30, day_count))
+        except BadRequest as error:
+            return APIResponse({"error": str(error)}, status_code=400)
+        return await run_query(request, lambda: price_trends(*args), cpu_limiter)
+
+    async def forecast(request):
+        try:
+            args = (query(request, "crop"), query(request, "days", 7, day_count))
+        except BadRequest as error:
+            return APIResponse({"error": str(error)}, status_code=400)
+        return await run_query(request, lambda: price_forecast(*args), cpu_limiter)
+
+    async def weather(request):
+        try:
+            district = query(request, "district")
+        except BadRequest as error:
+            return APIResponse({"error": str(error)}, status_code=400)
+        return await run_query(request, lambda: weather_summary(district), network_limiter)
+
+    async def disease(request):
+        body = await request.body()
+        if not body:
+            return APIResponse({"error": "missing image body"}, status_code=400)
+        return await run_query(request, lambda: detect_disease(body), network_limiter)
+
+    async def health(request):
+        return APIResponse({"status": "ok"})
+
+    routes = [
+        Route("/health", health),
+        Route("/v1/crops/recommend", batch_endpoint("crops"), methods=["POST"]),
+        Route("/v1/soil/assess", batch_endpoint("soil"), methods=["POST"]),
+        Route("/v1/schemes/eligible", batch_endpoint("schemes"), methods=["POST"]),
+        Route("/v1/prices/trends", trends),
+        Route("/v1/prices/forecast", forecast),
+        Route("/v1/weather/summary", weather),
+        Route("/v1/disease/detect", disease, methods=["POST"])
+    ]
+    @asynccontextmanager
+    async def lifespan(app):
+        # Weather and market data are refreshed in the background from startup
+        get_scheduler()
+        yield
+
+    return Starlette(routes=routes, middleware=[Middleware(ConcurrencyLimitMiddleware)], lifespan=lifespan)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the feature engines as a JSON API")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind")
+    parser.add_argument("--port", type=int, default=8600, help="port to listen on")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
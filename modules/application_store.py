@@ -0,0 +1,292 @@
+from datetime import date, timedelta
+
+from modules.storage import SQLiteStore, get_store
+
+# Statuses an application moves through, in order; Approved and Rejected end it
+STATUS_FLOW = ["Submitted", "Under Review", "Documents Requested", "Approved"]
+FINAL_STATUSES = {"Approved", "Rejected"}
+
+# Days an application may stay in a status before it breaches its SLA
+DEFAULT_SLA_DAYS = {
+    "Submitted": 7,
+    "Under Review": 30,
+    "Documents Requested": 14
+}
+
+APPLICATION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    application_id TEXT PRIMARY KEY,
+    farmer_id TEXT NOT NULL,
+    scheme_id INTEGER,
+    scheme_name TEXT NOT NULL,
+    applied_date TEXT NOT NULL,
+    expected_decision TEXT,
+    current_status TEXT,
+    status_since TEXT,
+    last_updated TEXT,
+    event_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS application_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    application_id TEXT NOT NULL REFERENCES applications(application_id),
+    status TEXT NOT NULL,
+    event_date TEXT NOT NULL,
+    note TEXT,
+    officer TEXT
+);
+
+CREATE TABLE IF NOT EXISTS application_status_counts (
+    status TEXT PRIMARY KEY,
+    application_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS status_sla (
+    status TEXT PRIMARY KEY,
+    max_days INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_applications_farmer ON applications(farmer_id, applied_date);
+CREATE INDEX IF NOT EXISTS idx_applications_scheme ON applications(scheme_id, current_status);
+CREATE INDEX IF NOT EXISTS idx_applications_status_since ON applications(current_status, status_since);
+CREATE INDEX IF NOT EXISTS idx_applications_status_applied ON applications(current_status, applied_date);
+CREATE INDEX IF NOT EXISTS idx_application_events_application ON application_events(application_id, id);
+
+-- The event log is append-only
+CREATE TRIGGER IF NOT EXISTS trg_application_events_no_update BEFORE UPDATE ON application_events
+BEGIN
+    SELECT RAISE(ABORT, 'application_events is append-only');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_application_events_no_delete BEFORE DELETE ON application_events
+BEGIN
+    SELECT RAISE(ABORT, 'application_events is append-only');
+END;
+
+-- Each event moves its application's materialized current status and the
+-- per-status counts; nothing is recomputed from the full log
+CREATE TRIGGER IF NOT EXISTS trg_application_events_insert AFTER INSERT ON application_events
+BEGIN
+    UPDATE application_status_counts
+    SET application_count = application_count - 1
+    WHERE status = (SELECT current_status FROM applications WHERE application_id = NEW.application_id);
+
+    INSERT INTO application_status_counts (status, application_count) VALUES (NEW.status, 1)
+    ON CONFLICT(status) DO UPDATE SET application_count = application_count + 1;
+
+    UPDATE applications
+    SET current_status = NEW.status,
+        status_since = CASE WHEN current_status = NEW.status THEN status_since ELSE NEW.event_date END,
+        last_updated = NEW.event_date,
+        event_count = event_count + 1
+    WHERE application_id = NEW.application_id;
+END;
+
+-- Open applications that have stayed in their status longer than its SLA
+CREATE VIEW IF NOT EXISTS sla_breaches AS
+SELECT a.*, s.max_days,
+       CAST(julianday('now') - julianday(a.status_since) AS INTEGER) AS days_in_status
+FROM status_sla s
+JOIN applications a ON a.current_status = s.status
+WHERE a.status_since < date('now', '-' || s.max_days || ' days');
+"""
+
+INSERT_APPLICATION = """
+INSERT INTO applications (application_id, farmer_id, scheme_id, scheme_name, applied_date, expected_decision)
+VALUES (:application_id, :farmer_id, :scheme_id, :scheme_name, :applied_date, :expected_decision)
+"""
+INSERT_EVENT = """
+INSERT INTO application_events (application_id, status, event_date, note, officer)
+VALUES (:application_id, :status, :event_date, :note, :officer)
+"""
+UPSERT_SLA = """
+INSERT INTO status_sla (status, max_days) VALUES (?, ?)
+ON CONFLICT(status) DO UPDATE SET max_days = excluded.max_days
+"""
+
+SELECT_APPLICATION = "SELECT * FROM applications WHERE application_id = ?"
+SELECT_FARMER_APPLICATIONS = """
+SELECT * FROM applications WHERE farmer_id = ? ORDER BY applied_date DESC, application_id
+"""
+SELECT_EVENTS = "SELECT * FROM application_events WHERE application_id = ? ORDER BY id"
+SELECT_STATUS_COUNTS = """
+SELECT status, application_count FROM application_status_counts WHERE application_count > 0 ORDER BY status
+"""
+SELECT_SLA = "SELECT status, max_days FROM status_sla ORDER BY status"
+
+# Range scans on (current_status, status_since) / (current_status, applied_date)
+AGE_COLUMNS = {"status_since", "applied_date"}
+
+
+class ApplicationStore(SQLiteStore):
+    """
+    Scheme applications with an append-only status history
+
+    Status changes are only ever appended to application_events. Triggers
+    keep each application's current status and the per-status counts up to
+    date as events arrive, so status and age queries are index range scans
+    on the applications table rather than replays of the log.
+    """
+
+    schema = APPLICATION_SCHEMA + "".join(
+        f"\nINSERT OR IGNORE INTO status_sla (status, max_days) VALUES ('{status}', {days});"
+        for status, days in DEFAULT_SLA_DAYS.items()
+    )
+
+    def is_empty(self):
+        """
+        Check whether any application has been stored yet
+        """
+        return self.query_one("SELECT 1 AS found FROM applications LIMIT 1") is None
+
+    def create_application(self, application, status="Submitted", note=None):
+        """
+        Register an application and log its first status event
+        """
+        with self.transaction() as conn:
+            conn.execute(INSERT_APPLICATION, {
+                "scheme_id": None,
+                "expected_decision": None,
+                **application
+            })
+            conn.execute(INSERT_EVENT, {
+                "application_id": application["application_id"],
+                "status": status,
+                "event_date": application["applied_date"],
+                "note": note,
+                "officer": None
+            })
+        return self.get_application(application["application_id"])
+
+    def record_status(self, application_id, status, event_date=None, note=None, officer=None):
+        """
+        Append a status change to an application's history
+        """
+        with self.transaction() as conn:
+            conn.execute(INSERT_EVENT, {
+                "application_id": application_id,
+                "status": status,
+                "event_date": event_date or date.today().isoformat(),
+                "note": note,
+                "officer": officer
+            })
+
+    def record_statuses(self, events):
+        """
+        Append many status events in one transaction
+        """
+        with self.transaction() as conn:
+            conn.executemany(INSERT_EVENT, [
+                {"note": None, "officer": None, **event} for event in events
+            ])
+
+    def get_application(self, application_id):
+        """
+        Get an application with its current status
+        """
+        return self.query_one(SELECT_APPLICATION, (application_id,))
+
+    def get_farmer_applications(self, farmer_id):
+        """
+        Get a farmer's applications, most recent first
+        """
+        return self.query(SELECT_FARMER_APPLICATIONS, (farmer_id,))
+
+    def get_history(self, application_id):
+        """
+        Get the status events of an application, oldest first
+        """
+        return self.query(SELECT_EVENTS, (application_id,))
+
+    def find_applications(self, status=None, scheme_id=None, older_than_days=None,
+                          age_column="status_since", as_of=None, limit=100):
+        """
+        Find applications by current status, scheme and age
+
+        older_than_days counts from status_since (time in the current
+        status) or applied_date, e.g. status="Under Review",
+        older_than_days=30 finds reviews that have been open over a month.
+        """
+        if age_column not in AGE_COLUMNS:
+            raise ValueError(f"age_column must be one of {sorted(AGE_COLUMNS)}")
+
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("current_status = ?")
+            params.append(status)
+        if scheme_id is not None:
+            clauses.append("scheme_id = ?")
+            params.append(scheme_id)
+        if older_than_days is not None:
+            cutoff = (as_of or date.today()) - timedelta(days=older_than_days)
+            clauses.append(f"{age_column} < ?")
+            params.append(cutoff.isoformat())
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        return self.query(
+            f"SELECT * FROM applications {where} ORDER BY {age_column}, application_id LIMIT ?",
+            params
+        )
+
+    def get_sla_breaches(self, status=None, limit=100):
+        """
+        Get open applications that have outstayed the SLA of their status
+        """
+        if status is None:
+            return self.query("SELECT * FROM sla_breaches ORDER BY status_since LIMIT ?", (limit,))
+        return self.query(
+            "SELECT * FROM sla_breaches WHERE current_status = ? ORDER BY status_since LIMIT ?",
+            (status, limit)
+        )
+
+    def count_sla_breaches(self, status=None):
+        """
+        Count open applications that have outstayed the SLA of their status
+        """
+        if status is None:
+            return self.query_one("SELECT COUNT(*) AS breaches FROM sla_breaches")["breaches"]
+        return self.query_one(
+            "SELECT COUNT(*) AS breaches FROM sla_breaches WHERE current_status = ?", (status,)
+        )["breaches"]
+
+    def get_status_counts(self):
+        """
+        Get the number of applications currently in each status
+        """
+        return {row["status"]: row["application_count"] for row in self.query(SELECT_STATUS_COUNTS)}
+
+    def get_sla_days(self):
+        """
+        Get the SLA in days for each status
+        """
+        return {row["status"]: row["max_days"] for row in self.query(SELECT_SLA)}
+
+    def set_sla_days(self, status, max_days):
+        """
+        Change the SLA of a status
+        """
+        with self.transaction() as conn:
+            conn.execute(UPSERT_SLA, (status, max_days))
+
+
+def status_progress(history):
+    """
+    Get how far through the workflow an application is, from its history
+    """
+    if not history:
+        return 0.0
+    if history[-1]["status"] in FINAL_STATUSES:
+        return 1.0
+    reached = max(
+        (STATUS_FLOW.index(event["status"]) for event in history if event["status"] in STATUS_FLOW),
+        default=0
+    )
+    return (reached + 1) / len(STATUS_FLOW)
+
+
+def get_application_store(db_path=None):
+    """
+    Get the process-wide ApplicationStore for a database file
+    """
+    return get_store(ApplicationStore, db_path)
@@ -0,0 +1,353 @@
+"""
+Benchmarks for the hot path of every feature module
+
+Usage:
+    python -m modules.benchmarks --save benchmarks.json
+    python -m modules.benchmarks --compare benchmarks.json --sizes small,medium
+
+Each benchmark runs at every requested data size on data generated from a
+fixed seed, with all network access disabled and its databases in a
+temporary directory. --save stores the timings as a baseline; --compare
+fails with exit status 1 when any median is slower than its baseline by
+more than the tolerance. Baselines are only comparable on the machine that
+recorded them.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+import numpy as np
+
+# Multiplier applied to each benchmark's base data size
+SIZES = {
+    "small": 1,
+    "medium": 10,
+    "large": 100
+}
+
+DEFAULT_SEED = 42
+DEFAULT_ROUNDS = 5
+
+# Allowed slowdown of a median over its baseline before it counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Register a benchmark
+
+    The decorated function gets (scale, seed, directory) and returns the
+    callable to time, after doing all of its setup. Databases go in
+    directory.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@contextmanager
+def offline():
+    """
+    Fail any attempt to reach the network and hide API keys
+    """
+    def refuse(*args, **kwargs):
+        raise RuntimeError("network access is disabled in benchmarks")
+
+    with mock.patch.dict(os.environ, {"OPENWEATHER_API_KEY": "", "HUGGINGFACE_API_KEY": ""}), \
+            mock.patch("requests.sessions.Session.request", refuse), \
+            mock.patch("socket.create_connection", refuse):
+        yield
+
+
+def _price_data(crops, markets, days, rng):
+    """
+    Generate daily prices per crop and market, shaped like MarketPrices data
+    """
+    start = datetime(2024, 1, 1)
+    rows = []
+    for day in range(days):
+        current = (start + timedelta(days=day)).strftime("%Y-%m-%d")
+        for crop in crops:
+            for market in markets:
+                rows.append({
+                    "date": current,
+                    "crop": crop,
+                    "market": market,
+                    "price_per_kg": round(100 * (1 + rng.normal(0, 0.1)), 2),
+                    "volume_kg": int(rng.randint(100, 1000)),
+                    "quality": rng.choice(["A", "B", "C"])
+                })
+    return rows
+
+
+def _market_prices(scale, seed):
+    from modules.market_prices import MarketPrices
+
+    np.random.seed(seed)
+    market_prices = MarketPrices()
+    rng = np.random.RandomState(seed)
+    market_prices.price_data = _price_data(
+        market_prices.crops, market_prices.kerala_markets[:5], 30 * scale, rng
+    )
+    return market_prices
+
+
+@benchmark("market.get_price_trends")
+def bench_price_trends(scale, seed, directory):
+    market_prices = _market_prices(scale, seed)
+    return lambda: market_prices.get_price_trends("Black Pepper", days=30)
+
+
+@benchmark("market.predict_prices")
+def bench_predict_prices(scale, seed, directory):
+    market_prices = _market_prices(scale, seed)
+
+    def run():
+        np.random.seed(seed)
+        return market_prices.predict_prices("Cardamom", days_ahead=7)
+    return run
+
+
+@benchmark("market.get_market_insights")
+def bench_market_insights(scale, seed, directory):
+    market_prices = _market_prices(scale, seed)
+    return market_prices.get_market_insights
+
+
+@benchmark("crops.calculate_crop_suitability")
+def bench_crop_suitability(scale, seed, directory):
+    from modules.crop_recommendation import CropRecommendation
+
+    recommender = CropRecommendation()
+    rng = random.Random(seed)
+    soil_types = sorted({soil for crop in recommender.kerala_crops.values() for soil in crop["soil_types"]})
+    conditions = [
+        (
+            round(rng.uniform(4.5, 8.0), 1),
+            rng.choice(soil_types),
+            rng.randint(500, 4000),
+            rng.randint(15, 38),
+            rng.choice(["Kharif", "Rabi", "Summer"]),
+            "Thrissur"
+        )
+        for _ in range(100 * scale)
+    ]
+    return lambda: [recommender.calculate_crop_suitability(*condition) for condition in conditions]
+
+
+@benchmark("soil.assess_soil_health")
+def bench_soil_health(scale, seed, directory):
+    from modules.soil_health import SoilHealthAssessment
+
+    assessor = SoilHealthAssessment()
+    rng = random.Random(seed)
+    samples = [
+        {
+            nutrient: round(rng.uniform(ranges["acceptable"][0] * 0.8, ranges["acceptable"][1] * 1.2), 2)
+            for nutrient, ranges in assessor.nutrient_ranges.items()
+        }
+        for _ in range(100 * scale)
+    ]
+    return lambda: [assessor.assess_soil_health(sample) for sample in samples]
+
+
+@benchmark("weather.process_forecast_data")
+def bench_forecast(scale, seed, directory):
+    from modules.weather_analytics import WeatherAnalytics
+
+    analytics = WeatherAnalytics()
+    forecast = analytics._get_mock_forecast(days=7 * scale)
+    return lambda: analytics._process_forecast_data(forecast)
+
+
+@benchmark("farm.get_farm_summary")
+def bench_farm_summary(scale, seed, directory):
+    from modules.farm_management import FarmManagement
+    from modules.farm_store import FarmStore
+
+    rng = random.Random(seed)
+    store = FarmStore(os.path.join(directory, f"farms_{scale}_{seed}.db"))
+    farm_count = 10 * scale
+    start = date(2023, 1, 1)
+    farms, crops, expenses, harvests = [], [], [], []
+    for farm_id in range(1, farm_count + 1):
+        farms.append({
+            "id": farm_id, "name": f"Farm {farm_id}", "location": "Thrissur, Kerala",
+            "area_acres": round(rng.uniform(0.5, 20), 1), "soil_type": "Loam",
+            "established": "2020-01-01", "owner": f"Farmer {farm_id}"
+        })
+        for _ in range(5):
+            crop_id = len(crops) + 1
+            crops.append({
+                "id": crop_id, "farm_id": farm_id, "crop_name": rng.choice(["Rice", "Coconut", "Banana"]),
+                "variety": "Local", "planting_date": start.isoformat(), "expected_harvest": "2023-12-01",
+                "area_acres": 1.0, "status": rng.choice(["Growing", "Mature", "Harvested"]),
+                "yield_expected": 1000, "yield_actual": None
+            })
+            harvests.append({
+                "id": len(harvests) + 1, "farm_id": farm_id, "crop_id": crop_id,
+                "harvest_date": (start + timedelta(days=rng.randint(0, 700))).isoformat(),
+                "quantity": 500, "unit": "kg", "price_per_unit": 40, "total_value": 20000, "quality": "Good"
+            })
+        for _ in range(50):
+            expenses.append({
+                "id": len(expenses) + 1, "farm_id": farm_id,
+                "date": (start + timedelta(days=rng.randint(0, 700))).isoformat(),
+                "category": rng.choice(["Seeds", "Fertilizer", "Labor"]), "description": "Benchmark expense",
+                "amount": rng.randint(100, 10000), "quantity": 1, "unit": "lot"
+            })
+    store.seed({"farms": farms, "crops": crops, "expenses": expenses, "harvests": harvests})
+
+    manager = FarmManagement(store)
+    farm_ids = [rng.randint(1, farm_count) for _ in range(100)]
+    return lambda: [manager.get_farm_summary(farm_id) for farm_id in farm_ids]
+
+
+@benchmark("schemes.get_eligible_schemes")
+def bench_eligible_schemes(scale, seed, directory):
+    from modules.application_store import ApplicationStore
+    from modules.government_schemes import GovernmentSchemes
+
+    store = ApplicationStore(os.path.join(directory, "applications.db"))
+    schemes = GovernmentSchemes(application_store=store)
+    schemes.get_eligibility_index()
+    rng = random.Random(seed)
+    profiles = [
+        {
+            "farmer_type": rng.choice(["Small", "Marginal", "Medium", "Large", "Farmer Producer Organization"]),
+            "landholding": round(rng.uniform(0, 20), 1),
+            "state": rng.choice(["Kerala", "Tamil Nadu", "Karnataka", "Other"]),
+            "crop_type": rng.choice(["Food Crops", "Cash Crops", "Horticulture"]),
+            "annual_income": rng.choice(["Below ₹1 lakh", "₹1-2 lakh", "₹2-5 lakh", "Above ₹5 lakh"]),
+            "has_bank_account": rng.choice(["Yes", "No"])
+        }
+        for _ in range(100 * scale)
+    ]
+    return lambda: [schemes.get_eligible_schemes(profile) for profile in profiles]
+
+
+CHAT_MESSAGES = [
+    "hello", "will it rain tomorrow in Wayanad", "my coconut leaves are turning yellow",
+    "What pH does cardamom need?", "how do I treat spider mites", "price of pepper today",
+    "how to apply for pm kisan", "which fertilizer for banana", "നാളെ മഴ പെയ്യുമോ?",
+    "इलायची कहां बेचें?", "தென்னைக்கு எந்த உரம் போடலாம்?", "thank you"
+]
+
+
+@benchmark("chatbot.get_response")
+def bench_chatbot(scale, seed, directory):
+    from modules.ai_chatbot import AIChatbot
+    from modules.conversation_store import Conversation
+
+    chatbot = AIChatbot(Conversation())
+    rng = random.Random(seed)
+    messages = [rng.choice(CHAT_MESSAGES) for _ in range(10 * scale)]
+
+    def run():
+        random.seed(seed)
+        return [chatbot.get_response(message) for message in messages]
+    return run
+
+
+def run_benchmark(setup, scale, seed, rounds, directory):
+    """
+    Time a benchmark; returns its timings in milliseconds
+    """
+    run = setup(scale, seed, directory)
+    run()  # Warm-up: lazy indexes, model loading, caches
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 4),
+        "min_ms": round(min(timings), 4),
+        "max_ms": round(max(timings), 4),
+        "rounds": rounds
+    }
+
+
+def run_benchmarks(names=None, sizes=None, seed=DEFAULT_SEED, rounds=DEFAULT_ROUNDS, report=print):
+    """
+    Run benchmarks at each size; returns results keyed by "name[size]"
+    """
+    results = {}
+    # Repeated calls would otherwise time cache lookups, not the computation
+    with tempfile.TemporaryDirectory() as directory, offline(), mock.patch("modules.cache._enabled", False), \
+            mock.patch.dict(os.environ, {
+        # Read when the feature modules are first imported, which keeps the
+        # shared stores and the intent model out of the real data directory
+        "KERALA_FARMERS_DB": os.path.join(directory, "kerala_farmers.db"),
+        "KERALA_INTENT_MODEL": os.path.join(directory, "intent_model.npz")
+    }):
+        for name in names or BENCHMARKS:
+            for size in sizes or SIZES:
+                key = f"{name}[{size}]"
+                results[key] = run_benchmark(BENCHMARKS[name], SIZES[size], seed, rounds, directory)
+                report(f"{key:<50} {results[key]['median_ms']:>12.3f} ms")
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Get the benchmarks whose median regressed beyond the tolerance, as
+    (key, baseline median, median) tuples
+    """
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous and result["median_ms"] > previous["median_ms"] * (1 + tolerance):
+            regressions.append((key, previous["median_ms"], result["median_ms"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot path of every feature module")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"comma-separated sizes out of {', '.join(SIZES)}")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="seed for generated data")
+    parser.add_argument("--save", help="write the results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown over the baseline, as a fraction")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+    names = [name for name in BENCHMARKS if args.filter in name]
+
+    results = run_benchmarks(names, sizes, args.seed, args.rounds)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print(f"Wrote {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.tolerance)
+        for key, previous, current in regressions:
+            print(f"REGRESSION {key}: {previous:.3f} ms -> {current:.3f} ms ({current / previous - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
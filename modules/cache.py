@@ -0,0 +1,373 @@
+"""
+Caching shared by all modules
+
+A cache is a namespace with up to two tiers:
+
+- memory: an LRU of at most maxsize entries in this process, each entry
+  optionally expiring after ttl seconds
+- shared (optional): a SQLite table that every Streamlit worker process on
+  the machine reads and writes, so one process's computation serves all
+
+get_or_compute() looks in memory, then the shared tier, then computes.
+Concurrent misses on one key are coalesced: the first caller computes and
+the others wait for its result. A namespace can carry a version function
+(e.g. the farm store's data_version); entries written under another
+version count as misses, so a write invalidates everything derived from
+it without tracking keys. Each namespace counts hits, misses, stale and
+expired entries, evictions and coalesced waits for the diagnostics page.
+"""
+import functools
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from modules.storage import DEFAULT_DB_PATH, SQLiteStore, get_store
+
+# Shared tier database; kept apart from the farm data so it can be deleted
+CACHE_DB_PATH = os.getenv(
+    "KERALA_CACHE_DB", os.path.join(os.path.dirname(DEFAULT_DB_PATH), "cache.db")
+)
+
+DEFAULT_MAXSIZE = 1024
+
+_MISSING = object()
+
+_enabled = os.getenv("KERALA_CACHE", "1").lower() not in ("0", "false", "no")
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    version TEXT,
+    expires_at REAL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+SELECT_ENTRY = """
+SELECT version, expires_at, value FROM cache_entries WHERE namespace = ? AND key = ?
+"""
+UPSERT_ENTRY = """
+INSERT INTO cache_entries (namespace, key, version, expires_at, value) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(namespace, key) DO UPDATE SET
+    version = excluded.version,
+    expires_at = excluded.expires_at,
+    value = excluded.value
+"""
+DELETE_ENTRY = "DELETE FROM cache_entries WHERE namespace = ? AND key = ?"
+DELETE_NAMESPACE = "DELETE FROM cache_entries WHERE namespace = ?"
+DELETE_EXPIRED = "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at < ?"
+
+
+class SharedCacheStore(SQLiteStore):
+    """
+    Cache entries shared by the processes using one database file
+
+    Values are pickled; expiry uses wall-clock time so that every process
+    agrees on it.
+    """
+
+    schema = CACHE_SCHEMA
+
+    def get(self, namespace, key):
+        """
+        Get (version, expires_at, value) for a key, or None
+        """
+        row = self.connection().execute(SELECT_ENTRY, (namespace, key)).fetchone()
+        if row is None:
+            return None
+        return row["version"], row["expires_at"], pickle.loads(row["value"])
+
+    def set(self, namespace, key, version, expires_at, value):
+        with self.transaction() as conn:
+            conn.execute(UPSERT_ENTRY, (namespace, key, version, expires_at, pickle.dumps(value)))
+
+    def delete(self, namespace, key):
+        with self.transaction() as conn:
+            conn.execute(DELETE_ENTRY, (namespace, key))
+
+    def clear(self, namespace):
+        with self.transaction() as conn:
+            conn.execute(DELETE_NAMESPACE, (namespace,))
+
+    def prune(self):
+        """
+        Drop expired entries of every namespace
+        """
+        with self.transaction() as conn:
+            return conn.execute(DELETE_EXPIRED, (time.time(),)).rowcount
+
+
+def is_enabled():
+    """
+    Check whether the @cached functions use their caches
+    """
+    return _enabled
+
+
+def set_enabled(enabled):
+    """
+    Turn the @cached functions' caching on or off for the whole process,
+    e.g. off to benchmark the computations themselves
+    """
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def get_shared_store(db_path=None):
+    """
+    Get the process-wide SharedCacheStore for a database file
+    """
+    return get_store(SharedCacheStore, db_path or CACHE_DB_PATH)
+
+
+def freeze(value):
+    """
+    Turn a cache key made of dicts, lists and sets into a hashable value
+    with a stable repr
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(freeze(item) for item in value))
+    return value
+
+
+class CacheStats:
+    """
+    Counters of one namespace
+    """
+
+    __slots__ = ("hits", "shared_hits", "misses", "stale", "expired", "evictions", "coalesced")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Cache:
+    """
+    A namespace of cached values with a memory tier and an optional shared
+    tier
+
+    Cached values are shared by every session, so callers must not modify
+    them.
+    """
+
+    def __init__(self, namespace, maxsize=DEFAULT_MAXSIZE, ttl=None, shared=False, version=None):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared
+        self.version = version
+        self.stats = CacheStats()
+
+        # key -> (version, expires_at or None, value), least recently used first
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        return None if self.version is None else repr(self.version())
+
+    def _lookup(self, key, version):
+        # Called with self._lock held
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        entry_version, expires_at, value = entry
+        if expires_at is not None and expires_at < time.time():
+            del self._entries[key]
+            self.stats.expired += 1
+            return _MISSING
+        if entry_version != version:
+            del self._entries[key]
+            self.stats.stale += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key, version, expires_at, value):
+        # Called with self._lock held
+        self._entries[key] = (version, expires_at, value)
+        self._entries.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def _shared_get(self, key, version):
+        entry = get_shared_store().get(self.namespace, repr(key))
+        if entry is None:
+            return _MISSING, None
+        entry_version, expires_at, value = entry
+        if expires_at is not None and expires_at < time.time():
+            self.stats.expired += 1
+            return _MISSING, None
+        if entry_version != version:
+            self.stats.stale += 1
+            return _MISSING, None
+        return value, expires_at
+
+    def get(self, key, default=None):
+        """
+        Get a cached value from either tier, or default
+        """
+        key = freeze(key)
+        version = self._current_version()
+        with self._lock:
+            value = self._lookup(key, version)
+            if value is not _MISSING:
+                self.stats.hits += 1
+                return value
+        if self.shared:
+            value, expires_at = self._shared_get(key, version)
+            if value is not _MISSING:
+                with self._lock:
+                    self.stats.shared_hits += 1
+                    self._store(key, version, expires_at, value)
+                return value
+        with self._lock:
+            self.stats.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value in every tier under the current version
+        """
+        self._set(freeze(key), self._current_version(), value, ttl)
+
+    def _set(self, key, version, value, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._store(key, version, expires_at, value)
+        if self.shared:
+            get_shared_store().set(self.namespace, repr(key), version, expires_at, value)
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """
+        Get a cached value, or compute, store and return it
+
+        Only one caller computes a missing key at a time; concurrent callers
+        wait for that result. An exception from compute is raised to every
+        waiting caller and nothing is stored.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        key = freeze(key)
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+            else:
+                self.stats.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            # The version is read before computing, so a write during the
+            # computation leaves the entry stale rather than wrongly current
+            version = self._current_version()
+            value = compute()
+            self._set(key, version, value, ttl)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def invalidate(self, key=None):
+        """
+        Drop one key, or the whole namespace, from every tier
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(freeze(key), None)
+        if self.shared:
+            store = get_shared_store()
+            if key is None:
+                store.clear(self.namespace)
+            else:
+                store.delete(self.namespace, repr(freeze(key)))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace, **options):
+    """
+    Get the process-wide cache for a namespace, creating it with the given
+    options on first use
+    """
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = _caches[namespace] = Cache(namespace, **options)
+        return cache
+
+
+def cached(namespace, key=None, ttl=None, **options):
+    """
+    Decorator caching a function's results in a namespace
+
+    The key defaults to all arguments; pass key, a function of the same
+    arguments, to leave some out (e.g. self) or add an instance's own
+    version. Cached results are shared, so callers must not modify them.
+    """
+    cache = get_cache(namespace, ttl=ttl, **options)
+
+    def decorate(func):
+        make_key = key or (lambda *args, **kwargs: (args, kwargs))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            return cache.get_or_compute(make_key(*args, **kwargs), lambda: func(*args, **kwargs))
+        wrapper.cache = cache
+        return wrapper
+    return decorate
+
+
+def cache_stats():
+    """
+    Get one row of counters per namespace, busiest first
+    """
+    with _caches_lock:
+        caches = list(_caches.values())
+    rows = []
+    for cache in caches:
+        stats = cache.stats.as_dict()
+        lookups = stats["hits"] + stats["shared_hits"] + stats["misses"]
+        rows.append(dict(
+            namespace=cache.namespace,
+            entries=len(cache),
+            shared=cache.shared,
+            hit_rate=(stats["hits"] + stats["shared_hits"]) / lookups if lookups else None,
+            **stats
+        ))
+    rows.sort(key=lambda row: -(row["hits"] + row["shared_hits"] + row["misses"]))
+    return rows
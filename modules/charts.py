@@ -0,0 +1,161 @@
+"""
+Shared chart building: one layout template, downsampling of long series
+and a cache of built figures
+
+Building a Plotly figure (px.line validates every trace property) costs
+tens of milliseconds, and a series with tens of thousands of points is
+megabytes of JSON in the browser. Pages build their figures through
+cached_figure(), keyed by a version of the data and the chart parameters,
+and reduce long series with downsample() before plotting.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from modules.cache import get_cache
+from modules.instrumentation import timer
+
+# Longest series sent to the browser per trace
+MAX_POINTS = int(os.getenv("KERALA_CHART_MAX_POINTS", "1000"))
+
+# Figures kept per process
+FIGURE_CACHE_SIZE = 128
+
+TEMPLATE_NAME = "kerala"
+
+# Transparent background and white text on the dark app theme
+pio.templates[TEMPLATE_NAME] = go.layout.Template(layout={
+    "plot_bgcolor": "rgba(0,0,0,0)",
+    "paper_bgcolor": "rgba(0,0,0,0)",
+    "font": {"color": "white"},
+    "title": {"font": {"color": "white"}}
+})
+
+
+def apply_layout(fig, **layout):
+    """
+    Apply the shared template, on top of the default one, and any
+    chart-specific layout
+    """
+    fig.update_layout(template=f"{pio.templates.default}+{TEMPLATE_NAME}", **layout)
+    return fig
+
+
+def lttb(x, y, threshold):
+    """
+    Get the indices of the points kept by Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept; every bucket in between
+    keeps the point forming the largest triangle with the previously kept
+    point and the average of the next bucket, which preserves the visual
+    shape of the line.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    kept = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs(
+            (x[kept] - next_x) * (y[start:end] - y[kept])
+            - (x[kept] - x[start:end]) * (next_y - y[kept])
+        )
+        kept = start + int(np.argmax(areas))
+        selected[bucket + 1] = kept
+    return selected
+
+
+def min_max(y, threshold):
+    """
+    Get the indices of each bucket's minimum and maximum, in order
+
+    Cheaper than LTTB and keeps every spike, at the cost of a busier line.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, threshold // 2 + 1).astype(int)
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            bucket = y[start:end]
+            selected.extend(sorted({start + int(np.argmin(bucket)), start + int(np.argmax(bucket))}))
+    return np.asarray(selected, dtype=np.int64)
+
+
+def downsample(df, x, y, max_points=MAX_POINTS, method="lttb", by=None):
+    """
+    Reduce a frame sorted by x to at most max_points rows per trace
+
+    y is one column or a list of columns, each plotted as its own trace; by
+    is a column splitting the frame into traces, as px's color argument.
+    Frames already short enough are returned unchanged.
+    """
+    if by is not None:
+        parts = [downsample(part, x, y, max_points, method) for _, part in df.groupby(by, sort=False)]
+        return pd.concat(parts) if parts else df
+    columns = [y] if isinstance(y, str) else list(y)
+    if len(df) <= max_points:
+        return df
+
+    # Dates are compared as nanoseconds
+    x_values = df[x].to_numpy()
+    if np.issubdtype(x_values.dtype, np.datetime64):
+        x_values = x_values.astype("datetime64[ns]").astype(np.int64)
+
+    # Several traces share the budget; the union of their points is kept
+    threshold = max(max_points // len(columns), 3)
+    keep = set()
+    for column in columns:
+        if method == "lttb":
+            keep.update(lttb(x_values, df[column].to_numpy(), threshold).tolist())
+        elif method == "minmax":
+            keep.update(min_max(df[column].to_numpy(), threshold).tolist())
+        else:
+            raise ValueError(f"Unknown downsampling method: {method}")
+    return df.iloc[sorted(keep)]
+
+
+def fingerprint(data):
+    """
+    Get a version for data without one of its own, from its content
+
+    Accepts a DataFrame or a list of records.
+    """
+    if not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame(data)
+    return int(pd.util.hash_pandas_object(data, index=False).sum())
+
+
+# Built figures, least recently used first out; listed with the other caches
+# on the diagnostics page
+_figures = get_cache("figures", maxsize=FIGURE_CACHE_SIZE)
+
+
+def cached_figure(name, version, build, **params):
+    """
+    Get the figure named name for a version of its data and the given
+    parameters, calling build() only when it is not cached
+
+    build may return None when there is nothing to plot; that is cached too.
+    """
+    key = (name, version, tuple(sorted(params.items())))
+
+    def timed_build():
+        with timer(f"chart.{name}"):
+            return build()
+
+    return _figures.get_or_compute(key, timed_build)
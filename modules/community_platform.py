@@ -2,20 +2,102 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import json
+import threading
+
+from modules.community_store import get_community_store
+from modules.duplicate_detection import DuplicateDetector
+from modules.expert_routing import get_expert_router
+from modules.forum_index import ForumQueryIndex
+from modules.forum_search import ForumSearch
+from modules.instrumentation import timed
+
+FORUM_PAGE_SIZE = 10
+
+
+class ForumViews:
+    """
+    In-memory forum indexes kept in step with the community store
+
+    One instance is shared by every session in the process. sync() pulls only
+    the rows written since the last version it saw, so posts and votes from
+    other sessions or workers show up without rebuilding the indexes.
+    
+    Sessions hold lock while they read the indexes, so that a sync from
+    another session never changes them mid-read. The reads are CPU bound and
+    run one at a time under the GIL anyway, so a plain lock costs them
+    nothing over a reader-writer lock.
+    """
+
+    @timed()
+    def __init__(self, store):
+        self.store = store
+        self.version = 0
+        self.lock = threading.RLock()
+        self.search_index = ForumSearch()
+        self.query_index = ForumQueryIndex()
+        self.duplicate_detector = DuplicateDetector()
+
+    @timed()
+    def sync(self):
+        """
+        Apply every question and answer written since the last sync
+        """
+        if self.store.get_version() == self.version:
+            return
+        with self.lock:
+            questions, answers, version = self.store.get_changes(self.version)
+            for question in questions:
+                if question["id"] in self.query_index.questions:
+                    # Votes, answer counts and status only move the sort keys
+                    self.query_index.add_question(question)
+                else:
+                    self.search_index.add_question(question)
+                    self.query_index.add_question(question)
+                    self.duplicate_detector.add_question(question)
+            for answer in answers:
+                if self.query_index.set_answer(answer):
+                    self.search_index.add_answer(answer)
+            self.version = version
+
+
+_forum_views = {}
+_forum_views_lock = threading.Lock()
+
+
+def get_forum_views(store):
+    """
+    Get the process-wide, up to date forum indexes for a store
+    """
+    with _forum_views_lock:
+        views = _forum_views.get(store.db_path)
+        if views is None:
+            views = ForumViews(store)
+            _forum_views[store.db_path] = views
+    views.sync()
+    return views
+
 
 class CommunityPlatform:
-    def __init__(self):
-        self.questions = []
-        self.answers = []
-        self.experts = []
+    @timed()
+    def __init__(self, store=None):
+        self.store = store or get_community_store()
         self.load_sample_data()
+        self.views = get_forum_views(self.store)
+        self.search_index = self.views.search_index
+        self.query_index = self.views.query_index
+        self.duplicate_detector = self.views.duplicate_detector
+        self.router = get_expert_router(self.store)
+        self.experts = self.router.experts
     
     def load_sample_data(self):
         """
         Load sample community data
         """
+        if not self.store.is_empty():
+            return
+        
         # Sample questions
-        self.questions = [
+        questions = [
             {
                 "id": 1,
                 "title": "How to control coconut mite infestation?",
@@ -67,10 +149,11 @@ class CommunityPlatform:
         ]
         
         # Sample answers
-        self.answers = [
+        answers = [
             {
                 "id": 1,
                 "question_id": 1,
+                "expert_id": 1,
                 "author": "Dr. Sreekumar (Agricultural Expert)",
                 "date": "2024-01-21",
                 "content": "Coconut mite infestation can be controlled using neem oil spray (2ml per liter) or acaricides like dicofol. Apply twice at 15-day intervals. Also, ensure proper drainage and avoid waterlogging.",
@@ -89,6 +172,7 @@ class CommunityPlatform:
             {
                 "id": 3,
                 "question_id": 2,
+                "expert_id": 2,
                 "author": "Dr. Rajan (Horticulture Expert)",
                 "date": "2024-01-19",
                 "content": "Best time to plant black pepper is during monsoon (June-July) or post-monsoon (September-October). Ensure proper support system and well-drained soil.",
@@ -98,7 +182,7 @@ class CommunityPlatform:
         ]
         
         # Sample experts
-        self.experts = [
+        experts = [
             {
                 "id": 1,
                 "name": "Dr. Sreekumar",
@@ -127,20 +211,25 @@ class CommunityPlatform:
                 "verified": True
             }
         ]
+        
+        self.store.seed(questions, answers, experts)
     
     def get_questions_by_category(self, category=None):
         """
         Get questions filtered by category
         """
+        with self.views.lock:
+            questions = list(self.query_index.questions.values())
         if category and category != "All Categories":
-            return [q for q in self.questions if q["category"] == category]
-        return self.questions
+            return [q for q in questions if q["category"] == category]
+        return questions
     
     def get_question_answers(self, question_id):
         """
         Get answers for a specific question
         """
-        return [a for a in self.answers if a["question_id"] == question_id]
+        with self.views.lock:
+            return list(self.query_index.get_answers(question_id))
     
     def render_community_dashboard(self):
         """
@@ -167,6 +256,7 @@ class CommunityPlatform:
         with tab4:
             self._render_success_stories()
     
+    @timed()
     def _render_qa_forum(self):
         """
         Render Q&A forum
@@ -185,28 +275,64 @@ class CommunityPlatform:
         with col2:
             sort_by = st.selectbox(
                 "Sort by",
-                ["Most Recent", "Most Popular", "Most Answers", "Unsolved"]
+                ["Best Match", "Most Recent", "Most Popular", "Most Answers", "Unsolved"]
             )
         
         with col3:
             search_query = st.text_input("Search questions...")
         
-        # Get filtered questions
-        questions = self.get_questions_by_category(category_filter)
+        with self.views.lock:
+            tags = self.search_index.get_tags()
+        tag_filter = st.multiselect("Filter by Tags", tags)
         
-        # Apply search filter
-        if search_query:
-            questions = [q for q in questions if search_query.lower() in q["title"].lower() or search_query.lower() in q["description"].lower()]
+        # Start from the first page whenever the filters change
+        filters = (category_filter, sort_by, search_query, tuple(tag_filter))
+        if st.session_state.get("forum_filters") != filters:
+            st.session_state.forum_filters = filters
+            st.session_state.forum_cursors = [None]
+        cursor = st.session_state.forum_cursors[-1]
         
-        # Sort questions
-        if sort_by == "Most Recent":
-            questions.sort(key=lambda x: x["date"], reverse=True)
-        elif sort_by == "Most Popular":
-            questions.sort(key=lambda x: x["votes"], reverse=True)
-        elif sort_by == "Most Answers":
-            questions.sort(key=lambda x: x["answers_count"], reverse=True)
-        elif sort_by == "Unsolved":
-            questions = [q for q in questions if not q["solved"]]
+        # Only the visible page of questions is fetched and rendered
+        if search_query.strip():
+            # Ranked full-text search over titles, descriptions, tags and answers
+            with self.views.lock:
+                ranked, facets = self.search_index.search(search_query, category_filter, tag_filter, limit=100)
+                questions = [self.query_index.questions[question_id] for question_id, _ in ranked]
+            
+            if facets["categories"]:
+                st.caption("Matches by category: " + ", ".join(
+                    f"{category} ({count})" for category, count in facets["categories"].most_common()
+                ))
+            
+            # Re-order the matches without touching the shared question list
+            if sort_by == "Most Recent":
+                questions = sorted(questions, key=lambda x: x["date"], reverse=True)
+            elif sort_by == "Most Popular":
+                questions = sorted(questions, key=lambda x: x["votes"], reverse=True)
+            elif sort_by == "Most Answers":
+                questions = sorted(questions, key=lambda x: x["answers_count"], reverse=True)
+            elif sort_by == "Unsolved":
+                questions = [q for q in questions if not q["solved"]]
+            
+            offset = cursor or 0
+            next_cursor = offset + FORUM_PAGE_SIZE if offset + FORUM_PAGE_SIZE < len(questions) else None
+            questions = questions[offset:offset + FORUM_PAGE_SIZE]
+        else:
+            with self.views.lock:
+                allowed = self.search_index.filter_ids(tags=tag_filter) if tag_filter else None
+                questions, next_cursor = self.query_index.get_page(
+                    "Most Recent" if sort_by == "Best Match" else sort_by,
+                    category_filter,
+                    cursor,
+                    FORUM_PAGE_SIZE,
+                    allowed
+                )
+        
+        if not questions:
+            st.info("No questions found. Try a different search or filter.")
+        
+        # One queue lookup serves the expert suggestions for the whole page
+        open_counts = self.store.get_open_queue_counts()
         
         # Display questions
         for question in questions:
@@ -231,6 +357,13 @@ class CommunityPlatform:
                     else:
                         st.warning("❓ Unsolved")
                 
+                if not question['solved']:
+                    suggested = self.router.route(question, open_counts=open_counts)
+                    if suggested:
+                        st.caption("Suggested experts: " + ", ".join(
+                            f"{expert['name']} ({expert['specialization']})" for expert, _, _ in suggested
+                        ))
+                
                 # Show answers preview
                 answers = self.get_question_answers(question['id'])
                 if answers:
@@ -248,12 +381,36 @@ class CommunityPlatform:
                 
                 with col2:
                     if st.button(f"Vote Up", key=f"vote_{question['id']}"):
+                        self.vote_question(question['id'])
                         st.success("Vote recorded!")
                 
                 with col3:
                     if st.button(f"Share", key=f"share_{question['id']}"):
                         st.info("Question shared!")
     
+        # Pagination
+        col1, col2, col3 = st.columns([1, 2, 1])
+        
+        with col1:
+            if len(st.session_state.forum_cursors) > 1 and st.button("← Previous", key="forum_prev"):
+                st.session_state.forum_cursors.pop()
+                st.rerun()
+        
+        with col2:
+            st.caption(f"Page {len(st.session_state.forum_cursors)}")
+        
+        with col3:
+            if next_cursor is not None and st.button("Next →", key="forum_next"):
+                st.session_state.forum_cursors.append(next_cursor)
+                st.rerun()
+    
+    def vote_question(self, question_id):
+        """
+        Record an up-vote and move the question in the popularity order
+        """
+        self.store.vote_question(question_id, date=datetime.now().strftime("%Y-%m-%d"))
+        self.views.sync()
+    
     def _render_ask_question(self):
         """
         Render ask question form
@@ -288,26 +445,44 @@ class CommunityPlatform:
             with col4:
                 contact = st.text_input("Contact (Optional)", placeholder="Email or phone")
             
+            post_anyway = st.checkbox("Post even if similar questions exist")
+            
             submitted = st.form_submit_button("Post Question", type="primary")
             
             if submitted:
                 if title and description and author_name:
-                    # Add question to list
-                    new_question = {
-                        "id": len(self.questions) + 1,
+                    # Point to existing threads before adding a near-duplicate
+                    with self.views.lock:
+                        similar = [
+                            (self.query_index.questions[question_id], similarity)
+                            for question_id, similarity in self.duplicate_detector.find_similar(
+                                {"title": title, "description": description}
+                            )
+                        ]
+                    if similar and not post_anyway:
+                        st.warning("Similar questions have already been asked. Check them before posting:")
+                        for question, similarity in similar:
+                            status = "✅ Solved" if question["solved"] else f"{question['answers_count']} answers"
+                            st.markdown(f"• **{question['title']}** ({similarity:.0%} similar, {status})")
+                        st.info("Tick 'Post even if similar questions exist' to post your question anyway.")
+                        return
+                    
+                    # The store allocates the id, so concurrent posts never collide
+                    new_question = self.store.add_question({
                         "title": title,
                         "description": description,
                         "author": author_name,
                         "date": datetime.now().strftime("%Y-%m-%d"),
                         "category": category,
-                        "tags": [tag.strip() for tag in tags.split(",") if tag.strip()],
-                        "votes": 0,
-                        "answers_count": 0,
-                        "solved": False
-                    }
-                    
-                    self.questions.append(new_question)
+                        "tags": [tag.strip() for tag in tags.split(",") if tag.strip()]
+                    })
+                    self.views.sync()
+                    routed = self.router.assign(new_question, date=new_question["date"])
                     st.success("Question posted successfully! Our community will help you find answers.")
+                    if routed:
+                        st.info("Sent to " + ", ".join(
+                            f"{expert['name']} ({expert['specialization']})" for expert, _, _ in routed
+                        ) + " for an expert answer.")
                 else:
                     st.error("Please fill in all required fields.")
     
@@ -317,6 +492,8 @@ class CommunityPlatform:
         """
         st.markdown("### 👨‍🔬 Agricultural Experts")
         
+        open_counts = self.store.get_open_queue_counts()
+        
         # Expert cards
         for expert in self.experts:
             with st.expander(f"{expert['name']} - {expert['specialization']}", expanded=True):
@@ -326,6 +503,7 @@ class CommunityPlatform:
                     st.markdown(f"**Specialization:** {expert['specialization']}")
                     st.markdown(f"**Experience:** {expert['experience']}")
                     st.markdown(f"**Answers Provided:** {expert['answers_count']}")
+                    st.markdown(f"**Open Questions:** {open_counts.get(expert['id'], 0)}")
                 
                 with col2:
                     st.metric("Rating", f"{expert['rating']}/5")
@@ -0,0 +1,335 @@
+import json
+
+from modules.storage import SQLiteStore, get_store
+
+COMMUNITY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    description TEXT,
+    author TEXT,
+    date TEXT NOT NULL,
+    category TEXT,
+    tags TEXT NOT NULL DEFAULT '[]',
+    votes INTEGER NOT NULL DEFAULT 0,
+    answers_count INTEGER NOT NULL DEFAULT 0,
+    solved INTEGER NOT NULL DEFAULT 0,
+    updated_seq INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_id INTEGER NOT NULL REFERENCES questions(id),
+    expert_id INTEGER REFERENCES experts(id),
+    author TEXT,
+    date TEXT NOT NULL,
+    content TEXT NOT NULL,
+    votes INTEGER NOT NULL DEFAULT 0,
+    is_expert INTEGER NOT NULL DEFAULT 0,
+    updated_seq INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS experts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    specialization TEXT,
+    experience TEXT,
+    rating REAL,
+    answers_count INTEGER NOT NULL DEFAULT 0,
+    verified INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS votes (
+    target_type TEXT NOT NULL,
+    target_id INTEGER NOT NULL,
+    voter TEXT NOT NULL,
+    date TEXT,
+    PRIMARY KEY (target_type, target_id, voter)
+);
+
+CREATE TABLE IF NOT EXISTS expert_queue (
+    question_id INTEGER NOT NULL REFERENCES questions(id),
+    expert_id INTEGER NOT NULL REFERENCES experts(id),
+    assigned_date TEXT,
+    answered INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (question_id, expert_id)
+);
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('community_version', 0);
+
+CREATE INDEX IF NOT EXISTS idx_questions_category_date ON questions(category, date);
+CREATE INDEX IF NOT EXISTS idx_questions_date ON questions(date);
+CREATE INDEX IF NOT EXISTS idx_questions_votes ON questions(votes);
+CREATE INDEX IF NOT EXISTS idx_questions_updated ON questions(updated_seq);
+CREATE INDEX IF NOT EXISTS idx_answers_question ON answers(question_id);
+CREATE INDEX IF NOT EXISTS idx_answers_updated ON answers(updated_seq);
+CREATE INDEX IF NOT EXISTS idx_answers_expert ON answers(expert_id);
+CREATE INDEX IF NOT EXISTS idx_expert_queue_open ON expert_queue(expert_id, answered);
+"""
+
+BUMP_VERSION = """
+UPDATE store_meta SET value = value + 1 WHERE key = 'community_version'
+RETURNING value
+"""
+SELECT_VERSION = "SELECT value FROM store_meta WHERE key = 'community_version'"
+
+INSERT_QUESTION = """
+INSERT INTO questions (id, title, description, author, date, category, tags,
+                       votes, answers_count, solved, updated_seq)
+VALUES (:id, :title, :description, :author, :date, :category, :tags,
+        :votes, :answers_count, :solved, :updated_seq)
+"""
+
+INSERT_ANSWER = """
+INSERT INTO answers (id, question_id, expert_id, author, date, content, votes, is_expert, updated_seq)
+VALUES (:id, :question_id, :expert_id, :author, :date, :content, :votes, :is_expert, :updated_seq)
+"""
+
+INSERT_EXPERT = """
+INSERT INTO experts (id, name, specialization, experience, rating, answers_count, verified)
+VALUES (:id, :name, :specialization, :experience, :rating, :answers_count, :verified)
+"""
+
+# Counters are only ever changed with relative updates, which SQLite applies
+# atomically under the write lock, so concurrent voters never lose a vote
+BUMP_ANSWER_COUNT = """
+UPDATE questions SET answers_count = answers_count + 1, updated_seq = ? WHERE id = ?
+"""
+BUMP_EXPERT_ANSWERS = "UPDATE experts SET answers_count = answers_count + 1 WHERE id = ?"
+BUMP_QUESTION_VOTES = "UPDATE questions SET votes = votes + 1, updated_seq = ? WHERE id = ?"
+BUMP_ANSWER_VOTES = "UPDATE answers SET votes = votes + 1, updated_seq = ? WHERE id = ?"
+INSERT_VOTE = "INSERT OR IGNORE INTO votes (target_type, target_id, voter, date) VALUES (?, ?, ?, ?)"
+ASSIGN_QUESTION = """
+INSERT OR IGNORE INTO expert_queue (question_id, expert_id, assigned_date) VALUES (?, ?, ?)
+"""
+CLOSE_QUEUE_ENTRY = "UPDATE expert_queue SET answered = 1 WHERE question_id = ? AND expert_id = ?"
+MARK_SOLVED = "UPDATE questions SET solved = ?, updated_seq = ? WHERE id = ?"
+
+SELECT_CHANGED_QUESTIONS = "SELECT * FROM questions WHERE updated_seq > ? ORDER BY id"
+SELECT_CHANGED_ANSWERS = "SELECT * FROM answers WHERE updated_seq > ? ORDER BY id"
+SELECT_QUESTION = "SELECT * FROM questions WHERE id = ?"
+SELECT_ANSWERS = "SELECT * FROM answers WHERE question_id = ? ORDER BY votes DESC, id"
+SELECT_EXPERTS = "SELECT * FROM experts ORDER BY id"
+SELECT_OPEN_QUEUE_COUNTS = """
+SELECT expert_id, COUNT(*) AS open_count
+FROM expert_queue
+WHERE answered = 0
+GROUP BY expert_id
+"""
+SELECT_EXPERT_HISTORY = """
+SELECT a.id AS answer_id, a.expert_id, q.title, q.description, q.category, q.tags
+FROM answers a
+JOIN questions q ON q.id = a.question_id
+WHERE a.expert_id IS NOT NULL AND a.id > ?
+ORDER BY a.id
+"""
+
+
+def _question_from_row(row):
+    question = dict(row)
+    question["tags"] = json.loads(question["tags"])
+    question["solved"] = bool(question["solved"])
+    return question
+
+
+def _answer_from_row(row):
+    answer = dict(row)
+    answer["is_expert"] = bool(answer["is_expert"])
+    return answer
+
+
+class CommunityStore(SQLiteStore):
+    """
+    Durable storage for forum questions, answers, votes and experts
+
+    Every write bumps a version counter and stamps the rows it touched with
+    it, so processes holding in-memory indexes can pull just the rows that
+    changed since the version they last saw.
+    """
+
+    schema = COMMUNITY_SCHEMA
+
+    def _bump_version(self, conn):
+        return conn.execute(BUMP_VERSION).fetchone()[0]
+
+    def get_version(self):
+        """
+        Get the version of the latest community write
+        """
+        return self.connection().execute(SELECT_VERSION).fetchone()[0]
+
+    def is_empty(self):
+        """
+        Check whether any question has been stored yet
+        """
+        return self.query_one("SELECT 1 AS found FROM questions LIMIT 1") is None
+
+    def seed(self, questions, answers, experts):
+        """
+        Insert sample records only if the store has no questions yet
+        """
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM questions LIMIT 1").fetchone():
+                return False
+            version = self._bump_version(conn)
+            conn.executemany(INSERT_EXPERT, [
+                dict(expert, verified=int(expert.get("verified", False))) for expert in experts
+            ])
+            conn.executemany(INSERT_QUESTION, [
+                dict(question, tags=json.dumps(question.get("tags", [])),
+                     solved=int(question.get("solved", False)), updated_seq=version)
+                for question in questions
+            ])
+            conn.executemany(INSERT_ANSWER, [
+                {"expert_id": None, **answer, "is_expert": int(answer.get("is_expert", False)),
+                 "updated_seq": version}
+                for answer in answers
+            ])
+        return True
+
+    def add_question(self, question):
+        """
+        Insert a question and return it with its allocated id
+        """
+        with self.transaction() as conn:
+            version = self._bump_version(conn)
+            cursor = conn.execute(INSERT_QUESTION, {
+                "id": None,
+                "title": question["title"],
+                "description": question.get("description", ""),
+                "author": question.get("author"),
+                "date": question["date"],
+                "category": question.get("category"),
+                "tags": json.dumps(question.get("tags", [])),
+                "votes": 0,
+                "answers_count": 0,
+                "solved": 0,
+                "updated_seq": version
+            })
+            question_id = cursor.lastrowid
+        return self.get_question(question_id)
+
+    def add_answer(self, answer):
+        """
+        Insert an answer and bump the question's and expert's answer counts
+        """
+        with self.transaction() as conn:
+            version = self._bump_version(conn)
+            cursor = conn.execute(INSERT_ANSWER, {
+                "id": None,
+                "question_id": answer["question_id"],
+                "expert_id": answer.get("expert_id"),
+                "author": answer.get("author"),
+                "date": answer["date"],
+                "content": answer["content"],
+                "votes": 0,
+                "is_expert": int(answer.get("is_expert", False)),
+                "updated_seq": version
+            })
+            conn.execute(BUMP_ANSWER_COUNT, (version, answer["question_id"]))
+            if answer.get("expert_id"):
+                conn.execute(BUMP_EXPERT_ANSWERS, (answer["expert_id"],))
+                conn.execute(CLOSE_QUEUE_ENTRY, (answer["question_id"], answer["expert_id"]))
+        return cursor.lastrowid
+
+    def _vote(self, target_type, target_id, bump_sql, voter, date):
+        with self.transaction() as conn:
+            if voter is not None:
+                recorded = conn.execute(INSERT_VOTE, (target_type, target_id, voter, date)).rowcount
+                if not recorded:
+                    return False
+            version = self._bump_version(conn)
+            conn.execute(bump_sql, (version, target_id))
+        return True
+
+    def vote_question(self, question_id, voter=None, date=None):
+        """
+        Add one vote to a question; a named voter can only vote once
+        """
+        return self._vote("question", question_id, BUMP_QUESTION_VOTES, voter, date)
+
+    def vote_answer(self, answer_id, voter=None, date=None):
+        """
+        Add one vote to an answer; a named voter can only vote once
+        """
+        return self._vote("answer", answer_id, BUMP_ANSWER_VOTES, voter, date)
+
+    def mark_solved(self, question_id, solved=True):
+        """
+        Mark a question as solved or unsolved
+        """
+        with self.transaction() as conn:
+            version = self._bump_version(conn)
+            conn.execute(MARK_SOLVED, (int(solved), version, question_id))
+
+    def assign_question(self, question_id, expert_ids, date=None):
+        """
+        Put a question in the answer queue of each of the given experts
+        """
+        with self.transaction() as conn:
+            conn.executemany(ASSIGN_QUESTION, [(question_id, expert_id, date) for expert_id in expert_ids])
+
+    def get_open_queue_counts(self):
+        """
+        Get the number of unanswered assigned questions per expert id
+        """
+        return {row["expert_id"]: row["open_count"] for row in self.query(SELECT_OPEN_QUEUE_COUNTS)}
+
+    def get_expert_history(self, after_answer_id=0):
+        """
+        Get the questions experts have answered, for answers after the given id
+        """
+        history = self.query(SELECT_EXPERT_HISTORY, (after_answer_id,))
+        for row in history:
+            row["tags"] = json.loads(row["tags"])
+        return history
+
+    def get_changes(self, since_version):
+        """
+        Get the questions and answers written after since_version
+
+        Returns (questions, answers, version) read from one snapshot.
+        """
+        conn = self.connection()
+        conn.execute("BEGIN")
+        try:
+            version = conn.execute(SELECT_VERSION).fetchone()[0]
+            questions = [_question_from_row(row) for row in conn.execute(SELECT_CHANGED_QUESTIONS, (since_version,))]
+            answers = [_answer_from_row(row) for row in conn.execute(SELECT_CHANGED_ANSWERS, (since_version,))]
+        finally:
+            conn.execute("COMMIT")
+        return questions, answers, version
+
+    def get_question(self, question_id):
+        """
+        Get a single question
+        """
+        row = self.query_one(SELECT_QUESTION, (question_id,))
+        return _question_from_row(row) if row else None
+
+    def get_answers(self, question_id):
+        """
+        Get the answers to a question, most voted first
+        """
+        return [_answer_from_row(row) for row in self.query(SELECT_ANSWERS, (question_id,))]
+
+    def get_experts(self):
+        """
+        Get all experts
+        """
+        experts = self.query(SELECT_EXPERTS)
+        for expert in experts:
+            expert["verified"] = bool(expert["verified"])
+        return experts
+
+
+def get_community_store(db_path=None):
+    """
+    Get the process-wide CommunityStore for a database file
+    """
+    return get_store(CommunityStore, db_path)
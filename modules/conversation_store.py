@@ -0,0 +1,157 @@
+from collections import Counter, deque
+from datetime import datetime
+from itertools import islice
+
+from modules.storage import SQLiteStore, get_store
+
+# Messages kept per conversation, in memory and on disk
+MAX_MESSAGES = 50
+
+CONVERSATION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    user TEXT,
+    bot TEXT,
+    language TEXT,
+    intent TEXT
+);
+
+CREATE TABLE IF NOT EXISTS chat_topics (
+    user_id TEXT NOT NULL,
+    intent TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, intent)
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_user ON chat_messages(user_id, id);
+"""
+
+INSERT_MESSAGE = """
+INSERT INTO chat_messages (user_id, timestamp, user, bot, language, intent)
+VALUES (:user_id, :timestamp, :user, :bot, :language, :intent)
+"""
+UPSERT_TOPIC = """
+INSERT INTO chat_topics (user_id, intent, message_count) VALUES (?, ?, 1)
+ON CONFLICT(user_id, intent) DO UPDATE SET message_count = message_count + 1
+"""
+# Drops everything older than the newest max_messages rows of a user
+TRIM_MESSAGES = """
+DELETE FROM chat_messages
+WHERE user_id = ? AND id <= (
+    SELECT id FROM chat_messages WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?
+)
+"""
+SELECT_RECENT = """
+SELECT timestamp, user, bot, language, intent FROM (
+    SELECT * FROM chat_messages WHERE user_id = ? ORDER BY id DESC LIMIT ?
+) ORDER BY id
+"""
+
+
+class ConversationStore(SQLiteStore):
+    """
+    Chat history of each user, capped at the most recent messages
+    """
+
+    schema = CONVERSATION_SCHEMA
+
+    def append(self, user_id, message, max_messages=MAX_MESSAGES):
+        """
+        Store a message, count its topic and drop the user's oldest messages
+        beyond max_messages
+        """
+        with self.transaction() as conn:
+            conn.execute(INSERT_MESSAGE, {"user_id": user_id, **message})
+            if message["intent"]:
+                conn.execute(UPSERT_TOPIC, (user_id, message["intent"]))
+            conn.execute(TRIM_MESSAGES, (user_id, user_id, max_messages))
+
+    def get_recent(self, user_id, limit=MAX_MESSAGES):
+        """
+        Get a user's most recent messages, oldest first
+        """
+        return self.query(SELECT_RECENT, (user_id, limit))
+
+    def get_topic_counts(self, user_id):
+        """
+        Get the number of messages a user has sent about each intent
+        """
+        rows = self.query("SELECT intent, message_count FROM chat_topics WHERE user_id = ?", (user_id,))
+        return {row["intent"]: row["message_count"] for row in rows}
+
+    def clear(self, user_id):
+        """
+        Delete a user's history and topic counts
+        """
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM chat_messages WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM chat_topics WHERE user_id = ?", (user_id,))
+
+
+class Conversation:
+    """
+    One chat session's history in a fixed-size ring buffer
+
+    Only the last max_messages messages are kept, so memory per session is
+    bounded however long the chat runs. Topic counts are updated as each
+    message is added and cover the whole conversation, so summaries never
+    rescan the history. With a store and user id, the history and counts
+    are also written through to disk and reloaded in the next session.
+    """
+
+    def __init__(self, user_id=None, store=None, max_messages=MAX_MESSAGES):
+        self.user_id = user_id
+        self.store = store if user_id is not None else None
+        self.max_messages = max_messages
+        self.messages = deque(maxlen=max_messages)
+        self.topic_counts = Counter()
+
+        if self.store is not None:
+            self.messages.extend(self.store.get_recent(user_id, max_messages))
+            self.topic_counts.update(self.store.get_topic_counts(user_id))
+
+    def __len__(self):
+        return len(self.messages)
+
+    def add(self, user_input, bot_response, language="en", intent=None):
+        """
+        Append a message, evicting the oldest once the buffer is full
+        """
+        message = {
+            "timestamp": datetime.now().strftime("%H:%M"),
+            "user": user_input,
+            "bot": bot_response,
+            "language": language,
+            "intent": intent
+        }
+        self.messages.append(message)
+        if intent:
+            self.topic_counts[intent] += 1
+        if self.store is not None:
+            self.store.append(self.user_id, message, self.max_messages)
+        return message
+
+    def recent(self, limit):
+        """
+        Get the last messages, oldest first
+        """
+        start = max(len(self.messages) - limit, 0)
+        return list(islice(self.messages, start, None))
+
+    def clear(self):
+        """
+        Forget the history and topic counts
+        """
+        self.messages.clear()
+        self.topic_counts.clear()
+        if self.store is not None:
+            self.store.clear(self.user_id)
+
+
+def get_conversation_store(db_path=None):
+    """
+    Get the process-wide ConversationStore for a database file
+    """
+    return get_store(ConversationStore, db_path)
@@ -6,7 +6,12 @@ import plotly.graph_objects as go
 from datetime import datetime
 import json
 
+from modules.cache import cached
+from modules.charts import apply_layout
+from modules.instrumentation import timed
+
 class CropRecommendation:
+    @timed()
     def __init__(self):
         self.kerala_crops = {
             "Rice": {
@@ -101,6 +106,8 @@ class CropRecommendation:
             }
         }
     
+    @timed()
+    @cached("crop.suitability", key=lambda self, *args, **kwargs: (args, kwargs))
     def calculate_crop_suitability(self, soil_ph, soil_type, rainfall, temperature, season, location):
         """
         Calculate suitability score for each crop based on input parameters
@@ -247,6 +254,7 @@ class CropRecommendation:
                 # Seasonal calendar
                 self._render_seasonal_calendar()
     
+    @timed()
     def _render_recommendation_chart(self, recommendations):
         """
         Render a chart showing crop recommendations
@@ -265,12 +273,9 @@ class CropRecommendation:
             title="Crop Suitability Scores"
         )
         
-        fig.update_layout(
+        apply_layout(
+            fig,
             height=400,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white',
-            title_font_color='white',
             xaxis_title="Suitability Score (%)",
             yaxis_title="Crop"
         )
@@ -299,12 +304,9 @@ class CropRecommendation:
             color_continuous_scale='RdYlGn'
         )
         
-        fig.update_layout(
+        apply_layout(
+            fig,
             height=300,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white',
-            title_font_color='white',
             title="Monthly Crop Planting Guide"
         )
         
@@ -0,0 +1,76 @@
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from modules.cache import get_cache
+from modules.instrumentation import timer
+
+# How long a widget may take before its last good data is shown instead
+WIDGET_TIMEOUT_SECONDS = float(os.getenv("KERALA_WIDGET_TIMEOUT", "3"))
+
+# Where a widget's data came from
+LIVE = "live"
+CACHED = "cached"
+UNAVAILABLE = "unavailable"
+
+# Shared by all sessions; loaders are I/O bound or release the GIL in pandas
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dashboard-widget")
+
+# The data each widget loaded most recently
+_last_good = get_cache("dashboard.last_good", maxsize=None)
+
+_NOT_LOADED = object()
+
+
+def _remember(name):
+    def done(future):
+        if not future.cancelled() and future.exception() is None:
+            _last_good.set(name, future.result())
+    return done
+
+
+def _cached(name):
+    data = _last_good.get(name, _NOT_LOADED)
+    if data is _NOT_LOADED:
+        return None, UNAVAILABLE
+    return data, CACHED
+
+
+def load_widgets(loaders, timeout=WIDGET_TIMEOUT_SECONDS):
+    """
+    Run widget data loaders concurrently and yield (name, data, source) as
+    each one finishes, fastest first
+
+    A loader that fails, or is still running after timeout seconds, yields
+    the last data it loaded successfully (source CACHED) or None (source
+    UNAVAILABLE). A loader left running past its timeout still refreshes
+    the cached data when it completes.
+    """
+    deadline = time.monotonic() + timeout
+    pending = {}
+    for name, loader in loaders.items():
+        # Run in a copy of the caller's context so timings keep their page
+        context = contextvars.copy_context()
+        future = _executor.submit(context.run, _timed_loader, name, loader)
+        future.add_done_callback(_remember(name))
+        pending[future] = name
+
+    while pending:
+        done, _ = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            name = pending.pop(future)
+            if future.exception() is None:
+                yield name, future.result(), LIVE
+            else:
+                yield (name, *_cached(name))
+
+    for name in pending.values():
+        yield (name, *_cached(name))
+
+
+def _timed_loader(name, loader):
+    with timer(f"widget.{name}"):
+        return loader()
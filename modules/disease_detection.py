@@ -1,54 +1,90 @@
 import streamlit as st
 import requests
 import base64
+import hashlib
 import io
 from PIL import Image
 import json
 import os
 
+from modules.cache import get_cache
+from modules.instrumentation import timed
+
+# Treatment advice per disease label of the classification model
+TREATMENTS = {
+    "healthy": "Plant appears healthy. Continue regular care and monitoring.",
+    "bacterial_spot": "Apply copper-based fungicide. Remove affected leaves. Improve air circulation.",
+    "early_blight": "Apply fungicide containing chlorothalonil. Remove infected plant debris.",
+    "late_blight": "Apply fungicide immediately. Remove and destroy infected plants.",
+    "leaf_mold": "Improve air circulation. Apply fungicide. Reduce humidity.",
+    "septoria_leaf_spot": "Apply fungicide. Remove infected leaves. Improve drainage.",
+    "spider_mites": "Apply miticide. Increase humidity. Remove heavily infested leaves.",
+    "target_spot": "Apply fungicide. Remove infected leaves. Improve air circulation.",
+    "mosaic_virus": "Remove infected plants. Control aphids. Use virus-free seeds.",
+    "yellow_leaf_curl": "Control whiteflies. Remove infected plants. Use resistant varieties."
+}
+
+# Model predictions per image, shared by the worker processes for a week
+PREDICTION_TTL_SECONDS = 7 * 24 * 3600
+
+_predictions = get_cache("disease.predictions", ttl=PREDICTION_TTL_SECONDS, shared=True)
+
 class DiseaseDetection:
+    @timed()
     def __init__(self):
         self.huggingface_api_key = os.getenv('HUGGINGFACE_API_KEY')
         self.model_name = "linkanjarad/mobilenet_v2_1.0_224-plant-disease-identification"
         
+    @timed()
     def detect_disease(self, image):
         """
         Detect plant disease from uploaded image using Hugging Face API
+        
+        Predictions are cached by image content, so the same photo is only
+        sent to the model once; failed calls are not cached.
         """
         try:
             # Convert image to base64
             buffered = io.BytesIO()
             image.save(buffered, format="JPEG")
+            digest = hashlib.sha256(buffered.getvalue()).hexdigest()
             img_str = base64.b64encode(buffered.getvalue()).decode()
             
-            # Prepare API request
-            headers = {
-                "Authorization": f"Bearer {self.huggingface_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "inputs": img_str,
-                "options": {"wait_for_model": True}
-            }
-            
-            # Make API call
-            response = requests.post(
-                f"https://api-inference.huggingface.co/models/{self.model_name}",
-                headers=headers,
-                json=payload
+            return _predictions.get_or_compute(
+                (self.model_name, digest), lambda: self._query_model(img_str)
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return self._process_disease_result(result)
-            else:
-                return self._get_mock_result()
-                
+        
+        except requests.HTTPError:
+            return self._get_mock_result()
         except Exception as e:
             st.error(f"Error in disease detection: {str(e)}")
             return self._get_mock_result()
     
+    def _query_model(self, img_str):
+        """
+        Classify an image with the hosted model, raising on a failed call
+        """
+        # Prepare API request
+        headers = {
+            "Authorization": f"Bearer {self.huggingface_api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "inputs": img_str,
+            "options": {"wait_for_model": True}
+        }
+        
+        # Make API call
+        response = requests.post(
+            f"https://api-inference.huggingface.co/models/{self.model_name}",
+            headers=headers,
+            json=payload
+        )
+        
+        response.raise_for_status()
+        return self._process_disease_result(response.json())
+    
     def _process_disease_result(self, result):
         """
         Process the API response and format it for display
@@ -67,20 +103,7 @@ class DiseaseDetection:
         """
         Get treatment recommendations based on disease name
         """
-        treatments = {
-            "healthy": "Plant appears healthy. Continue regular care and monitoring.",
-            "bacterial_spot": "Apply copper-based fungicide. Remove affected leaves. Improve air circulation.",
-            "early_blight": "Apply fungicide containing chlorothalonil. Remove infected plant debris.",
-            "late_blight": "Apply fungicide immediately. Remove and destroy infected plants.",
-            "leaf_mold": "Improve air circulation. Apply fungicide. Reduce humidity.",
-            "septoria_leaf_spot": "Apply fungicide. Remove infected leaves. Improve drainage.",
-            "spider_mites": "Apply miticide. Increase humidity. Remove heavily infested leaves.",
-            "target_spot": "Apply fungicide. Remove infected leaves. Improve air circulation.",
-            "mosaic_virus": "Remove infected plants. Control aphids. Use virus-free seeds.",
-            "yellow_leaf_curl": "Control whiteflies. Remove infected plants. Use resistant varieties."
-        }
-        
-        return treatments.get(disease_name.lower(), "Consult with agricultural expert for specific treatment recommendations.")
+        return TREATMENTS.get(disease_name.lower(), "Consult with agricultural expert for specific treatment recommendations.")
     
     def _get_severity_level(self, confidence):
         """
@@ -0,0 +1,118 @@
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from modules.text_index import tokenize
+
+# Smallest prime above 2**32, the modulus of the universal hash family
+HASH_PRIME = np.uint64(4294967311)
+MAX_HASH = np.uint64(2 ** 32 - 1)
+
+
+class DuplicateDetector:
+    """
+    Near-duplicate question detection with MinHash signatures and LSH
+
+    Every question is reduced to a MinHash signature over its word and word
+    pair shingles. Signatures are split into bands and each band is hashed
+    into a bucket table, so finding candidates for a new question costs one
+    dictionary lookup per band instead of a pass over the corpus.
+    """
+
+    def __init__(self, questions=None, num_perm=64, bands=16, seed=42):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.RandomState(seed)
+        # a < 2**31 keeps a * x below 2**63, so uint64 arithmetic cannot wrap
+        self.hash_a = rng.randint(1, 2 ** 31, size=num_perm).astype(np.uint64)
+        self.hash_b = rng.randint(0, 2 ** 31, size=num_perm).astype(np.uint64)
+
+        self.signatures = {}
+        self.buckets = [defaultdict(set) for _ in range(bands)]
+
+        for question in questions or []:
+            self.add_question(question)
+
+    @staticmethod
+    def _shingles(question):
+        tokens = tokenize(f"{question.get('title', '')} {question.get('description', '')}")
+        shingles = set(tokens)
+        shingles.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+        return shingles
+
+    def signature(self, question):
+        """
+        Compute the MinHash signature of a question
+        """
+        shingles = self._shingles(question)
+        if not shingles:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        # One row per permutation, one column per shingle
+        permuted = (np.outer(self.hash_a, hashes) % HASH_PRIME + self.hash_b[:, None]) % HASH_PRIME
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add_question(self, question):
+        """
+        Add a question to the index
+        """
+        question_id = question["id"]
+        if question_id in self.signatures:
+            self.remove_question(question_id)
+
+        signature = self.signature(question)
+        self.signatures[question_id] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            self.buckets[band][key].add(question_id)
+
+    def remove_question(self, question_id):
+        """
+        Remove a question from the index
+        """
+        signature = self.signatures.pop(question_id, None)
+        if signature is None:
+            return
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self.buckets[band].get(key)
+            if bucket:
+                bucket.discard(question_id)
+                if not bucket:
+                    del self.buckets[band][key]
+
+    def find_similar(self, question, limit=5, min_similarity=0.3):
+        """
+        Get existing questions similar to the given one
+
+        Returns (question_id, similarity) pairs, most similar first, where
+        similarity estimates the Jaccard overlap of their shingles.
+        """
+        signature = self.signature(question)
+
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self.buckets[band].get(key, ()))
+        candidates.discard(question.get("id"))
+        if not candidates:
+            return []
+
+        candidate_ids = list(candidates)
+        candidate_signatures = np.stack([self.signatures[question_id] for question_id in candidate_ids])
+        similarities = (candidate_signatures == signature).mean(axis=1)
+
+        order = np.argsort(-similarities)[:limit]
+        return [
+            (candidate_ids[i], float(similarities[i]))
+            for i in order
+            if similarities[i] >= min_similarity
+        ]
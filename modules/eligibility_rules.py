@@ -0,0 +1,213 @@
+import bisect
+
+# Profile field -> scheme rule key for the categorical eligibility checks
+CATEGORICAL_RULES = {
+    "farmer_type": "farmer_types",
+    "state": "states",
+    "crop_type": "crop_types",
+    "annual_income": "income_bands",
+    "has_bank_account": "bank_account"
+}
+
+RULE_LABELS = {
+    "landholding": "Landholding",
+    "farmer_type": "Farmer type",
+    "state": "State",
+    "crop_type": "Crop type",
+    "annual_income": "Income band",
+    "has_bank_account": "Bank account"
+}
+
+
+def _accepted_values(rules, rule_key):
+    accepted = rules.get(rule_key)
+    if accepted is None:
+        return None
+    if isinstance(accepted, bool):
+        # bank_account: True means the scheme pays into a bank account
+        return {"Yes"} if accepted else None
+    return set(accepted)
+
+
+def _accepts_landholding(rules, landholding):
+    low = rules.get("min_landholding")
+    high = rules.get("max_landholding")
+    return (low is None or landholding >= low) and (high is None or landholding <= high)
+
+
+class EligibilityIndex:
+    """
+    Scheme eligibility rules compiled into bitsets
+
+    Bit i of every mask stands for scheme i. For each profile field the index
+    stores, per possible value, the mask of schemes that accept it; schemes
+    without a rule for the field accept every value. Numeric landholding
+    bounds are cut into segments at every bound used by any scheme, so a
+    landholding maps to a precomputed mask with one bisect. Matching a
+    profile is then one mask lookup and one AND per field.
+    """
+
+    def __init__(self, schemes):
+        self.schemes = list(schemes)
+        self.all_mask = (1 << len(self.schemes)) - 1
+        self.constrained_counts = []
+        self.masks = {}
+        self.default_masks = {}
+
+        for field, rule_key in CATEGORICAL_RULES.items():
+            self._compile_categorical(field, rule_key)
+        self._compile_landholding()
+
+        for scheme in self.schemes:
+            rules = scheme.get("rules", {})
+            constrained = sum(_accepted_values(rules, rule_key) is not None for rule_key in CATEGORICAL_RULES.values())
+            constrained += "min_landholding" in rules or "max_landholding" in rules
+            self.constrained_counts.append(constrained)
+
+    def _compile_categorical(self, field, rule_key):
+        unconstrained = 0
+        value_masks = {}
+        accepted_sets = []
+        for bit, scheme in enumerate(self.schemes):
+            accepted = _accepted_values(scheme.get("rules", {}), rule_key)
+            accepted_sets.append(accepted)
+            if accepted is None:
+                unconstrained |= 1 << bit
+            else:
+                for value in accepted:
+                    value_masks[value] = 0
+
+        for value in value_masks:
+            mask = unconstrained
+            for bit, accepted in enumerate(accepted_sets):
+                if accepted is not None and value in accepted:
+                    mask |= 1 << bit
+            value_masks[value] = mask
+
+        self.masks[field] = value_masks
+        self.default_masks[field] = unconstrained
+
+    def _compile_landholding(self):
+        bounds = set()
+        for scheme in self.schemes:
+            rules = scheme.get("rules", {})
+            for key in ("min_landholding", "max_landholding"):
+                if rules.get(key) is not None:
+                    bounds.add(rules[key])
+        self.landholding_points = sorted(bounds)
+
+        # Segment 2i is the open interval below point i, segment 2i + 1 is
+        # point i itself; every value in a segment passes the same schemes
+        points = self.landholding_points
+        representatives = []
+        for i in range(len(points) + 1):
+            if not points:
+                representatives.append(0.0)
+            elif i == 0:
+                representatives.append(points[0] - 1)
+            elif i == len(points):
+                representatives.append(points[-1] + 1)
+            else:
+                representatives.append((points[i - 1] + points[i]) / 2)
+            if i < len(points):
+                representatives.append(points[i])
+
+        self.landholding_masks = []
+        for value in representatives:
+            mask = 0
+            for bit, scheme in enumerate(self.schemes):
+                if _accepts_landholding(scheme.get("rules", {}), value):
+                    mask |= 1 << bit
+            self.landholding_masks.append(mask)
+
+    def _landholding_mask(self, landholding):
+        points = self.landholding_points
+        i = bisect.bisect_left(points, landholding)
+        segment = 2 * i + 1 if i < len(points) and points[i] == landholding else 2 * i
+        return self.landholding_masks[segment]
+
+    def unpack_mask(self, mask):
+        """
+        Expand a mask into a list of per-scheme booleans
+        """
+        return [bool(mask >> bit & 1) for bit in range(len(self.schemes))]
+
+    def field_masks(self, profile):
+        """
+        Get the mask of schemes accepting each field of a profile
+
+        Fields missing from the profile are left out, so they do not count
+        against any scheme.
+        """
+        masks = {}
+        if profile.get("landholding") is not None:
+            masks["landholding"] = self._landholding_mask(profile["landholding"])
+        for field in CATEGORICAL_RULES:
+            if field in profile:
+                masks[field] = self.masks[field].get(profile[field], self.default_masks[field])
+        return masks
+
+    def match(self, profile):
+        """
+        Get the mask of schemes a profile is fully eligible for
+        """
+        mask = self.all_mask
+        for field_mask in self.field_masks(profile).values():
+            mask &= field_mask
+        return mask
+
+    def match_with_near_misses(self, profile):
+        """
+        Get the masks of schemes a profile meets fully and of schemes it
+        fails on exactly one field
+        """
+        field_masks = list(self.field_masks(profile).values())
+
+        # prefix[i] / suffix[i] hold the AND of the masks before / after i
+        prefix = [self.all_mask]
+        for field_mask in field_masks:
+            prefix.append(prefix[-1] & field_mask)
+        suffix = [self.all_mask]
+        for field_mask in reversed(field_masks):
+            suffix.append(suffix[-1] & field_mask)
+        suffix.reverse()
+
+        eligible = prefix[-1]
+        at_most_one_miss = eligible
+        for i in range(len(field_masks)):
+            at_most_one_miss |= prefix[i] & suffix[i + 1]
+        return eligible, at_most_one_miss & ~eligible
+
+    def evaluate(self, profile, include_near_misses=True):
+        """
+        Get (scheme, score, unmet_field) for the matching schemes, best first
+
+        Fully eligible schemes score 100. A scheme failing one field scores
+        the share of its own rules the profile meets and names that field.
+        """
+        field_masks = self.field_masks(profile)
+        eligible, near_misses = self.match_with_near_misses(profile)
+        if not include_near_misses:
+            near_misses = 0
+
+        results = []
+        for bit in _bits(eligible):
+            results.append((self.schemes[bit], 100.0, None))
+        for bit in _bits(near_misses):
+            constrained = self.constrained_counts[bit]
+            score = (constrained - 1) / constrained * 100 if constrained else 0.0
+            unmet = next(field for field, mask in field_masks.items() if not mask >> bit & 1)
+            results.append((self.schemes[bit], score, unmet))
+
+        results.sort(key=lambda result: -result[1])
+        return results
+
+
+def _bits(mask):
+    """
+    Get the positions of the set bits of a mask, lowest first
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -0,0 +1,192 @@
+import threading
+import zlib
+
+import numpy as np
+
+from modules.text_index import tokenize
+
+# Width of the hashed feature space; fixed so scoring cost does not grow
+# with the vocabulary of the forum
+NUM_FEATURES = 1024
+
+# Topics each specialization covers, beyond the words of its own name
+SPECIALIZATION_TOPICS = {
+    "Plant Pathology": "disease pest control mite insect fungus blight wilt rot infestation spray neem",
+    "Horticulture": "crop cultivation planting pepper cardamom coconut banana spice vegetable fruit yield",
+    "Soil Science": "soil health fertilizer organic farming nutrient compost manure ph",
+    "Agronomy": "crop cultivation rice paddy seed variety irrigation yield",
+    "Agrometeorology": "weather impact rainfall monsoon drought flood temperature",
+    "Agricultural Economics": "market prices selling trader cost profit"
+}
+
+# Share of an expert's skill vector taken from the questions they answered
+HISTORY_WEIGHT = 0.5
+# Each open question in an expert's queue divides their score by (1 + this)
+LOAD_PENALTY = 0.25
+
+
+def _feature(token):
+    return zlib.crc32(token.encode("utf-8")) % NUM_FEATURES
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def question_tokens(question):
+    """
+    Get the routing tokens of a question; category and tags count double
+    """
+    tags = " ".join(question.get("tags") or [])
+    return (
+        tokenize(question.get("title", ""))
+        + tokenize(question.get("description") or "")
+        + tokenize(f"{question.get('category') or ''} {tags}") * 2
+    )
+
+
+def text_vector(tokens):
+    """
+    Hash tokens into a term-count vector
+    """
+    features = np.fromiter((_feature(token) for token in tokens), dtype=np.int64, count=len(tokens))
+    return np.bincount(features, minlength=NUM_FEATURES).astype(np.float64)
+
+
+class ExpertRouter:
+    """
+    Route forum questions to the experts best placed to answer them
+
+    Every expert has a skill vector in a hashed term space, built from their
+    specialization and the questions they have answered. A question is
+    hashed into the same space and scored against all experts with one
+    matrix-vector product, then scores are discounted by each expert's queue
+    of open assigned questions so work spreads across the panel.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self.experts = []
+        self.positions = {}
+        self.profile = np.zeros((0, NUM_FEATURES))
+        self.history = np.zeros((0, NUM_FEATURES))
+        self.skills = np.zeros((0, NUM_FEATURES))
+        self.last_answer_id = 0
+        self.refresh()
+
+    def _rebuild(self, experts):
+        self.experts = experts
+        self.positions = {expert["id"]: position for position, expert in enumerate(experts)}
+        self.profile = np.stack([
+            text_vector(tokenize(f"{expert['specialization']} {SPECIALIZATION_TOPICS.get(expert['specialization'], '')}"))
+            for expert in experts
+        ]) if experts else np.zeros((0, NUM_FEATURES))
+        self.history = np.zeros_like(self.profile)
+        self.skills = np.zeros_like(self.profile)
+        self.last_answer_id = 0
+        self._update_skills()
+
+    def _update_skills(self, rows=None):
+        if rows is None:
+            rows = slice(None)
+        self.skills[rows] = _normalize_rows(
+            _normalize_rows(self.profile[rows]) + HISTORY_WEIGHT * _normalize_rows(self.history[rows])
+        )
+
+    def refresh(self):
+        """
+        Pick up new experts and answers written since the last refresh
+        """
+        with self._lock:
+            experts = self.store.get_experts()
+            if [expert["id"] for expert in experts] != [expert["id"] for expert in self.experts]:
+                self._rebuild(experts)
+            else:
+                self.experts = experts
+
+            changed = set()
+            for row in self.store.get_expert_history(self.last_answer_id):
+                position = self.positions.get(row["expert_id"])
+                if position is not None:
+                    self.history[position] += text_vector(question_tokens(row))
+                    changed.add(position)
+                self.last_answer_id = row["answer_id"]
+            if changed:
+                self._update_skills(sorted(changed))
+
+    def score(self, question, open_counts=None):
+        """
+        Get each expert's load-adjusted match score for a question
+        """
+        _, scores, load = self._score(question, open_counts)
+        return scores, load
+
+    def _score(self, question, open_counts=None):
+        """
+        Score a question against one consistent view of the experts and
+        their skills, which refresh() replaces and updates in place
+
+        Returns (experts, scores, load), positions matching across the three.
+        """
+        query = _normalize_rows(text_vector(question_tokens(question)))
+        with self._lock:
+            experts, positions = self.experts, self.positions
+            similarity = self.skills @ query
+        if not experts:
+            return experts, np.zeros(0), np.zeros(0)
+
+        if open_counts is None:
+            open_counts = self.store.get_open_queue_counts()
+        load = np.zeros(len(experts))
+        for expert_id, count in open_counts.items():
+            position = positions.get(expert_id)
+            if position is not None:
+                load[position] = count
+        return experts, similarity / (1 + LOAD_PENALTY * load), load
+
+    def route(self, question, limit=2, min_score=0.05, open_counts=None):
+        """
+        Get the experts a question should be sent to, best match first
+
+        Returns (expert, score, open_questions) tuples.
+        """
+        experts, scores, load = self._score(question, open_counts)
+        if not len(scores):
+            return []
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (experts[position], float(scores[position]), int(load[position]))
+            for position in top
+            if scores[position] >= min_score
+        ]
+
+    def assign(self, question, limit=2, date=None):
+        """
+        Route a stored question and add it to the chosen experts' queues
+        """
+        routed = self.route(question, limit)
+        if routed:
+            self.store.assign_question(question["id"], [expert["id"] for expert, _, _ in routed], date)
+        return routed
+
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+
+def get_expert_router(store):
+    """
+    Get the process-wide, up to date router for a store
+    """
+    with _routers_lock:
+        router = _routers.get(store.db_path)
+        if router is None:
+            router = ExpertRouter(store)
+            _routers[store.db_path] = router
+            return router
+    router.refresh()
+    return router
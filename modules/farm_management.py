@@ -5,22 +5,31 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import json
 
+from modules.charts import apply_layout, cached_figure
+from modules.farm_store import get_farm_store
+from modules.instrumentation import timed
+from modules.portfolio_analytics import PortfolioAnalytics
+
 class FarmManagement:
-    def __init__(self):
-        self.farm_data = {
-            "farms": [],
-            "crops": [],
-            "expenses": [],
-            "harvests": []
-        }
+    @timed()
+    def __init__(self, store=None):
+        self.store = store or get_farm_store()
         self.load_sample_data()
     
     def load_sample_data(self):
         """
-        Load sample farm data for demonstration
+        Seed the farm store with sample data for demonstration
+
+        Sample records are only written into an empty store, so anything
+        entered by users survives reruns and restarts.
         """
+        if not self.store.is_empty():
+            return
+        
+        farm_data = {}
+        
         # Sample farms
-        self.farm_data["farms"] = [
+        farm_data["farms"] = [
             {
                 "id": 1,
                 "name": "Green Valley Farm",
@@ -42,7 +51,7 @@ class FarmManagement:
         ]
         
         # Sample crops
-        self.farm_data["crops"] = [
+        farm_data["crops"] = [
             {
                 "id": 1,
                 "farm_id": 1,
@@ -82,7 +91,7 @@ class FarmManagement:
         ]
         
         # Sample expenses
-        self.farm_data["expenses"] = [
+        farm_data["expenses"] = [
             {
                 "id": 1,
                 "farm_id": 1,
@@ -126,7 +135,7 @@ class FarmManagement:
         ]
         
         # Sample harvests
-        self.farm_data["harvests"] = [
+        farm_data["harvests"] = [
             {
                 "id": 1,
                 "farm_id": 1,
@@ -150,37 +159,66 @@ class FarmManagement:
                 "quality": "Excellent"
             }
         ]
+        
+        # Sample soil tests
+        farm_data["soil_tests"] = [
+            {
+                "id": 1,
+                "farm_id": 1,
+                "test_date": "2023-06-10",
+                "ph": 5.4,
+                "nitrogen": 18,
+                "phosphorus": 12,
+                "potassium": 140,
+                "organic_matter": 2.6
+            },
+            {
+                "id": 2,
+                "farm_id": 1,
+                "test_date": "2024-01-08",
+                "ph": 6.2,
+                "nitrogen": 24,
+                "phosphorus": 17,
+                "potassium": 165,
+                "organic_matter": 3.1
+            },
+            {
+                "id": 3,
+                "farm_id": 2,
+                "test_date": "2024-01-03",
+                "ph": 5.8,
+                "nitrogen": 21,
+                "phosphorus": 9,
+                "potassium": 180,
+                "organic_matter": 2.4
+            }
+        ]
+        
+        self.store.seed(farm_data)
     
+    @timed()
     def get_farm_summary(self, farm_id):
         """
         Get summary statistics for a farm
+
+        Totals and crop status counts are read from the aggregates the store
+        maintains on every write, so this is a single indexed lookup.
         """
-        farm = next((f for f in self.farm_data["farms"] if f["id"] == farm_id), None)
-        if not farm:
+        row = self.store.get_farm_totals(farm_id)
+        if not row:
             return None
         
-        # Get crops for this farm
-        farm_crops = [c for c in self.farm_data["crops"] if c["farm_id"] == farm_id]
-        
-        # Get expenses for this farm
-        farm_expenses = [e for e in self.farm_data["expenses"] if e["farm_id"] == farm_id]
-        
-        # Get harvests for this farm
-        farm_harvests = [h for h in self.farm_data["harvests"] if h["farm_id"] == farm_id]
+        farm = {key: row[key] for key in ["id", "name", "location", "area_acres", "soil_type", "established", "owner"]}
         
-        # Calculate statistics
-        total_expenses = sum(e["amount"] for e in farm_expenses)
-        total_revenue = sum(h["total_value"] for h in farm_harvests)
+        total_expenses = row["total_expenses"] or 0
+        total_revenue = row["total_revenue"] or 0
         net_profit = total_revenue - total_expenses
         
-        active_crops = len([c for c in farm_crops if c["status"] == "Growing"])
-        mature_crops = len([c for c in farm_crops if c["status"] == "Mature"])
-        
         return {
             "farm": farm,
             "total_area": farm["area_acres"],
-            "active_crops": active_crops,
-            "mature_crops": mature_crops,
+            "active_crops": row["active_crops"] or 0,
+            "mature_crops": row["mature_crops"] or 0,
             "total_expenses": total_expenses,
             "total_revenue": total_revenue,
             "net_profit": net_profit,
@@ -198,7 +236,7 @@ class FarmManagement:
         """, unsafe_allow_html=True)
         
         # Farm selection
-        farm_options = {f"{f['name']} - {f['location']}": f["id"] for f in self.farm_data["farms"]}
+        farm_options = {f"{f['name']} - {f['location']}": f["id"] for f in self.store.get_farms()}
         selected_farm = st.selectbox("Select Farm", list(farm_options.keys()))
         farm_id = farm_options[selected_farm]
         
@@ -270,6 +308,10 @@ class FarmManagement:
             
             # Analytics charts
             self._render_analytics_charts(farm_id)
+        
+        # Cooperative-wide rollups across all farms
+        if st.checkbox("Show cooperative portfolio analytics"):
+            PortfolioAnalytics(self.store).render_portfolio_dashboard()
     
     def _render_crops_section(self, farm_id):
         """
@@ -277,7 +319,7 @@ class FarmManagement:
         """
         st.markdown("### 🌱 Current Crops")
         
-        farm_crops = [c for c in self.farm_data["crops"] if c["farm_id"] == farm_id]
+        farm_crops = self.store.get_crops(farm_id)
         
         if farm_crops:
             for crop in farm_crops:
@@ -314,12 +356,11 @@ class FarmManagement:
         """
         st.markdown("### 💰 Recent Expenses")
         
-        farm_expenses = [e for e in self.farm_data["expenses"] if e["farm_id"] == farm_id]
-        farm_expenses.sort(key=lambda x: x["date"], reverse=True)
+        farm_expenses = self.store.get_expenses(farm_id, limit=5)
         
         if farm_expenses:
             # Display recent expenses
-            for expense in farm_expenses[:5]:
+            for expense in farm_expenses:
                 col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
                 
                 with col1:
@@ -333,12 +374,43 @@ class FarmManagement:
                 
                 with col4:
                     st.markdown(expense['date'])
-            
-            # Add new expense button
-            if st.button("➕ Add New Expense", type="primary"):
-                st.info("Expense form would open here")
         else:
             st.info("No expenses recorded yet.")
+        
+        # Add new expense form
+        with st.expander("➕ Add New Expense", expanded=False):
+            with st.form(f"add_expense_form_{farm_id}", clear_on_submit=True):
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    category = st.selectbox(
+                        "Category",
+                        ["Seeds", "Fertilizer", "Labor", "Pesticides", "Equipment", "Irrigation", "Other"]
+                    )
+                    description = st.text_input("Description")
+                    expense_date = st.date_input("Date", datetime.now())
+                
+                with col2:
+                    amount = st.number_input("Amount (₹)", 0, 10000000, 0, 100)
+                    quantity = st.number_input("Quantity", 0.0, 100000.0, 0.0, 1.0)
+                    unit = st.selectbox("Unit", ["kg", "liters", "days", "units"])
+                
+                submitted = st.form_submit_button("Save Expense", type="primary")
+                
+                if submitted:
+                    if amount > 0 and description:
+                        self.store.add_expense({
+                            "farm_id": farm_id,
+                            "date": expense_date.strftime("%Y-%m-%d"),
+                            "category": category,
+                            "description": description,
+                            "amount": amount,
+                            "quantity": quantity,
+                            "unit": unit
+                        })
+                        st.rerun()
+                    else:
+                        st.error("Please enter a description and an amount.")
     
     def _render_harvest_section(self, farm_id):
         """
@@ -346,16 +418,14 @@ class FarmManagement:
         """
         st.markdown("### 🌾 Harvest Records")
         
-        farm_harvests = [h for h in self.farm_data["harvests"] if h["farm_id"] == farm_id]
-        farm_harvests.sort(key=lambda x: x["harvest_date"], reverse=True)
+        farm_harvests = self.store.get_harvests(farm_id)
         
         if farm_harvests:
             for harvest in farm_harvests:
                 col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
                 
                 with col1:
-                    crop = next((c for c in self.farm_data["crops"] if c["id"] == harvest["crop_id"]), None)
-                    crop_name = crop["crop_name"] if crop else "Unknown"
+                    crop_name = harvest["crop_name"] or "Unknown"
                     st.markdown(f"{crop_name} - {harvest['harvest_date']}")
                 
                 with col2:
@@ -369,88 +439,102 @@ class FarmManagement:
         else:
             st.info("No harvest records yet.")
     
+    @timed()
     def _render_analytics_charts(self, farm_id):
         """
         Render analytics charts
         """
         st.markdown("### 📈 Farm Analytics")
         
-        # Revenue vs Expenses chart
-        farm_expenses = [e for e in self.farm_data["expenses"] if e["farm_id"] == farm_id]
-        farm_harvests = [h for h in self.farm_data["harvests"] if h["farm_id"] == farm_id]
+        # Figures are rebuilt only after the records in this store change
+        version = self.store.get_data_version()
         
-        if farm_expenses and farm_harvests:
-            # Prepare data for charts
-            expense_data = []
-            for expense in farm_expenses:
-                expense_data.append({
-                    "Date": expense["date"],
-                    "Amount": expense["amount"],
-                    "Type": "Expense",
-                    "Category": expense["category"]
-                })
-            
-            revenue_data = []
-            for harvest in farm_harvests:
-                revenue_data.append({
-                    "Date": harvest["harvest_date"],
-                    "Amount": harvest["total_value"],
-                    "Type": "Revenue",
-                    "Category": "Harvest"
-                })
-            
-            # Combine data
-            chart_data = expense_data + revenue_data
-            df = pd.DataFrame(chart_data)
-            
-            # Create chart
-            fig = px.bar(
-                df,
-                x="Date",
-                y="Amount",
-                color="Type",
-                title="Revenue vs Expenses Over Time",
-                color_discrete_map={"Expense": "#FF6B6B", "Revenue": "#4ECDC4"}
-            )
-            
-            fig.update_layout(
-                height=400,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='white',
-                title_font_color='white'
-            )
-            
+        # Revenue vs Expenses chart
+        fig = cached_figure(
+            "farm.revenue_vs_expenses", version,
+            lambda: self._build_revenue_chart(farm_id), farm_id=farm_id, db_path=self.store.db_path
+        )
+        if fig is not None:
             st.plotly_chart(fig, use_container_width=True)
         
         # Crop yield chart
-        farm_crops = [c for c in self.farm_data["crops"] if c["farm_id"] == farm_id and c["yield_actual"]]
-        
-        if farm_crops:
-            crop_data = []
-            for crop in farm_crops:
-                crop_data.append({
-                    "Crop": crop["crop_name"],
-                    "Expected": crop["yield_expected"],
-                    "Actual": crop["yield_actual"]
-                })
-            
-            df_crops = pd.DataFrame(crop_data)
-            
-            fig = px.bar(
-                df_crops,
-                x="Crop",
-                y=["Expected", "Actual"],
-                title="Expected vs Actual Yield",
-                barmode="group"
-            )
-            
-            fig.update_layout(
-                height=400,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='white',
-                title_font_color='white'
-            )
-            
+        fig = cached_figure(
+            "farm.yield", version,
+            lambda: self._build_yield_chart(farm_id), farm_id=farm_id, db_path=self.store.db_path
+        )
+        if fig is not None:
             st.plotly_chart(fig, use_container_width=True)
+    
+    def _build_revenue_chart(self, farm_id):
+        """
+        Build the revenue vs expenses figure, or None without both
+        """
+        farm_expenses = self.store.get_expenses(farm_id)
+        farm_harvests = self.store.get_harvests(farm_id)
+        
+        if not (farm_expenses and farm_harvests):
+            return None
+        
+        # Prepare data for charts
+        expense_data = []
+        for expense in farm_expenses:
+            expense_data.append({
+                "Date": expense["date"],
+                "Amount": expense["amount"],
+                "Type": "Expense",
+                "Category": expense["category"]
+            })
+        
+        revenue_data = []
+        for harvest in farm_harvests:
+            revenue_data.append({
+                "Date": harvest["harvest_date"],
+                "Amount": harvest["total_value"],
+                "Type": "Revenue",
+                "Category": "Harvest"
+            })
+        
+        # Combine data
+        chart_data = expense_data + revenue_data
+        df = pd.DataFrame(chart_data)
+        
+        # Create chart
+        fig = px.bar(
+            df,
+            x="Date",
+            y="Amount",
+            color="Type",
+            title="Revenue vs Expenses Over Time",
+            color_discrete_map={"Expense": "#FF6B6B", "Revenue": "#4ECDC4"}
+        )
+        
+        return apply_layout(fig, height=400)
+    
+    def _build_yield_chart(self, farm_id):
+        """
+        Build the expected vs actual yield figure, or None without yields
+        """
+        farm_crops = [c for c in self.store.get_crops(farm_id) if c["yield_actual"]]
+        
+        if not farm_crops:
+            return None
+        
+        crop_data = []
+        for crop in farm_crops:
+            crop_data.append({
+                "Crop": crop["crop_name"],
+                "Expected": crop["yield_expected"],
+                "Actual": crop["yield_actual"]
+            })
+        
+        df_crops = pd.DataFrame(crop_data)
+        
+        fig = px.bar(
+            df_crops,
+            x="Crop",
+            y=["Expected", "Actual"],
+            title="Expected vs Actual Yield",
+            barmode="group"
+        )
+        
+        return apply_layout(fig, height=400)
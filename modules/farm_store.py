@@ -0,0 +1,490 @@
+from modules.storage import SQLiteStore, get_store
+
+FARM_SCHEMA = """
+CREATE TABLE IF NOT EXISTS farms (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    location TEXT,
+    area_acres REAL,
+    soil_type TEXT,
+    established TEXT,
+    owner TEXT
+);
+
+CREATE TABLE IF NOT EXISTS crops (
+    id INTEGER PRIMARY KEY,
+    farm_id INTEGER NOT NULL REFERENCES farms(id),
+    crop_name TEXT NOT NULL,
+    variety TEXT,
+    planting_date TEXT,
+    expected_harvest TEXT,
+    area_acres REAL,
+    status TEXT,
+    yield_expected NUMERIC,
+    yield_actual NUMERIC
+);
+
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    farm_id INTEGER NOT NULL REFERENCES farms(id),
+    date TEXT NOT NULL,
+    category TEXT,
+    description TEXT,
+    amount NUMERIC NOT NULL,
+    quantity NUMERIC,
+    unit TEXT
+);
+
+CREATE TABLE IF NOT EXISTS harvests (
+    id INTEGER PRIMARY KEY,
+    farm_id INTEGER NOT NULL REFERENCES farms(id),
+    crop_id INTEGER REFERENCES crops(id),
+    harvest_date TEXT NOT NULL,
+    quantity NUMERIC,
+    unit TEXT,
+    price_per_unit NUMERIC,
+    total_value NUMERIC NOT NULL,
+    quality TEXT
+);
+
+CREATE TABLE IF NOT EXISTS soil_tests (
+    id INTEGER PRIMARY KEY,
+    farm_id INTEGER NOT NULL REFERENCES farms(id),
+    test_date TEXT NOT NULL,
+    ph REAL,
+    nitrogen REAL,
+    phosphorus REAL,
+    potassium REAL,
+    organic_matter REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_crops_farm ON crops(farm_id);
+CREATE INDEX IF NOT EXISTS idx_soil_tests_farm_date ON soil_tests(farm_id, test_date);
+CREATE INDEX IF NOT EXISTS idx_expenses_farm_date ON expenses(farm_id, date);
+CREATE INDEX IF NOT EXISTS idx_harvests_farm_date ON harvests(farm_id, harvest_date);
+
+CREATE TABLE IF NOT EXISTS farm_totals (
+    farm_id INTEGER PRIMARY KEY,
+    total_expenses NUMERIC NOT NULL DEFAULT 0,
+    total_revenue NUMERIC NOT NULL DEFAULT 0,
+    expense_count INTEGER NOT NULL DEFAULT 0,
+    harvest_count INTEGER NOT NULL DEFAULT 0,
+    active_crops INTEGER NOT NULL DEFAULT 0,
+    mature_crops INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS farm_monthly_totals (
+    farm_id INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    expenses NUMERIC NOT NULL DEFAULT 0,
+    revenue NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (farm_id, month)
+);
+"""
+
+
+def _ledger_triggers(table, date_column, value_column, total_column, count_column, monthly_column):
+    """
+    Build the triggers that keep farm_totals and farm_monthly_totals in step
+    with a ledger table
+
+    The triggers run inside the writing transaction, so the aggregates can
+    never disagree with the rows they summarise, whichever process wrote them.
+    """
+    apply_new = f"""
+        INSERT INTO farm_totals (farm_id, {total_column}, {count_column})
+        VALUES (NEW.farm_id, NEW.{value_column}, 1)
+        ON CONFLICT(farm_id) DO UPDATE SET
+            {total_column} = {total_column} + excluded.{total_column},
+            {count_column} = {count_column} + 1;
+        INSERT INTO farm_monthly_totals (farm_id, month, {monthly_column})
+        VALUES (NEW.farm_id, substr(NEW.{date_column}, 1, 7), NEW.{value_column})
+        ON CONFLICT(farm_id, month) DO UPDATE SET
+            {monthly_column} = {monthly_column} + excluded.{monthly_column};
+    """
+    revert_old = f"""
+        UPDATE farm_totals SET
+            {total_column} = {total_column} - OLD.{value_column},
+            {count_column} = {count_column} - 1
+        WHERE farm_id = OLD.farm_id;
+        UPDATE farm_monthly_totals SET
+            {monthly_column} = {monthly_column} - OLD.{value_column}
+        WHERE farm_id = OLD.farm_id AND month = substr(OLD.{date_column}, 1, 7);
+    """
+    return f"""
+CREATE TRIGGER IF NOT EXISTS trg_{table}_insert AFTER INSERT ON {table}
+BEGIN {apply_new} END;
+
+CREATE TRIGGER IF NOT EXISTS trg_{table}_delete AFTER DELETE ON {table}
+BEGIN {revert_old} END;
+
+CREATE TRIGGER IF NOT EXISTS trg_{table}_update
+AFTER UPDATE OF farm_id, {date_column}, {value_column} ON {table}
+BEGIN {revert_old} {apply_new} END;
+"""
+
+
+CROP_STATUS_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS trg_farms_insert AFTER INSERT ON farms
+BEGIN
+    INSERT OR IGNORE INTO farm_totals (farm_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_crops_insert AFTER INSERT ON crops
+BEGIN
+    INSERT INTO farm_totals (farm_id, active_crops, mature_crops)
+    VALUES (NEW.farm_id, NEW.status = 'Growing', NEW.status = 'Mature')
+    ON CONFLICT(farm_id) DO UPDATE SET
+        active_crops = active_crops + excluded.active_crops,
+        mature_crops = mature_crops + excluded.mature_crops;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_crops_delete AFTER DELETE ON crops
+BEGIN
+    UPDATE farm_totals SET
+        active_crops = active_crops - (OLD.status = 'Growing'),
+        mature_crops = mature_crops - (OLD.status = 'Mature')
+    WHERE farm_id = OLD.farm_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_crops_update AFTER UPDATE OF farm_id, status ON crops
+BEGIN
+    UPDATE farm_totals SET
+        active_crops = active_crops - (OLD.status = 'Growing'),
+        mature_crops = mature_crops - (OLD.status = 'Mature')
+    WHERE farm_id = OLD.farm_id;
+    INSERT INTO farm_totals (farm_id, active_crops, mature_crops)
+    VALUES (NEW.farm_id, NEW.status = 'Growing', NEW.status = 'Mature')
+    ON CONFLICT(farm_id) DO UPDATE SET
+        active_crops = active_crops + excluded.active_crops,
+        mature_crops = mature_crops + excluded.mature_crops;
+END;
+"""
+
+VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('data_version', 0);
+""" + "".join(
+    f"""
+CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version AFTER {event} ON {table}
+BEGIN
+    UPDATE store_meta SET value = value + 1 WHERE key = 'data_version';
+END;
+"""
+    for table in ["farms", "crops", "expenses", "harvests", "soil_tests"]
+    for event in ["INSERT", "UPDATE", "DELETE"]
+)
+
+AGGREGATE_SCHEMA = (
+    _ledger_triggers("expenses", "date", "amount", "total_expenses", "expense_count", "expenses")
+    + _ledger_triggers("harvests", "harvest_date", "total_value", "total_revenue", "harvest_count", "revenue")
+    + CROP_STATUS_TRIGGERS
+    + VERSION_SCHEMA
+)
+
+REBUILD_AGGREGATES = """
+DELETE FROM farm_totals;
+DELETE FROM farm_monthly_totals;
+
+INSERT INTO farm_totals (farm_id, total_expenses, total_revenue, expense_count,
+                         harvest_count, active_crops, mature_crops)
+SELECT f.id,
+       COALESCE((SELECT SUM(amount) FROM expenses WHERE farm_id = f.id), 0),
+       COALESCE((SELECT SUM(total_value) FROM harvests WHERE farm_id = f.id), 0),
+       (SELECT COUNT(*) FROM expenses WHERE farm_id = f.id),
+       (SELECT COUNT(*) FROM harvests WHERE farm_id = f.id),
+       (SELECT COUNT(*) FROM crops WHERE farm_id = f.id AND status = 'Growing'),
+       (SELECT COUNT(*) FROM crops WHERE farm_id = f.id AND status = 'Mature')
+FROM farms f;
+
+INSERT INTO farm_monthly_totals (farm_id, month, expenses, revenue)
+SELECT farm_id, month, SUM(expenses), SUM(revenue)
+FROM (
+    SELECT farm_id, substr(date, 1, 7) AS month, amount AS expenses, 0 AS revenue FROM expenses
+    UNION ALL
+    SELECT farm_id, substr(harvest_date, 1, 7), 0, total_value FROM harvests
+)
+GROUP BY farm_id, month;
+"""
+
+# Statements are kept as constants so sqlite3's statement cache reuses the
+# prepared form on every call
+INSERT_FARM = """
+INSERT INTO farms (id, name, location, area_acres, soil_type, established, owner)
+VALUES (:id, :name, :location, :area_acres, :soil_type, :established, :owner)
+"""
+
+INSERT_CROP = """
+INSERT INTO crops (id, farm_id, crop_name, variety, planting_date, expected_harvest,
+                   area_acres, status, yield_expected, yield_actual)
+VALUES (:id, :farm_id, :crop_name, :variety, :planting_date, :expected_harvest,
+        :area_acres, :status, :yield_expected, :yield_actual)
+"""
+
+INSERT_EXPENSE = """
+INSERT INTO expenses (id, farm_id, date, category, description, amount, quantity, unit)
+VALUES (:id, :farm_id, :date, :category, :description, :amount, :quantity, :unit)
+"""
+
+INSERT_HARVEST = """
+INSERT INTO harvests (id, farm_id, crop_id, harvest_date, quantity, unit,
+                      price_per_unit, total_value, quality)
+VALUES (:id, :farm_id, :crop_id, :harvest_date, :quantity, :unit,
+        :price_per_unit, :total_value, :quality)
+"""
+
+INSERT_SOIL_TEST = """
+INSERT INTO soil_tests (id, farm_id, test_date, ph, nitrogen, phosphorus, potassium, organic_matter)
+VALUES (:id, :farm_id, :test_date, :ph, :nitrogen, :phosphorus, :potassium, :organic_matter)
+"""
+
+SELECT_FARMS = "SELECT * FROM farms ORDER BY id"
+SELECT_FARM = "SELECT * FROM farms WHERE id = ?"
+SELECT_CROPS = "SELECT * FROM crops WHERE farm_id = ? ORDER BY id"
+SELECT_EXPENSES = "SELECT * FROM expenses WHERE farm_id = ? ORDER BY date DESC, id DESC LIMIT ?"
+SELECT_HARVESTS = """
+SELECT h.*, c.crop_name
+FROM harvests h LEFT JOIN crops c ON c.id = h.crop_id
+WHERE h.farm_id = ?
+ORDER BY h.harvest_date DESC, h.id DESC
+LIMIT ?
+"""
+SELECT_FARM_TOTALS = """
+SELECT f.*, t.total_expenses, t.total_revenue, t.expense_count, t.harvest_count,
+       t.active_crops, t.mature_crops
+FROM farms f LEFT JOIN farm_totals t ON t.farm_id = f.id
+WHERE f.id = ?
+"""
+# The newest soil test of every farm taken on or before a date
+SELECT_LATEST_SOIL_TESTS = """
+SELECT s.*
+FROM soil_tests s
+WHERE s.id = (
+    SELECT id FROM soil_tests
+    WHERE farm_id = s.farm_id AND test_date <= ?
+    ORDER BY test_date DESC, id DESC
+    LIMIT 1
+)
+ORDER BY s.farm_id
+"""
+SELECT_DATA_VERSION = "SELECT value FROM store_meta WHERE key = 'data_version'"
+SELECT_MONTHLY_TOTALS = """
+SELECT month, expenses, revenue
+FROM farm_monthly_totals
+WHERE farm_id = ?
+ORDER BY month
+"""
+
+
+class FarmStore(SQLiteStore):
+    """
+    Durable storage for farms, crops, expenses and harvests
+    """
+
+    schema = FARM_SCHEMA + AGGREGATE_SCHEMA
+
+    def __init__(self, db_path=None):
+        super().__init__(db_path)
+        # Databases created before the aggregate tables existed need one backfill
+        with self.transaction() as conn:
+            has_farms = conn.execute("SELECT 1 FROM farms LIMIT 1").fetchone()
+            has_totals = conn.execute("SELECT 1 FROM farm_totals LIMIT 1").fetchone()
+            if has_farms and not has_totals:
+                self.rebuild_aggregates()
+
+    def rebuild_aggregates(self):
+        """
+        Recompute the materialized farm aggregates from the ledger tables
+        """
+        with self.transaction() as conn:
+            for statement in REBUILD_AGGREGATES.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+
+    def is_empty(self):
+        """
+        Check whether any farm has been stored yet
+        """
+        return self.query_one("SELECT 1 AS found FROM farms LIMIT 1") is None
+
+    def seed(self, farm_data):
+        """
+        Insert the given records only if the store has no farms yet
+
+        The check and the inserts share one write transaction, so two workers
+        starting at the same time cannot both seed.
+        """
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM farms LIMIT 1").fetchone():
+                return False
+            self.add_farms(farm_data.get("farms", []))
+            self.add_crops(farm_data.get("crops", []))
+            self.add_expenses(farm_data.get("expenses", []))
+            self.add_harvests(farm_data.get("harvests", []))
+            self.add_soil_tests(farm_data.get("soil_tests", []))
+        return True
+
+    def _insert_many(self, sql, rows, columns):
+        rows = [{column: row.get(column) for column in columns} for row in rows]
+        if not rows:
+            return 0
+        with self.transaction() as conn:
+            conn.executemany(sql, rows)
+        return len(rows)
+
+    def add_farms(self, farms):
+        """
+        Batch insert farms
+        """
+        return self._insert_many(INSERT_FARM, farms, [
+            "id", "name", "location", "area_acres", "soil_type", "established", "owner"
+        ])
+
+    def add_crops(self, crops):
+        """
+        Batch insert crops
+        """
+        return self._insert_many(INSERT_CROP, crops, [
+            "id", "farm_id", "crop_name", "variety", "planting_date", "expected_harvest",
+            "area_acres", "status", "yield_expected", "yield_actual"
+        ])
+
+    def add_expenses(self, expenses):
+        """
+        Batch insert expenses
+        """
+        return self._insert_many(INSERT_EXPENSE, expenses, [
+            "id", "farm_id", "date", "category", "description", "amount", "quantity", "unit"
+        ])
+
+    def add_harvests(self, harvests):
+        """
+        Batch insert harvests
+        """
+        return self._insert_many(INSERT_HARVEST, harvests, [
+            "id", "farm_id", "crop_id", "harvest_date", "quantity", "unit",
+            "price_per_unit", "total_value", "quality"
+        ])
+
+    def add_soil_tests(self, soil_tests):
+        """
+        Batch insert soil test results
+        """
+        return self._insert_many(INSERT_SOIL_TEST, soil_tests, [
+            "id", "farm_id", "test_date", "ph", "nitrogen", "phosphorus", "potassium", "organic_matter"
+        ])
+
+    def add_expense(self, expense):
+        """
+        Insert a single expense
+        """
+        self.add_expenses([expense])
+
+    def add_harvest(self, harvest):
+        """
+        Insert a single harvest
+        """
+        self.add_harvests([harvest])
+
+    def _update_row(self, table, row_id, fields, columns):
+        fields = {column: value for column, value in fields.items() if column in columns}
+        if not fields:
+            return False
+        assignments = ", ".join(f"{column} = :{column}" for column in fields)
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE {table} SET {assignments} WHERE id = :row_id",
+                dict(fields, row_id=row_id)
+            )
+        return cursor.rowcount > 0
+
+    def update_expense(self, expense_id, **fields):
+        """
+        Edit an expense; the farm aggregates follow through triggers
+        """
+        return self._update_row("expenses", expense_id, fields, [
+            "farm_id", "date", "category", "description", "amount", "quantity", "unit"
+        ])
+
+    def update_harvest(self, harvest_id, **fields):
+        """
+        Edit a harvest; the farm aggregates follow through triggers
+        """
+        return self._update_row("harvests", harvest_id, fields, [
+            "farm_id", "crop_id", "harvest_date", "quantity", "unit",
+            "price_per_unit", "total_value", "quality"
+        ])
+
+    def update_crop(self, crop_id, **fields):
+        """
+        Edit a crop, e.g. to move it from Growing to Mature
+        """
+        return self._update_row("crops", crop_id, fields, [
+            "crop_name", "variety", "planting_date", "expected_harvest",
+            "area_acres", "status", "yield_expected", "yield_actual"
+        ])
+
+    def get_farms(self):
+        """
+        Get all farms
+        """
+        return self.query(SELECT_FARMS)
+
+    def get_farm(self, farm_id):
+        """
+        Get a single farm
+        """
+        return self.query_one(SELECT_FARM, (farm_id,))
+
+    def get_farm_totals(self, farm_id):
+        """
+        Get a farm together with its materialized totals in one indexed lookup
+        """
+        return self.query_one(SELECT_FARM_TOTALS, (farm_id,))
+
+    def get_monthly_totals(self, farm_id):
+        """
+        Get the materialized per-month expenses and revenue for a farm
+        """
+        return self.query(SELECT_MONTHLY_TOTALS, (farm_id,))
+
+    def get_latest_soil_tests(self, as_of):
+        """
+        Get each farm's most recent soil test taken on or before a date
+        """
+        return self.query(SELECT_LATEST_SOIL_TESTS, (as_of,))
+
+    def get_data_version(self):
+        """
+        Get a counter that changes whenever any farm record is written
+        """
+        return self.connection().execute(SELECT_DATA_VERSION).fetchone()[0]
+
+    def get_crops(self, farm_id):
+        """
+        Get crops for a farm
+        """
+        return self.query(SELECT_CROPS, (farm_id,))
+
+    def get_expenses(self, farm_id, limit=None):
+        """
+        Get expenses for a farm, newest first
+        """
+        return self.query(SELECT_EXPENSES, (farm_id, -1 if limit is None else limit))
+
+    def get_harvests(self, farm_id, limit=None):
+        """
+        Get harvests for a farm with their crop name, newest first
+        """
+        return self.query(SELECT_HARVESTS, (farm_id, -1 if limit is None else limit))
+
+
+def get_farm_store(db_path=None):
+    """
+    Get the process-wide FarmStore for a database file
+    """
+    return get_store(FarmStore, db_path)
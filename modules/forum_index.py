@@ -0,0 +1,164 @@
+import bisect
+from collections import defaultdict
+from datetime import date
+
+SORT_ORDERS = {
+    "Most Recent": "recent",
+    "Most Popular": "votes",
+    "Most Answers": "answers",
+    "Unsolved": "unsolved"
+}
+
+
+def _day(value):
+    try:
+        return date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+class ForumQueryIndex:
+    """
+    Precomputed sort orders over forum questions with cursor pagination
+
+    Each sort order is kept as an ascending list of sort keys, one list for
+    the whole forum and one per category. A key sorts in display order and
+    ends with the negated question id, so it is unique and doubles as the
+    page cursor. Fetching a page is a bisect plus a slice, whatever the
+    size of the forum.
+    """
+
+    def __init__(self, questions=None, answers=None):
+        self.questions = {}
+        self.keys = {}
+        self.orders = defaultdict(list)
+        self.answers_by_question = defaultdict(list)
+
+        for question in questions or []:
+            self.add_question(question)
+        for answer in answers or []:
+            self.answers_by_question[answer["question_id"]].append(answer)
+
+    @staticmethod
+    def _sort_keys(question):
+        """
+        Get the sort key of a question for each order it belongs to
+        """
+        question_id = question["id"]
+        recent = (-_day(question.get("date")), -question_id)
+        keys = {
+            "recent": recent,
+            "votes": (-question.get("votes", 0), -question_id),
+            "answers": (-question.get("answers_count", 0), -question_id)
+        }
+        if not question.get("solved"):
+            keys["unsolved"] = recent
+        return keys
+
+    def _insert(self, question):
+        keys = self._sort_keys(question)
+        self.keys[question["id"]] = keys
+        for order, key in keys.items():
+            bisect.insort(self.orders[(order, None)], key)
+            bisect.insort(self.orders[(order, question.get("category"))], key)
+
+    def _remove(self, question):
+        keys = self.keys.pop(question["id"], {})
+        for order, key in keys.items():
+            for scope in (None, question.get("category")):
+                ordered = self.orders[(order, scope)]
+                index = bisect.bisect_left(ordered, key)
+                if index < len(ordered) and ordered[index] == key:
+                    del ordered[index]
+
+    def add_question(self, question):
+        """
+        Add a question, or re-file it after its votes, answers or status changed
+        """
+        existing = self.questions.get(question["id"])
+        if existing is not None:
+            self._remove(existing)
+        self.questions[question["id"]] = question
+        self._insert(question)
+
+    def update_question(self, question_id, **fields):
+        """
+        Change fields of an indexed question and move it in the sort orders
+        """
+        question = self.questions[question_id]
+        self._remove(question)
+        question.update(fields)
+        self._insert(question)
+        return question
+
+    def add_answer(self, answer):
+        """
+        Index an answer and bump its question's answer count
+        """
+        self.answers_by_question[answer["question_id"]].append(answer)
+        question = self.questions.get(answer["question_id"])
+        if question is not None:
+            self.update_question(question["id"], answers_count=question.get("answers_count", 0) + 1)
+
+    def set_answer(self, answer):
+        """
+        Index an answer, or replace the indexed copy with the same id, without
+        touching its question's answer count
+        """
+        answers = self.answers_by_question[answer["question_id"]]
+        for position, existing in enumerate(answers):
+            if existing["id"] == answer["id"]:
+                answers[position] = answer
+                return False
+        answers.append(answer)
+        return True
+
+    def get_answers(self, question_id):
+        """
+        Get the answers posted to a question
+        """
+        return self.answers_by_question.get(question_id, [])
+
+    def get_page(self, sort_by="Most Recent", category=None, cursor=None, page_size=10, allowed_ids=None):
+        """
+        Get one page of questions and the cursor for the next page
+
+        The cursor is the sort key of the last question on the page; it is
+        None once the last page has been reached. With allowed_ids (e.g. a
+        tag filter) the order is walked from the cursor's position until the
+        page is full, so the cost depends on how sparse the filter is, not on
+        how deep the page is.
+        """
+        if category == "All Categories":
+            category = None
+        ordered = self.orders.get((SORT_ORDERS.get(sort_by, "recent"), category), [])
+
+        start = bisect.bisect_right(ordered, tuple(cursor)) if cursor else 0
+        if allowed_ids is None:
+            page_keys = ordered[start:start + page_size + 1]
+        else:
+            # Indexed from the cursor's position; islice would step through
+            # every key before it
+            page_keys = []
+            for position in range(start, len(ordered)):
+                key = ordered[position]
+                if -key[-1] in allowed_ids:
+                    page_keys.append(key)
+                    if len(page_keys) > page_size:
+                        break
+
+        # One extra key is fetched only to tell whether another page exists
+        has_more = len(page_keys) > page_size
+        page_keys = page_keys[:page_size]
+        questions = [self.questions[-key[-1]] for key in page_keys]
+
+        next_cursor = page_keys[-1] if has_more else None
+        return questions, next_cursor
+
+    def count(self, sort_by="Most Recent", category=None):
+        """
+        Count the questions in a sort order
+        """
+        if category == "All Categories":
+            category = None
+        return len(self.orders.get((SORT_ORDERS.get(sort_by, "recent"), category), []))
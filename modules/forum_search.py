@@ -0,0 +1,117 @@
+import heapq
+from collections import Counter, defaultdict
+
+from modules.text_index import InvertedIndex, TOKEN_PATTERN, tokenize, normalize
+
+# Title words count more than words buried in a description or an answer
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+
+
+class ForumSearch:
+    """
+    Full-text search over forum questions and their answers
+
+    Each question is one document made of its title, description, tags and
+    the text of every answer posted to it. Questions and answers can be added
+    one at a time as they are posted.
+    """
+
+    def __init__(self, questions=None, answers=None):
+        self.index = InvertedIndex()
+        self.category_docs = defaultdict(set)
+        self.tag_docs = defaultdict(set)
+        self.doc_category = {}
+        self.doc_tags = {}
+
+        for question in questions or []:
+            self.add_question(question)
+        for answer in answers or []:
+            self.add_answer(answer)
+
+    def add_question(self, question):
+        """
+        Index a question and its facets
+        """
+        question_id = question["id"]
+        if question_id in self.index:
+            self.remove_question(question_id)
+
+        tags = [normalize(tag) for tag in question.get("tags", [])]
+        tokens = (
+            tokenize(question["title"]) * TITLE_WEIGHT
+            + tokenize(question.get("description", ""))
+            + tokenize(" ".join(tags)) * TAG_WEIGHT
+        )
+        self.index.add(question_id, tokens)
+
+        self.doc_category[question_id] = question.get("category")
+        self.category_docs[question.get("category")].add(question_id)
+        self.doc_tags[question_id] = tags
+        for tag in tags:
+            self.tag_docs[tag].add(question_id)
+
+    def add_answer(self, answer):
+        """
+        Add an answer's text to its question's document
+        """
+        if answer["question_id"] in self.index:
+            self.index.add(answer["question_id"], tokenize(answer.get("content", "")))
+
+    def remove_question(self, question_id):
+        """
+        Remove a question and its facets from the index
+        """
+        self.index.remove(question_id)
+        category = self.doc_category.pop(question_id, None)
+        self.category_docs[category].discard(question_id)
+        for tag in self.doc_tags.pop(question_id, []):
+            self.tag_docs[tag].discard(question_id)
+
+    def _query_terms(self, query):
+        """
+        Tokenize a query, expanding the last word as a prefix while it is
+        still being typed
+        """
+        terms = tokenize(query)
+        if not terms or query[-1:].isspace():
+            return terms
+
+        last = TOKEN_PATTERN.findall(normalize(query))[-1]
+        expansions = self.index.expand_prefix(last) if len(last) >= 3 else []
+        return terms + [term for term in expansions if term != terms[-1]]
+
+    def filter_ids(self, category=None, tags=None):
+        """
+        Get the question ids allowed by the facet filters, or None for all
+        """
+        candidates = None
+        if category and category != "All Categories":
+            candidates = set(self.category_docs.get(category, set()))
+        for tag in tags or []:
+            tagged = self.tag_docs.get(normalize(tag), set())
+            candidates = set(tagged) if candidates is None else candidates & tagged
+        return candidates
+
+    def search(self, query, category=None, tags=None, limit=20):
+        """
+        Search questions by relevance
+
+        Returns the ranked (question_id, score) pairs together with category
+        and tag facet counts over every match, not only the returned page.
+        """
+        candidates = self.filter_ids(category, tags)
+        scores = self.index.score(self._query_terms(query), candidates)
+
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        facets = {
+            "categories": Counter(self.doc_category[doc_id] for doc_id in scores),
+            "tags": Counter(tag for doc_id in scores for tag in self.doc_tags[doc_id])
+        }
+        return ranked, facets
+
+    def get_tags(self):
+        """
+        Get all indexed tags, most used first
+        """
+        return sorted((tag for tag, docs in self.tag_docs.items() if docs), key=lambda tag: -len(self.tag_docs[tag]))
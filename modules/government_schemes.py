@@ -3,8 +3,19 @@ import pandas as pd
 from datetime import datetime, timedelta
 import json
 
+from modules.cache import cached
+from modules.application_store import FINAL_STATUSES, STATUS_FLOW, get_application_store, status_progress
+from modules.eligibility_rules import EligibilityIndex, RULE_LABELS
+from modules.instrumentation import timed
+
+SAMPLE_FARMER_ID = "KL-FARMER-0001"
+
 class GovernmentSchemes:
-    def __init__(self):
+    @timed()
+    def __init__(self, application_store=None):
+        # Opened on first use, so that readers of the scheme list alone
+        # never open the applications database
+        self._application_store = application_store
         self.schemes = [
             {
                 "id": 1,
@@ -34,7 +45,13 @@ class GovernmentSchemes:
                 ],
                 "status": "Active",
                 "deadline": "Ongoing",
-                "category": "Income Support"
+                "category": "Income Support",
+                "rules": {
+                    "min_landholding": 0.1,
+                    "farmer_types": ["Small", "Marginal", "Medium", "Large", "All"],
+                    "income_bands": ["Below ₹1 lakh", "₹1-2 lakh", "₹2-5 lakh"],
+                    "bank_account": True
+                }
             },
             {
                 "id": 2,
@@ -64,7 +81,10 @@ class GovernmentSchemes:
                 ],
                 "status": "Active",
                 "deadline": "Ongoing",
-                "category": "Soil Health"
+                "category": "Soil Health",
+                "rules": {
+                    "min_landholding": 0.1
+                }
             },
             {
                 "id": 3,
@@ -95,7 +115,11 @@ class GovernmentSchemes:
                 ],
                 "status": "Active",
                 "deadline": "Before sowing season",
-                "category": "Insurance"
+                "category": "Insurance",
+                "rules": {
+                    "crop_types": ["Food Crops", "Cash Crops", "Horticulture", "All"],
+                    "bank_account": True
+                }
             },
             {
                 "id": 4,
@@ -127,7 +151,10 @@ class GovernmentSchemes:
                 ],
                 "status": "Active",
                 "deadline": "Ongoing",
-                "category": "Credit"
+                "category": "Credit",
+                "rules": {
+                    "farmer_types": ["Small", "Marginal", "Medium", "Large", "All"]
+                }
             },
             {
                 "id": 5,
@@ -159,7 +186,11 @@ class GovernmentSchemes:
                 ],
                 "status": "Active",
                 "deadline": "31st March 2024",
-                "category": "Food Processing"
+                "category": "Food Processing",
+                "rules": {
+                    "farmer_types": ["Farmer Producer Organization"],
+                    "bank_account": True
+                }
             },
             {
                 "id": 6,
@@ -190,59 +221,41 @@ class GovernmentSchemes:
                 ],
                 "status": "Active",
                 "deadline": "Ongoing",
-                "category": "State Scheme"
+                "category": "State Scheme",
+                "rules": {
+                    "min_landholding": 0.1,
+                    "max_landholding": 5.0,
+                    "farmer_types": ["Small", "Marginal"],
+                    "states": ["Kerala"]
+                }
             }
         ]
         
         self.categories = list(set(scheme["category"] for scheme in self.schemes))
+        self._eligibility_index = None
     
+    def get_eligibility_index(self):
+        """
+        Get the scheme rules compiled for matching, building them on first use
+        """
+        if self._eligibility_index is None:
+            self._eligibility_index = EligibilityIndex(self.schemes)
+        return self._eligibility_index
+    
+    @timed()
+    @cached("schemes.eligible", key=lambda self, farmer_profile: farmer_profile)
     def get_eligible_schemes(self, farmer_profile):
         """
         Get schemes eligible for a farmer based on their profile
-        """
-        eligible_schemes = []
-        
-        for scheme in self.schemes:
-            eligibility_score = 0
-            total_criteria = 0
-            
-            # Check landholding criteria
-            if "landholding" in farmer_profile:
-                if farmer_profile["landholding"] > 0:
-                    eligibility_score += 1
-                total_criteria += 1
-            
-            # Check farmer type
-            if "farmer_type" in farmer_profile:
-                if farmer_profile["farmer_type"] in ["Small", "Marginal", "All"]:
-                    eligibility_score += 1
-                total_criteria += 1
-            
-            # Check state
-            if "state" in farmer_profile:
-                if farmer_profile["state"] == "Kerala":
-                    eligibility_score += 1
-                total_criteria += 1
-            
-            # Check crop type
-            if "crop_type" in farmer_profile:
-                if farmer_profile["crop_type"] in ["Food Crops", "Cash Crops", "All"]:
-                    eligibility_score += 1
-                total_criteria += 1
-            
-            # Calculate eligibility percentage
-            if total_criteria > 0:
-                eligibility_percentage = (eligibility_score / total_criteria) * 100
-                
-                if eligibility_percentage >= 50:  # At least 50% match
-                    scheme_copy = scheme.copy()
-                    scheme_copy["eligibility_score"] = eligibility_percentage
-                    eligible_schemes.append(scheme_copy)
         
-        # Sort by eligibility score
-        eligible_schemes.sort(key=lambda x: x["eligibility_score"], reverse=True)
-        
-        return eligible_schemes
+        Schemes the profile meets in full come first; schemes missed on a
+        single rule follow with the share of their rules that were met.
+        """
+        return [
+            dict(scheme, eligibility_score=score, unmet_rule=RULE_LABELS.get(unmet))
+            for scheme, score, unmet in self.get_eligibility_index().evaluate(farmer_profile)
+            if score >= 50
+        ]
     
     def render_schemes_dashboard(self):
         """
@@ -263,7 +276,7 @@ class GovernmentSchemes:
             with col1:
                 farmer_type = st.selectbox(
                     "Farmer Type",
-                    ["Small", "Marginal", "Medium", "Large", "All"]
+                    ["Small", "Marginal", "Medium", "Large", "Farmer Producer Organization", "All"]
                 )
                 
                 landholding = st.number_input(
@@ -294,22 +307,22 @@ class GovernmentSchemes:
             
             submitted = st.form_submit_button("🔍 Find Eligible Schemes", type="primary")
             
-            if submitted:
-                # Create farmer profile
-                farmer_profile = {
-                    "farmer_type": farmer_type,
-                    "landholding": landholding,
-                    "state": state,
-                    "crop_type": crop_type,
-                    "annual_income": annual_income,
-                    "has_bank_account": has_bank_account
-                }
-                
-                # Get eligible schemes
-                eligible_schemes = self.get_eligible_schemes(farmer_profile)
-                
-                # Display results
-                self._display_eligible_schemes(eligible_schemes, farmer_profile)
+        if submitted:
+            # Create farmer profile
+            farmer_profile = {
+                "farmer_type": farmer_type,
+                "landholding": landholding,
+                "state": state,
+                "crop_type": crop_type,
+                "annual_income": annual_income,
+                "has_bank_account": has_bank_account
+            }
+            
+            # Get eligible schemes
+            eligible_schemes = self.get_eligible_schemes(farmer_profile)
+            
+            # Display results
+            self._display_eligible_schemes(eligible_schemes, farmer_profile)
         
         # Browse all schemes
         st.markdown("### 📋 Browse All Schemes")
@@ -388,6 +401,8 @@ class GovernmentSchemes:
                 with col3:
                     if st.button(f"Save", key=f"save_{scheme['id']}"):
                         st.success("Scheme saved to your list")
+        
+        self.render_application_tracker()
     
     def _display_eligible_schemes(self, eligible_schemes, farmer_profile):
         """
@@ -408,6 +423,8 @@ class GovernmentSchemes:
                     st.markdown(f"**Description:** {scheme['description']}")
                     st.markdown(f"**Category:** {scheme['category']}")
                     st.markdown(f"**Status:** {scheme['status']}")
+                    if scheme['unmet_rule']:
+                        st.markdown(f"**Not met:** {scheme['unmet_rule']}")
                 
                 with col2:
                     st.metric("Eligibility", f"{scheme['eligibility_score']:.0f}%")
@@ -453,38 +470,63 @@ class GovernmentSchemes:
             
             st.dataframe(df, use_container_width=True)
     
-    def render_application_tracker(self):
-        """
-        Render application tracking interface
+    @property
+    def application_store(self):
+        if self._application_store is None:
+            self._application_store = get_application_store()
+        return self._application_store
+    
+    def load_sample_applications(self, farmer_id):
         """
-        st.markdown("### 📋 Application Tracker")
+        Load sample applications with their status history
         
-        # Sample application data
-        applications = [
-            {
-                "scheme_name": "PM-KISAN",
+        The check and the inserts share one write transaction, so sessions
+        opening the page at the same time cannot both load them.
+        """
+        with self.application_store.transaction():
+            if not self.application_store.is_empty():
+                return
+            
+            self.application_store.create_application({
                 "application_id": "PMK001234",
+                "farmer_id": farmer_id,
+                "scheme_id": 1,
+                "scheme_name": "PM-KISAN",
                 "applied_date": "2024-01-15",
-                "status": "Under Review",
-                "last_updated": "2024-01-20",
                 "expected_decision": "2024-02-15"
-            },
-            {
-                "scheme_name": "Soil Health Card",
+            })
+            self.application_store.create_application({
                 "application_id": "SHC005678",
+                "farmer_id": farmer_id,
+                "scheme_id": 2,
+                "scheme_name": "Soil Health Card",
                 "applied_date": "2024-01-10",
-                "status": "Approved",
-                "last_updated": "2024-01-18",
                 "expected_decision": "2024-01-25"
-            }
-        ]
+            })
+            self.application_store.record_statuses([
+                {"application_id": "PMK001234", "status": "Under Review", "event_date": "2024-01-20"},
+                {"application_id": "SHC005678", "status": "Under Review", "event_date": "2024-01-12"},
+                {"application_id": "SHC005678", "status": "Approved", "event_date": "2024-01-18"}
+            ])
+    
+    @timed()
+    def render_application_tracker(self, farmer_id=SAMPLE_FARMER_ID):
+        """
+        Render application tracking interface
+        """
+        st.markdown("### 📋 Application Tracker")
+        
+        self.load_sample_applications(farmer_id)
+        applications = self.application_store.get_farmer_applications(farmer_id)
         
         for app in applications:
+            history = self.application_store.get_history(app['application_id'])
+            
             with st.expander(f"{app['scheme_name']} - {app['application_id']}", expanded=True):
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
-                    st.markdown(f"**Status:** {app['status']}")
+                    st.markdown(f"**Status:** {app['current_status']}")
                     st.markdown(f"**Applied:** {app['applied_date']}")
                 
                 with col2:
@@ -492,24 +534,22 @@ class GovernmentSchemes:
                     st.markdown(f"**Expected Decision:** {app['expected_decision']}")
                 
                 with col3:
-                    if app['status'] == 'Approved':
+                    if app['current_status'] == 'Approved':
                         st.success("✅ Approved")
-                    elif app['status'] == 'Under Review':
+                    elif app['current_status'] == 'Under Review':
                         st.warning("⏳ Under Review")
-                    elif app['status'] == 'Rejected':
+                    elif app['current_status'] == 'Rejected':
                         st.error("❌ Rejected")
                     else:
                         st.info("ℹ️ Pending")
                 
-                # Progress bar
-                if app['status'] == 'Under Review':
-                    progress = 0.6
-                elif app['status'] == 'Approved':
-                    progress = 1.0
-                else:
-                    progress = 0.3
+                # Progress through the workflow, from the status history
+                st.progress(status_progress(history))
                 
-                st.progress(progress)
+                st.markdown("**History:**")
+                for event in history:
+                    note = f" — {event['note']}" if event['note'] else ""
+                    st.markdown(f"• {event['event_date']}: {event['status']}{note}")
                 
                 # Action buttons
                 col1, col2 = st.columns(2)
@@ -521,3 +561,57 @@ class GovernmentSchemes:
                 with col2:
                     if st.button(f"Download Certificate", key=f"download_{app['application_id']}"):
                         st.info("Certificate download would start here")
+        
+        self._render_officer_queue()
+    
+    def _render_officer_queue(self):
+        """
+        Render the officer view of applications by status and age
+        """
+        st.markdown("### 🗂️ Officer Queue")
+        
+        status_counts = self.application_store.get_status_counts()
+        breaches = self.application_store.count_sla_breaches()
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("Open Applications", sum(
+                count for status, count in status_counts.items() if status not in FINAL_STATUSES
+            ))
+        
+        with col2:
+            st.metric("Decided", sum(
+                count for status, count in status_counts.items() if status in FINAL_STATUSES
+            ))
+        
+        with col3:
+            st.metric("SLA Breaches", breaches)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            status_filter = st.selectbox(
+                "Current Status",
+                STATUS_FLOW + ["Rejected"],
+                index=1,
+                key="officer_status"
+            )
+        
+        with col2:
+            older_than = st.number_input("In this status for more than (days)", 0, 3650, 30, key="officer_days")
+        
+        matches = self.application_store.find_applications(status_filter, older_than_days=older_than)
+        if matches:
+            st.dataframe(pd.DataFrame([
+                {
+                    "Application": app["application_id"],
+                    "Scheme": app["scheme_name"],
+                    "Farmer": app["farmer_id"],
+                    "Applied": app["applied_date"],
+                    "In Status Since": app["status_since"]
+                }
+                for app in matches
+            ]), use_container_width=True)
+        else:
+            st.info("No applications match this filter.")
@@ -0,0 +1,273 @@
+import bisect
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import streamlit as st
+
+# Histogram bucket upper bounds in seconds, as in Prometheus client defaults
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+# Latency objective for a full page render
+PAGE_RENDER_SLO_SECONDS = float(os.getenv("KERALA_PAGE_SLO_MS", "1500")) / 1000
+
+# Name under which whole page renders are recorded
+PAGE_RENDER = "page.render"
+
+_current_page = contextvars.ContextVar("current_page", default="")
+_enabled = os.getenv("KERALA_INSTRUMENTATION", "").lower() in ("1", "true", "yes")
+
+_NOT_TIMED = nullcontext()
+
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed buckets
+    """
+
+    __slots__ = ("counts", "count", "total", "maximum")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def quantile(self, q):
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+
+class Registry:
+    """
+    Latency histograms per page and instrumented name
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, page, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get((page, name))
+            if histogram is None:
+                histogram = self.histograms[(page, name)] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def summary(self):
+        """
+        Get one row per page and name with call count and latencies in ms,
+        slowest total time first
+        """
+        with self._lock:
+            items = list(self.histograms.items())
+        rows = [
+            {
+                "page": page,
+                "name": name,
+                "calls": histogram.count,
+                "total_ms": histogram.total * 1000,
+                "mean_ms": histogram.total / histogram.count * 1000,
+                "p50_ms": histogram.quantile(0.5) * 1000,
+                "p95_ms": histogram.quantile(0.95) * 1000,
+                "max_ms": histogram.maximum * 1000
+            }
+            for (page, name), histogram in items
+        ]
+        rows.sort(key=lambda row: -row["total_ms"])
+        return rows
+
+    def prometheus_text(self):
+        """
+        Render the histograms in the Prometheus text exposition format
+        """
+        with self._lock:
+            items = sorted(self.histograms.items())
+        families = [
+            ("kerala_page_render_seconds", "Time to render a dashboard page",
+             [(f'page="{page}"', histogram) for (page, name), histogram in items if name == PAGE_RENDER]),
+            ("kerala_function_duration_seconds", "Time spent in instrumented functions and blocks",
+             [(f'page="{page}",function="{name}"', histogram) for (page, name), histogram in items
+              if name != PAGE_RENDER])
+        ]
+        lines = []
+        for metric, help_text, series in families:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, histogram in series:
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{metric}_sum{{{labels}}} {histogram.total:.6f}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def is_enabled():
+    """
+    Check whether timings are being recorded
+    """
+    return _enabled
+
+
+def set_enabled(enabled):
+    """
+    Turn recording on or off for the whole process
+    """
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def _observe(name, seconds):
+    registry.observe(_current_page.get(), name, seconds)
+
+
+@contextmanager
+def _timer(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _observe(name, time.perf_counter() - started)
+
+
+def timer(name):
+    """
+    Time a block under a name, attributed to the page being rendered
+
+    When instrumentation is off this returns a shared no-op context.
+    """
+    if not _enabled:
+        return _NOT_TIMED
+    return _timer(name)
+
+
+def timed(name=None):
+    """
+    Decorator timing every call of a function
+
+    The name defaults to the function's module-relative qualified name,
+    e.g. "market_prices.MarketPrices.get_price_trends". When instrumentation
+    is off the wrapper costs one global lookup per call.
+    """
+    def decorate(func):
+        label = name or f"{func.__module__.rpartition('.')[2]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _observe(label, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def page_timer(page):
+    """
+    Attribute everything timed inside the block to a page and time the
+    page render itself
+    """
+    token = _current_page.set(page)
+    try:
+        with timer(PAGE_RENDER):
+            yield
+    finally:
+        _current_page.reset(token)
+
+
+def slow_pages(slo_seconds=PAGE_RENDER_SLO_SECONDS):
+    """
+    Get the pages whose p95 render time is past the SLO, with their
+    slowest instrumented functions
+    """
+    rows = registry.summary()
+    pages = {row["page"]: row for row in rows if row["name"] == PAGE_RENDER}
+    result = []
+    for page, render in pages.items():
+        if render["p95_ms"] > slo_seconds * 1000:
+            culprits = [row for row in rows if row["page"] == page and row["name"] != PAGE_RENDER]
+            culprits.sort(key=lambda row: -row["p95_ms"])
+            result.append((render, culprits[:5]))
+    return result
+
+
+def render_diagnostics_page():
+    """
+    Render the hidden diagnostics page with the recorded timings
+    """
+    # Imported here so that instrumenting a module never pulls in pandas
+    import pandas as pd
+    from modules.cache import cache_stats
+    from modules.refresh_scheduler import get_scheduler
+
+    st.markdown("## 🩺 Diagnostics")
+
+    enabled = st.toggle("Record timings", value=is_enabled())
+    if enabled != is_enabled():
+        set_enabled(enabled)
+        st.rerun()
+    if st.button("Reset timings"):
+        registry.reset()
+        st.rerun()
+
+    st.markdown("### Background refresh")
+    st.dataframe(pd.DataFrame(get_scheduler().status()), use_container_width=True, hide_index=True)
+
+    st.markdown("### Caches")
+    st.dataframe(pd.DataFrame(cache_stats()).round(3), use_container_width=True, hide_index=True)
+
+    rows = registry.summary()
+    if not rows:
+        st.info("No timings recorded yet. Turn recording on and visit some pages.")
+        return
+
+    st.markdown(f"### Pages past the {PAGE_RENDER_SLO_SECONDS * 1000:.0f} ms SLO (p95)")
+    offenders = slow_pages()
+    if not offenders:
+        st.success("Every page renders within the SLO.")
+    for render, culprits in offenders:
+        st.warning(f"{render['page']}: p95 {render['p95_ms']:.0f} ms over {render['calls']} renders")
+        if culprits:
+            st.dataframe(pd.DataFrame(culprits).round(2), use_container_width=True, hide_index=True)
+
+    st.markdown("### All timings")
+    st.dataframe(pd.DataFrame(rows).round(2), use_container_width=True, hide_index=True)
+
+    st.markdown("### Prometheus")
+    text = registry.prometheus_text()
+    st.download_button("Download metrics", text, file_name="metrics.txt", mime="text/plain")
+    st.code(text, language="text")
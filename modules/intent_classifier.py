@@ -0,0 +1,220 @@
+import functools
+import json
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from modules.intent_examples import INTENT_EXAMPLES
+from modules.intent_matcher import INTENT_KEYWORDS, get_intent_matcher
+from modules.text_index import STOPWORDS, TOKEN_PATTERN, normalize
+
+DEFAULT_MODEL_PATH = os.getenv("KERALA_INTENT_MODEL", os.path.join("data", "intent_model.npz"))
+
+# Hashed feature space shared by character n-grams and whole words
+NUM_FEATURES = 2 ** 15
+NGRAM_SIZES = (2, 3, 4)
+
+# Repeats of an intent's keyword-match feature per unit of its match score;
+# lets the model learn how far to trust the keyword lists
+KEYWORD_FEATURE_WEIGHT = 8
+
+# Below this probability the keyword matcher decides instead
+MIN_CONFIDENCE = 0.45
+
+
+@functools.lru_cache(maxsize=100000)
+def _word_features(word):
+    """
+    Get the hashed character n-grams of a word, plus the word itself
+    """
+    padded = f" {word} "
+    grams = [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+    grams.append(f"w:{word}")
+    return tuple(zlib.crc32(gram.encode("utf-8")) % NUM_FEATURES for gram in grams)
+
+
+@functools.lru_cache(maxsize=None)
+def _keyword_feature(intent):
+    return zlib.crc32(f"k:{intent}".encode("utf-8")) % NUM_FEATURES
+
+
+def featurize(text):
+    """
+    Get the hashed feature ids of a text; repeated ids count repeatedly
+    """
+    features = []
+    for word in TOKEN_PATTERN.findall(normalize(text or "")):
+        if word not in STOPWORDS:
+            features.extend(_word_features(word))
+    for intent, score in get_intent_matcher().match(text).items():
+        features.extend([_keyword_feature(intent)] * round(KEYWORD_FEATURE_WEIGHT * score))
+    return features
+
+
+def _fingerprint(examples):
+    payload = json.dumps([examples, INTENT_KEYWORDS], sort_keys=True, ensure_ascii=False)
+    payload += f"|{NUM_FEATURES}|{NGRAM_SIZES}|{KEYWORD_FEATURE_WEIGHT}"
+    return zlib.crc32(payload.encode("utf-8"))
+
+
+class IntentClassifier:
+    """
+    Linear intent classifier over hashed character n-grams
+
+    Character n-grams make the model robust to inflection, spelling
+    variants and mixed scripts, and hashing keeps the weight matrix a fixed
+    size whatever the vocabulary. Scoring a query is a sum of a few hundred
+    weight rows, so a batch of queries is one gather and one reduceat.
+    """
+
+    def __init__(self, intents, weights, bias):
+        self.intents = list(intents)
+        self.weights = weights.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+
+    @classmethod
+    def train(cls, examples=None, epochs=300, learning_rate=10.0, l2=1e-3, seed=0):
+        """
+        Fit a multinomial logistic regression on labelled examples
+        """
+        examples = examples or INTENT_EXAMPLES
+        intents = list(examples)
+        texts = [text for intent in intents for text in examples[intent]]
+        labels = np.array([position for position, intent in enumerate(intents) for _ in examples[intent]])
+
+        # Only the hashed features seen in training can get a weight, so
+        # the model is fitted on those columns and scattered back afterwards
+        feature_lists = [featurize(text) for text in texts]
+        active = np.unique(np.fromiter((f for ids in feature_lists for f in ids), dtype=np.int64))
+        columns = {feature: column for column, feature in enumerate(active)}
+        features = np.zeros((len(texts), len(active)), dtype=np.float32)
+        for row, ids in enumerate(feature_lists):
+            for feature in ids:
+                features[row, columns[feature]] += 1.0 / np.sqrt(len(ids))
+        targets = np.eye(len(intents), dtype=np.float32)[labels]
+
+        rng = np.random.RandomState(seed)
+        active_weights = rng.normal(0, 0.01, (len(active), len(intents))).astype(np.float32)
+        bias = np.zeros(len(intents), dtype=np.float32)
+        for _ in range(epochs):
+            probabilities = _softmax(features @ active_weights + bias)
+            error = (probabilities - targets) / len(texts)
+            active_weights -= learning_rate * (features.T @ error + l2 * active_weights)
+            bias -= learning_rate * error.sum(axis=0)
+
+        weights = np.zeros((NUM_FEATURES, len(intents)), dtype=np.float32)
+        weights[active] = active_weights
+        return cls(intents, weights, bias)
+
+    def save(self, path, fingerprint=0):
+        """
+        Write the model to a compressed .npz file, weights as float16
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(
+            path,
+            intents=np.array(self.intents),
+            weights=self.weights.astype(np.float16),
+            bias=self.bias,
+            fingerprint=np.array(fingerprint, dtype=np.int64)
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a model written by save; returns (classifier, fingerprint)
+        """
+        with np.load(path) as data:
+            return cls(data["intents"].tolist(), data["weights"], data["bias"]), int(data["fingerprint"])
+
+    def predict_proba(self, texts):
+        """
+        Get the intent probabilities of a batch of texts, one row per text
+        """
+        feature_lists = [featurize(text) for text in texts]
+        scores = np.tile(self.bias, (len(texts), 1))
+
+        nonempty = [row for row, ids in enumerate(feature_lists) if ids]
+        if nonempty:
+            lengths = np.array([len(feature_lists[row]) for row in nonempty])
+            flat = np.fromiter(
+                (feature for row in nonempty for feature in feature_lists[row]),
+                dtype=np.int64,
+                count=int(lengths.sum())
+            )
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            sums = np.add.reduceat(self.weights[flat], offsets, axis=0)
+            scores[nonempty] += sums / np.sqrt(lengths)[:, None]
+
+        probabilities = _softmax(scores)
+        # Texts without a single word carry no evidence either way
+        empty = [row for row, ids in enumerate(feature_lists) if not ids]
+        probabilities[empty] = 0.0
+        return probabilities
+
+    def predict(self, texts):
+        """
+        Get the most likely (intent, probability) of each text in a batch
+        """
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        return [(self.intents[column], float(probabilities[row, column])) for row, column in enumerate(best)]
+
+
+def _softmax(scores):
+    shifted = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier(model_path=None):
+    """
+    Get the shared classifier, loading it once per process
+
+    The saved model is reused while it was trained on the current examples;
+    otherwise it is retrained and saved again.
+    """
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            model_path = model_path or DEFAULT_MODEL_PATH
+            fingerprint = _fingerprint(INTENT_EXAMPLES)
+            classifier = None
+            if os.path.exists(model_path):
+                try:
+                    classifier, saved_fingerprint = IntentClassifier.load(model_path)
+                    if saved_fingerprint != fingerprint:
+                        classifier = None
+                except (OSError, KeyError, ValueError):
+                    classifier = None
+            if classifier is None:
+                classifier = IntentClassifier.train()
+                try:
+                    classifier.save(model_path, fingerprint)
+                except OSError:
+                    pass
+            _classifier = classifier
+        return _classifier
+
+
+def classify_intents(texts, min_confidence=MIN_CONFIDENCE):
+    """
+    Get the intent of each text in a batch
+
+    The classifier decides when it is confident; otherwise the keyword
+    matcher does, and texts neither recognises get "default".
+    """
+    matcher = get_intent_matcher()
+    intents = []
+    for text, (intent, confidence) in zip(texts, get_intent_classifier().predict(texts)):
+        if confidence < min_confidence:
+            intent = matcher.best_intent(text)
+        intents.append(intent)
+    return intents
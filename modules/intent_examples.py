@@ -0,0 +1,80 @@
+# Labelled farmer queries used to train the chatbot intent classifier.
+# Add examples here and the model is retrained on next start.
+INTENT_EXAMPLES = {
+    "greeting": [
+        "hello", "hi there", "hey", "good morning", "good evening", "hello, are you there?",
+        "hi, I need some help", "namaste", "namaskaram", "vanakkam",
+        "നമസ്കാരം", "ഹലോ, സുഖമാണോ?", "ശുഭദിനം",
+        "வணக்கம்", "ஹலோ, எப்படி இருக்கிறீர்கள்?", "காலை வணக்கம்",
+        "नमस्ते", "नमस्कार, कैसे हैं आप?", "सुप्रभात"
+    ],
+    "weather": [
+        "will it rain tomorrow", "what is the weather forecast for this week",
+        "is heavy rainfall expected in Wayanad", "when does the monsoon start",
+        "temperature is very high, what should I do for my crops",
+        "too much humidity this month", "is there a flood warning",
+        "dry spell for three weeks, no rain", "should I spray before the rain",
+        "cyclone alert for the coast",
+        "നാളെ മഴ പെയ്യുമോ?", "ഈ ആഴ്ചത്തെ കാലാവസ്ഥ എങ്ങനെയാണ്?", "കാലവർഷം എപ്പോൾ തുടങ്ങും?",
+        "நாளை மழை வருமா?", "இந்த வாரம் வானிலை எப்படி இருக்கும்?", "வெப்பநிலை மிக அதிகமாக உள்ளது",
+        "कल बारिश होगी क्या?", "इस हफ्ते मौसम कैसा रहेगा?", "मानसून कब आएगा?"
+    ],
+    "disease": [
+        "my coconut leaves are turning yellow", "black spots on pepper leaves",
+        "white insects under the banana leaves", "rice plants are wilting and dying",
+        "how to control mites on coconut", "fungus on my cardamom capsules",
+        "leaves are curling and have holes", "caterpillars eating the crop",
+        "quick wilt in black pepper", "bud rot in coconut palm", "my plant looks sick",
+        "pest attack on vegetables",
+        "തെങ്ങിന്റെ ഓല മഞ്ഞളിക്കുന്നു", "കുരുമുളകിന് ദ്രുതവാട്ടം വന്നു", "വാഴയിൽ കീടങ്ങൾ കാണുന്നു",
+        "தென்னை இலைகள் மஞ்சளாகின்றன", "மிளகு செடியில் நோய் வந்துள்ளது", "பூச்சி தாக்குதல் அதிகம்",
+        "पत्तियां पीली हो रही हैं", "धान में कीट लग गए हैं", "पौधे मुरझा रहे हैं"
+    ],
+    "crop": [
+        "which crop should I grow this season", "best time to plant black pepper",
+        "how to cultivate ginger", "which rice variety gives higher yield",
+        "can I grow cardamom at low altitude", "spacing for banana planting",
+        "how many seeds per acre for paddy", "what to sow after the rice harvest",
+        "intercropping with coconut", "is tapioca good for my land",
+        "ഈ സീസണിൽ ഏത് വിള കൃഷി ചെയ്യണം?", "ഇഞ്ചി എങ്ങനെ നടാം?", "നെല്ലിന്റെ നല്ല വിത്ത് ഏതാണ്?",
+        "இந்த பருவத்தில் எந்த பயிர் பயிரிடலாம்?", "இஞ்சி சாகுபடி எப்படி?", "நெல் விதை எவ்வளவு தேவை?",
+        "इस मौसम में कौन सी फसल बोऊं?", "अदरक की खेती कैसे करें?", "धान के बीज कितने चाहिए?"
+    ],
+    "soil": [
+        "my soil is acidic, how much lime should I add", "soil pH is 5.2",
+        "which fertilizer for coconut", "nitrogen deficiency in the soil",
+        "how to make compost at home", "my plant needs more potassium in the soil",
+        "soil test report shows low phosphorus", "how much cow manure per tree",
+        "the soil is hard and drains poorly", "organic matter is low in my field",
+        "മണ്ണിന്റെ പി.എച്ച് കുറവാണ്", "തെങ്ങിന് ഏത് വളം നൽകണം?", "മണ്ണ് പരിശോധന എവിടെ ചെയ്യാം?",
+        "மண்ணின் அமிலத்தன்மை அதிகம்", "தென்னைக்கு எந்த உரம் போடலாம்?", "மண் பரிசோதனை எங்கே செய்வது?",
+        "मिट्टी की जांच कहां कराएं?", "नारियल के लिए कौन सी खाद डालें?", "मिट्टी में नाइट्रोजन की कमी है"
+    ],
+    "market": [
+        "what is the price of pepper today", "where can I sell my cardamom",
+        "rubber price is falling", "best market for bananas in Kochi",
+        "should I hold my rice or sell now", "coconut rates this week",
+        "how much per kilo for ginger", "price trend for arecanut",
+        "is the mandi open tomorrow", "traders are offering a low rate",
+        "ഇന്ന് കുരുമുളകിന്റെ വില എത്ര?", "ഏലം എവിടെ വിൽക്കാം?", "റബ്ബർ വില കുറയുന്നു",
+        "இன்று மிளகு விலை என்ன?", "ஏலக்காய் எங்கே விற்கலாம்?", "சந்தை நிலவரம் எப்படி?",
+        "आज काली मिर्च का भाव क्या है?", "इलायची कहां बेचें?", "बाजार में नारियल की कीमत"
+    ],
+    "government": [
+        "how do I apply for pm kisan", "which subsidies are available for drip irrigation",
+        "crop insurance scheme details", "how to get a kisan credit card",
+        "documents needed for the government loan", "state scheme for organic farming",
+        "am I eligible for the fasal bima yojana", "subsidy for buying a power tiller",
+        "status of my scheme application", "government support for small farmers",
+        "സർക്കാർ പദ്ധതികൾ ഏതൊക്കെയാണ്?", "കിസാൻ ക്രെഡിറ്റ് കാർഡ് എങ്ങനെ ലഭിക്കും?", "സബ്സിഡി എങ്ങനെ അപേക്ഷിക്കാം?",
+        "அரசு திட்டங்கள் என்ன உள்ளன?", "பயிர் காப்பீட்டு திட்டம் பற்றி சொல்லுங்கள்", "மானியம் எப்படி பெறுவது?",
+        "सरकारी योजना के लिए आवेदन कैसे करें?", "किसान क्रेडिट कार्ड कैसे बनवाएं?", "सब्सिडी कैसे मिलेगी?"
+    ],
+    "default": [
+        "thank you", "ok", "who are you", "tell me a joke", "what can you do",
+        "I have a question", "can you help me", "that is not what I asked",
+        "നന്ദി", "നിങ്ങൾ ആരാണ്?",
+        "நன்றி", "நீங்கள் யார்?",
+        "धन्यवाद", "आप कौन हैं?"
+    ]
+}
@@ -0,0 +1,158 @@
+import re
+from collections import Counter
+
+from modules.text_index import normalize, stem
+
+# Keywords per intent and language. Intents are listed in priority order,
+# which breaks ties between equally scored intents.
+INTENT_KEYWORDS = {
+    "greeting": {
+        "en": ["hello", "hi", "hey", "good morning", "namaste", "vanakkam", "namaskaram"],
+        "ml": ["നമസ്കാരം", "ഹലോ"],
+        "ta": ["வணக்கம்", "ஹலோ"],
+        "hi": ["नमस्ते", "नमस्कार", "हैलो"]
+    },
+    "weather": {
+        "en": ["weather", "rain", "temperature", "forecast", "monsoon", "humidity"],
+        "ml": ["മഴ", "കാലാവസ്ഥ"],
+        "ta": ["வானிலை", "மழை"],
+        "hi": ["मौसम", "बारिश"]
+    },
+    "disease": {
+        "en": ["disease", "sick", "problem", "pest", "infection", "blight"],
+        "ml": ["രോഗം", "കീടം"],
+        "ta": ["நோய்", "பூச்சி"],
+        "hi": ["रोग", "बीमारी", "कीट"]
+    },
+    "crop": {
+        "en": ["crop", "plant", "cultivate", "cultivation", "seed", "sow"],
+        "ml": ["വിള", "വിത്ത്"],
+        "ta": ["பயிர்", "சாகுபடி"],
+        "hi": ["फसल", "बीज"]
+    },
+    "soil": {
+        "en": ["soil", "fertilizer", "nutrient", "compost", "manure"],
+        "ml": ["മണ്ണ്", "വളം"],
+        "ta": ["மண்", "உரம்"],
+        "hi": ["मिट्टी", "खाद", "उर्वरक"]
+    },
+    "market": {
+        "en": ["market", "price", "sell", "mandi"],
+        "ml": ["വില", "വിപണി"],
+        "ta": ["விலை", "சந்தை"],
+        "hi": ["बाजार", "कीमत", "भाव"]
+    },
+    "government": {
+        "en": ["government", "scheme", "subsidy", "loan"],
+        "ml": ["സർക്കാർ", "പദ്ധതി"],
+        "ta": ["அரசு", "திட்டம்"],
+        "hi": ["सरकार", "योजना"]
+    }
+}
+
+# Same character class as text_index.TOKEN_PATTERN
+WORD_CHAR = r"(?:[^\W_]|[\u0900-\u0963\u0966-\u097F\u0B80-\u0BFF\u0D00-\u0D7F])"
+
+# Viramas are dropped from the end of a keyword stem, because inflected
+# forms replace them with a vowel sign (മണ്ണ് -> മണ്ണിൽ)
+VIRAMAS = "\u094D\u0BCD\u0D4D"
+
+# Latin stems this short only match whole words, so "hi" does not fire on "this"
+MIN_PREFIX_LENGTH = 4
+
+_END = ""
+
+
+def _keyword_stem(keyword):
+    """
+    Get the normalized word-start pattern text of a keyword
+
+    Returns (stem, whole_word). Single words are stemmed so inflected and
+    plural forms match as continuations of the stem.
+    """
+    words = normalize(keyword).split()
+    words[-1] = stem(words[-1]).rstrip(VIRAMAS)
+    text = " ".join(words)
+    whole_word = text.isascii() and len(text) < MIN_PREFIX_LENGTH
+    return text, whole_word
+
+
+def _trie_pattern(keywords):
+    """
+    Compile keyword stems into a regex that shares common prefixes
+
+    Alternatives branch on one character at a time, so the engine only
+    follows keywords that share the characters seen so far.
+    """
+    trie = {}
+    for text, whole_word in keywords:
+        node = trie
+        for char in text:
+            node = node.setdefault(char, {})
+        # A prefix keyword already covers every longer keyword below it
+        node[_END] = node.get(_END, True) and whole_word
+
+    def build(node):
+        if node.get(_END) is False:
+            return ""
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != _END]
+        if _END in node:
+            branches.append(f"(?!{WORD_CHAR})")
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+class IntentMatcher:
+    """
+    Detect every intent in a message with one compiled regex
+
+    Keywords of all languages are normalized and stemmed once, and compiled
+    into a single pattern with one named group per intent. Each group is a
+    prefix trie of its keywords, and matches are anchored at word starts, so
+    scanning a message is one left-to-right pass whose cost depends on the
+    message and the number of intents rather than the number of keywords.
+    """
+
+    def __init__(self, intent_keywords=None):
+        intent_keywords = intent_keywords or INTENT_KEYWORDS
+        self.intents = list(intent_keywords)
+        self.priority = {intent: rank for rank, intent in enumerate(self.intents)}
+
+        groups = []
+        for intent, languages in intent_keywords.items():
+            keywords = {_keyword_stem(keyword) for words in languages.values() for keyword in words}
+            groups.append(f"(?P<{intent}>{_trie_pattern(keywords)})")
+        # The rest of a matched word is consumed so it cannot match twice
+        self.pattern = re.compile(f"(?<!{WORD_CHAR})(?:{'|'.join(groups)}){WORD_CHAR}*")
+
+    def match(self, text):
+        """
+        Get the intents found in a text with their share of keyword hits,
+        best first
+        """
+        hits = Counter(found.lastgroup for found in self.pattern.finditer(normalize(text or "")))
+        total = sum(hits.values())
+        ranked = sorted(hits.items(), key=lambda item: (-item[1], self.priority[item[0]]))
+        return {intent: count / total for intent, count in ranked}
+
+    def best_intent(self, text, default="default"):
+        """
+        Get the highest scoring intent of a text
+        """
+        return next(iter(self.match(text)), default)
+
+
+_matcher = None
+
+
+def get_intent_matcher():
+    """
+    Get the shared matcher for the built-in keywords, compiling it on first use
+    """
+    global _matcher
+    if _matcher is None:
+        _matcher = IntentMatcher()
+    return _matcher
@@ -0,0 +1,200 @@
+import heapq
+import threading
+
+from modules.text_index import InvertedIndex, tokenize
+
+# Title words count more than words in the body of a fact
+TITLE_WEIGHT = 3
+
+# Scores below this are too weak to present as an answer
+MIN_SCORE = 2.0
+
+# A fact must share this many distinct words with the query, so a single
+# common word such as a crop name is never taken for an answer
+MIN_MATCHED_TERMS = 2
+
+
+def _range(values):
+    low, high = values
+    return f"{low}–{high}"
+
+
+def crop_documents(kerala_crops, crop_requirements=None):
+    """
+    Build one fact document per crop from the crop and soil tables
+    """
+    crop_requirements = crop_requirements or {}
+    for crop, data in kerala_crops.items():
+        text = (
+            f"{crop} grows best in soil pH {_range(data['ph_range'])}, "
+            f"temperatures of {_range(data['temperature_range'])}°C and at least "
+            f"{data['rainfall_min']} mm of rainfall a year. "
+            f"Suitable soils: {', '.join(data['soil_types'])}. "
+            f"Season: {', '.join(data['seasons'])}. "
+            f"Market demand is {data['market_demand'].lower()} and profitability "
+            f"{data['profitability'].lower()}."
+        )
+        requirements = crop_requirements.get(crop)
+        if requirements:
+            needs = ", ".join(
+                f"{nutrient} {_range(values)}" for nutrient, values in requirements.items() if nutrient != "pH"
+            )
+            text += f" Soil nutrient needs: {needs}."
+        yield f"crop:{crop}", {"title": f"{crop} cultivation", "text": text, "source": "Crop Recommendations"}
+
+
+def nutrient_documents(nutrient_ranges):
+    """
+    Build one fact document per soil nutrient
+    """
+    for nutrient, ranges in nutrient_ranges.items():
+        text = (
+            f"The optimal soil {nutrient} level is {_range(ranges['optimal'])}; "
+            f"{_range(ranges['acceptable'])} is acceptable."
+        )
+        yield f"nutrient:{nutrient}", {"title": f"Soil {nutrient}", "text": text, "source": "Soil Health"}
+
+
+def treatment_documents(treatments):
+    """
+    Build one fact document per plant disease treatment
+    """
+    for disease, treatment in treatments.items():
+        if disease == "healthy":
+            continue
+        name = disease.replace("_", " ").capitalize()
+        yield f"disease:{disease}", {"title": f"{name} treatment", "text": f"{name}: {treatment}", "source": "Disease Detection"}
+
+
+def scheme_documents(schemes):
+    """
+    Build one fact document per government scheme
+    """
+    for scheme in schemes:
+        text = (
+            f"{scheme['name']}: {scheme['description']}. "
+            f"Eligibility: {'; '.join(scheme['eligibility'])}. "
+            f"Benefits: {'; '.join(scheme['benefits'])}. "
+            f"Documents: {'; '.join(scheme['documents_required'])}. "
+            f"Deadline: {scheme['deadline']}."
+        )
+        yield f"scheme:{scheme['id']}", {"title": scheme["name"], "text": text, "source": "Government Schemes"}
+
+
+class KnowledgeBase:
+    """
+    BM25 retrieval over the app's own farming knowledge
+
+    Crop, soil, disease and scheme facts are indexed once; solved forum
+    questions are added and updated from the community store's change feed
+    whenever refresh() sees a newer version.
+    """
+
+    def __init__(self, documents=(), community_store=None):
+        self.index = InvertedIndex()
+        self.documents = {}
+        self.community_store = community_store
+        self.community_version = 0
+        self._lock = threading.Lock()
+
+        for doc_id, document in documents:
+            self.add_document(doc_id, document)
+        self.refresh()
+
+    def add_document(self, doc_id, document):
+        """
+        Index a fact document, replacing any document with the same id
+        """
+        if doc_id in self.index:
+            self.index.remove(doc_id)
+        self.documents[doc_id] = document
+        self.index.add(doc_id, tokenize(document["title"]) * TITLE_WEIGHT + tokenize(document["text"]))
+
+    def remove_document(self, doc_id):
+        """
+        Remove a fact document from the index
+        """
+        self.index.remove(doc_id)
+        self.documents.pop(doc_id, None)
+
+    def refresh(self):
+        """
+        Pick up forum questions solved or answered since the last refresh
+        """
+        store = self.community_store
+        if store is None or store.get_version() == self.community_version:
+            return
+        with self._lock:
+            questions, answers, version = store.get_changes(self.community_version)
+            question_ids = {question["id"] for question in questions}
+            question_ids.update(answer["question_id"] for answer in answers)
+
+            for question_id in question_ids:
+                question = store.get_question(question_id)
+                doc_id = f"forum:{question_id}"
+                if not question or not question["solved"]:
+                    if doc_id in self.documents:
+                        self.remove_document(doc_id)
+                    continue
+                answers = store.get_answers(question_id)
+                if answers:
+                    self.add_document(doc_id, {
+                        "title": question["title"],
+                        "text": f"{answers[0]['content']} (answered by {answers[0]['author']})",
+                        "source": "Community Q&A"
+                    })
+            self.community_version = version
+
+    def search(self, query, limit=3, min_score=MIN_SCORE, sources=None, min_terms=MIN_MATCHED_TERMS):
+        """
+        Get the best matching fact documents as (document, score) pairs
+
+        With sources given, only documents from those sources are ranked.
+        """
+        terms = tokenize(query)
+        distinct = set(terms)
+        if len(distinct) < min_terms:
+            return []
+        # refresh() updates the index and documents from other sessions
+        with self._lock:
+            candidates = None
+            if sources is not None:
+                candidates = {doc_id for doc_id, document in self.documents.items() if document["source"] in sources}
+            matches = [
+                (doc_id, score) for doc_id, score in self.index.score(terms, candidates).items()
+                if score >= min_score and len(self.index.doc_terms[doc_id].keys() & distinct) >= min_terms
+            ]
+            return [
+                (self.documents[doc_id], score)
+                for doc_id, score in heapq.nlargest(limit, matches, key=lambda item: item[1])
+            ]
+
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+
+def get_knowledge_base():
+    """
+    Get the shared knowledge base, building it once per process
+    """
+    global _knowledge_base
+    with _knowledge_base_lock:
+        if _knowledge_base is None:
+            # Imported here: the page modules import this one through the chatbot
+            from modules.community_store import get_community_store
+            from modules.crop_recommendation import CropRecommendation
+            from modules.disease_detection import TREATMENTS
+            from modules.government_schemes import GovernmentSchemes
+            from modules.soil_health import SoilHealthAssessment
+
+            soil = SoilHealthAssessment()
+            documents = [
+                *crop_documents(CropRecommendation().kerala_crops, soil.crop_requirements),
+                *nutrient_documents(soil.nutrient_ranges),
+                *treatment_documents(TREATMENTS),
+                *scheme_documents(GovernmentSchemes().schemes)
+            ]
+            _knowledge_base = KnowledgeBase(documents, get_community_store())
+    _knowledge_base.refresh()
+    return _knowledge_base
@@ -0,0 +1,293 @@
+"""
+Dashboard KPIs computed from the farm, soil and market data
+
+The KPIs are computed into monthly snapshots: the current month's snapshot
+is recomputed on a schedule and whenever the farm data changes, and the
+last snapshot of the previous month is kept as the baseline for the
+month-over-month change. The dashboard reads the latest snapshot from
+memory, so a render never runs the computation itself.
+"""
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+from modules.cache import get_cache
+from modules.instrumentation import timed
+from modules.page_loader import get_engine
+from modules.storage import SQLiteStore, get_store
+
+# Seconds before the current snapshot is recomputed even without writes
+KPI_REFRESH_SECONDS = float(os.getenv("KERALA_KPI_REFRESH_SECONDS", "900"))
+
+KPIS = ("crop_health", "soil_quality", "market_revenue")
+
+# Crops whose expected yield counts towards the market revenue
+STANDING_STATUSES = ("Growing", "Mature")
+
+# soil_tests column -> nutrient name used by SoilHealthAssessment
+SOIL_TEST_NUTRIENTS = {
+    "ph": "pH",
+    "nitrogen": "Nitrogen",
+    "phosphorus": "Phosphorus",
+    "potassium": "Potassium",
+    "organic_matter": "Organic Matter"
+}
+
+KPI_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kpi_snapshots (
+    month TEXT PRIMARY KEY,
+    as_of TEXT NOT NULL,
+    crop_health REAL,
+    soil_quality REAL,
+    market_revenue REAL,
+    data_version INTEGER
+);
+"""
+
+UPSERT_SNAPSHOT = """
+INSERT INTO kpi_snapshots (month, as_of, crop_health, soil_quality, market_revenue, data_version)
+VALUES (:month, :as_of, :crop_health, :soil_quality, :market_revenue, :data_version)
+ON CONFLICT(month) DO UPDATE SET
+    as_of = excluded.as_of,
+    crop_health = excluded.crop_health,
+    soil_quality = excluded.soil_quality,
+    market_revenue = excluded.market_revenue,
+    data_version = excluded.data_version
+"""
+SELECT_SNAPSHOT = "SELECT * FROM kpi_snapshots WHERE month = ?"
+
+SELECT_CROPS_AS_OF = """
+SELECT c.farm_id, c.crop_name, c.status, c.area_acres, c.yield_expected, c.yield_actual
+FROM crops c
+WHERE c.planting_date IS NULL OR c.planting_date <= ?
+ORDER BY c.id
+"""
+
+
+class KPIStore(SQLiteStore):
+    """
+    One KPI snapshot per month, the current month's overwritten on refresh
+    """
+
+    schema = KPI_SCHEMA
+
+    def save_snapshot(self, snapshot):
+        """
+        Store a snapshot under its month
+        """
+        with self.transaction() as conn:
+            conn.execute(UPSERT_SNAPSHOT, {key: snapshot.get(key) for key in [
+                "month", "as_of", "crop_health", "soil_quality", "market_revenue", "data_version"
+            ]})
+
+    def get_snapshot(self, month):
+        """
+        Get the snapshot stored for a month ('YYYY-MM')
+        """
+        return self.query_one(SELECT_SNAPSHOT, (month,))
+
+
+def get_kpi_store(db_path=None):
+    """
+    Get the process-wide KPIStore for a database file
+    """
+    return get_store(KPIStore, db_path)
+
+
+def percent_change(current, previous):
+    """
+    Get the change from previous to current in percent, or None without a
+    usable baseline
+    """
+    if current is None or not previous:
+        return None
+    return (current - previous) / abs(previous) * 100
+
+
+class KPIEngine:
+    """
+    Precomputed dashboard KPIs with month-over-month changes
+    """
+
+    def __init__(self, farm=None, soil=None, market=None, kpi_store=None,
+                 refresh_seconds=KPI_REFRESH_SECONDS):
+        # Building FarmManagement seeds the sample farms into an empty store
+        self.farm = farm or get_engine("farm")
+        self.soil = soil or get_engine("soil")
+        self.market = market or get_engine("market")
+        self.kpi_store = kpi_store or get_kpi_store(self.farm.store.db_path)
+        self.refresh_seconds = refresh_seconds
+
+        # Latest snapshot per database, shared with the other worker processes
+        self._snapshots = get_cache("kpi.latest", maxsize=None, shared=True)
+        self._refresh_lock = threading.Lock()
+
+    def _crop_health(self, crops):
+        """
+        Area-weighted share of the expected yield achieved, in percent, over
+        crops with a recorded yield
+        """
+        weighted = total_area = 0.0
+        for crop in crops:
+            if crop["yield_actual"] is None or not crop["yield_expected"]:
+                continue
+            area = crop["area_acres"] or 1.0
+            weighted += min(crop["yield_actual"] / crop["yield_expected"], 1.0) * area
+            total_area += area
+        return weighted / total_area * 100 if total_area else None
+
+    def _soil_quality(self, as_of):
+        """
+        Area-weighted overall score (0-100) of each farm's latest soil test
+        """
+        areas = {farm["id"]: farm["area_acres"] or 1.0 for farm in self.farm.store.get_farms()}
+        weighted = total_area = 0.0
+        for test in self.farm.store.get_latest_soil_tests(as_of):
+            soil_data = {nutrient: test[column] for column, nutrient in SOIL_TEST_NUTRIENTS.items()}
+            score = self.soil.assess_soil_health(soil_data)["overall_score"]
+            area = areas.get(test["farm_id"], 1.0)
+            weighted += score * area
+            total_area += area
+        return weighted / total_area if total_area else None
+
+    def _market_prices(self, as_of):
+        """
+        Average price per kg of each crop on the latest market day up to a
+        date; crops without a price by then use their earliest known price
+        """
+        # Imported here so that importing the module at startup stays cheap
+        import pandas as pd
+
+        prices = pd.DataFrame(self.market.price_data, columns=["date", "crop", "price_per_kg"])
+        if prices.empty:
+            return {}
+        daily = prices.groupby(["crop", "date"])["price_per_kg"].mean().reset_index()
+        earliest = daily.groupby("crop").first()["price_per_kg"]
+        known = daily[daily["date"] <= as_of].groupby("crop").last()["price_per_kg"]
+        return {**earliest.to_dict(), **known.to_dict()}
+
+    def _market_revenue(self, crops, as_of):
+        """
+        Market value of the expected yield of standing crops at the prices
+        of the day
+        """
+        prices = self._market_prices(as_of)
+        return float(sum(
+            (crop["yield_expected"] or 0) * prices[crop["crop_name"]]
+            for crop in crops
+            if crop["status"] in STANDING_STATUSES and crop["crop_name"] in prices
+        ))
+
+    @timed()
+    def compute_snapshot(self, as_of, data_version=None):
+        """
+        Compute the KPIs from the data as it stood on a date
+        """
+        as_of = as_of.isoformat()
+        crops = self.farm.store.query(SELECT_CROPS_AS_OF, (as_of,))
+        return {
+            "month": as_of[:7],
+            "as_of": as_of,
+            "crop_health": self._crop_health(crops),
+            "soil_quality": self._soil_quality(as_of),
+            "market_revenue": self._market_revenue(crops, as_of),
+            "data_version": data_version,
+            "yields": [
+                {"crop": crop["crop_name"], "expected": crop["yield_expected"], "actual": crop["yield_actual"]}
+                for crop in crops if crop["yield_expected"]
+            ]
+        }
+
+    def _baseline(self, today):
+        """
+        Get the previous month's snapshot, computing it as of that month's
+        last day when none was stored during the month
+        """
+        month_end = today.replace(day=1) - timedelta(days=1)
+        snapshot = self.kpi_store.get_snapshot(month_end.strftime("%Y-%m"))
+        if snapshot is None:
+            snapshot = self.compute_snapshot(month_end)
+            self.kpi_store.save_snapshot(snapshot)
+        return snapshot
+
+    def refresh(self, today=None):
+        """
+        Recompute and store the current month's snapshot and its change from
+        the previous month
+        """
+        with self._refresh_lock:
+            return self._refresh(today)
+
+    def _refresh(self, today=None):
+        today = today or date.today()
+        version = self.farm.store.get_data_version()
+        current = self.compute_snapshot(today, data_version=version)
+        self.kpi_store.save_snapshot(current)
+        previous = self._baseline(today)
+
+        latest = {
+            "as_of": current["as_of"],
+            "data_version": version,
+            "refreshed_at": time.time(),
+            "yields": current["yields"],
+            "kpis": {
+                name: {
+                    "value": current[name],
+                    "previous": previous[name],
+                    "change": percent_change(current[name], previous[name])
+                }
+                for name in KPIS
+            }
+        }
+        self._snapshots.set(self.farm.store.db_path, latest)
+        return latest
+
+    def is_stale(self, latest):
+        """
+        Check whether a snapshot is past its refresh interval or older than
+        the farm data
+        """
+        return (
+            time.time() - latest["refreshed_at"] > self.refresh_seconds
+            or latest["data_version"] != self.farm.store.get_data_version()
+            or latest["as_of"] != date.today().isoformat()
+        )
+
+    def get_kpis(self):
+        """
+        Get the latest KPI snapshot
+
+        Only the first call in any worker process computes; the snapshot is
+        then kept current by the refresh scheduler's kpi job, which a stale
+        snapshot triggers early. Callers keep the previous snapshot meanwhile.
+        """
+        # Imported here: the scheduler imports this module for its interval
+        from modules.refresh_scheduler import get_scheduler
+
+        key = self.farm.store.db_path
+        latest = self._snapshots.get(key)
+        if latest is None:
+            with self._refresh_lock:
+                latest = self._snapshots.get(key)
+                if latest is None:
+                    return self._refresh()
+        if self.is_stale(latest):
+            get_scheduler().trigger("kpi")
+        return latest
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_kpi_engine():
+    """
+    Get the process-wide KPIEngine
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = KPIEngine()
+    return _engine
@@ -0,0 +1,655 @@
+"""
+Load test of concurrent farmer sessions
+
+Usage:
+    python -m modules.load_test --sessions 50 --concurrency 10 --think 1.0
+    python -m modules.load_test --concurrency 20 --duration 300 --save load.json
+    python -m modules.load_test --sessions 80 --concurrency 16 --processes 4
+
+Every simulated farmer drives the Streamlit app headlessly through AppTest,
+as a browser would. It opens the app, visits the pages of the sidebar in a
+random order and, on the way, submits the crop recommendation, soil test
+and scheme eligibility forms and uploads a leaf photo for disease
+detection. It pauses for a think time between steps. The weather and
+disease model APIs are answered by in-process stubs after a fixed latency,
+and the databases live in a temporary directory. The exit status is 1
+when any session failed.
+
+By default all sessions run in this process, as they would in one
+Streamlit worker, so the report tells how many concurrent sessions one
+worker handles. With --processes, that many worker processes each run
+their share of the sessions and the concurrency against the same
+databases, and their results are merged. The report gives the
+throughput, the p50/p95/p99 latency of every step, the share of the time
+the workers were busy running pages and the memory each live session
+adds.
+
+AppTest swaps process-wide Streamlit state on every run, so within one
+process the sessions' page runs take turns and concurrency is simulated;
+a step's latency includes its wait for the runs ahead of it. Pages are
+CPU bound under the GIL, so a real worker's capacity is much the same,
+but its latencies spread differently. Only separate processes run pages
+in parallel, and the report says how many did. AppTest also rebuilds the
+element tree after every run, so the latencies are a little above what a
+browser sees.
+"""
+import argparse
+import gc
+import io
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from urllib.parse import urlsplit
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+DEFAULT_SESSIONS = 20
+DEFAULT_CONCURRENCY = 5
+
+# Mean pause between two steps of a session; each pause is drawn from
+# 50% to 150% of it
+DEFAULT_THINK_SECONDS = 1.0
+
+# Round trip of a stubbed upstream call
+DEFAULT_BACKEND_LATENCY = 0.2
+
+# Distinct leaf photos; farmers uploading the same photo hit the prediction cache
+DEFAULT_IMAGES = 20
+
+DEFAULT_SEED = 42
+
+# Seconds one AppTest run may take before the step fails
+DEFAULT_TIMEOUT = 60
+
+PERCENTILES = (50, 95, 99)
+
+# How often resident memory is sampled during the run
+MEMORY_SAMPLE_SECONDS = 0.1
+
+# Seconds a worker process waits for the others to finish warming up
+DEFAULT_START_TIMEOUT = 300
+
+# Label of the disease detection page's file uploader
+LEAF_UPLOADER = "Upload a plant image for disease detection"
+
+# Held for every AppTest run; concurrent runs would share Streamlit's runtime
+_page_runs = threading.Lock()
+
+# Set in worker processes; lines up their measured runs after the warm-ups
+_start_barrier = None
+
+
+class StubBackends:
+    """
+    In-process stand-ins for the OpenWeather and Hugging Face APIs
+
+    request() replaces requests' Session.request. Every call waits for
+    latency seconds, like a round trip to the real service, and gets a
+    canned response; any other URL fails, so nothing reaches the network.
+    """
+
+    def __init__(self, latency=DEFAULT_BACKEND_LATENCY, seed=DEFAULT_SEED):
+        from modules.disease_detection import TREATMENTS
+        from modules.weather_analytics import WeatherAnalytics
+
+        self.latency = latency
+        self.calls = 0
+        weather = WeatherAnalytics()
+        self._weather = {
+            "/data/2.5/weather": weather._get_mock_current_weather(),
+            "/data/2.5/forecast": weather._get_mock_forecast()
+        }
+        self._labels = sorted(TREATMENTS)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _body(self, url):
+        parts = urlsplit(url)
+        if parts.netloc == "api.openweathermap.org" and parts.path in self._weather:
+            return self._weather[parts.path]
+        if parts.netloc == "api-inference.huggingface.co" and parts.path.startswith("/models/"):
+            with self._lock:
+                return [{"label": self._rng.choice(self._labels), "score": round(self._rng.uniform(0.5, 0.99), 3)}]
+        raise RuntimeError(f"network access is disabled in load tests; no stub for {url}")
+
+    def request(self, method, url, **kwargs):
+        import requests
+
+        body = self._body(url)
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers["Content-Type"] = "application/json"
+        response._content = json.dumps(body).encode()
+        return response
+
+
+def _refuse(*args, **kwargs):
+    raise RuntimeError("network access is disabled in load tests")
+
+
+def leaf_images(count=DEFAULT_IMAGES, seed=DEFAULT_SEED):
+    """
+    Generate count distinct leaf-green JPEG photos
+    """
+    from PIL import Image
+
+    rng = np.random.RandomState(seed)
+    images = []
+    for _ in range(count):
+        pixels = rng.randint(0, 120, (224, 224, 3))
+        pixels[..., 1] += rng.randint(60, 136)
+        buffered = io.BytesIO()
+        Image.fromarray(pixels.astype(np.uint8)).save(buffered, format="JPEG")
+        images.append(buffered.getvalue())
+    return images
+
+
+def rss_bytes():
+    """
+    Get the resident memory of this process, or None where /proc is not
+    available
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MemorySampler:
+    """
+    Tracks the peak resident memory while the load test runs
+    """
+
+    def __init__(self, interval=MEMORY_SAMPLE_SECONDS):
+        self.interval = interval
+        self.baseline = self.peak = rss_bytes()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample_until_stopped, name="load-test-memory", daemon=True)
+
+    def _sample(self):
+        rss = rss_bytes()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+    def _sample_until_stopped(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if self.baseline is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+            self._sample()
+
+
+def _find(widgets, label):
+    """
+    Get the widget with a label from an AppTest element list
+    """
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+def _choose(rng, selectbox):
+    return selectbox.select(rng.choice(selectbox.options))
+
+
+def navigate(at, label, page):
+    """
+    Click a sidebar button and check that its page opened
+    """
+    _find(at.sidebar.button, label).click().run()
+    if at.session_state["current_page"] != page:
+        raise AssertionError(f"{label!r} opened {at.session_state['current_page']!r}, not {page!r}")
+
+
+def submit_crop_form(at, rng, images):
+    _find(at.slider, "Soil pH Level").set_value(round(rng.uniform(4.5, 8.0), 1))
+    for label in ("Soil Type", "Planting Season", "Location in Kerala"):
+        _choose(rng, _find(at.selectbox, label))
+    _find(at.number_input, "Annual Rainfall (mm)").set_value(rng.randrange(500, 3001, 100))
+    _find(at.number_input, "Average Temperature (°C)").set_value(rng.randint(18, 36))
+    _find(at.button, "🌱 Get Recommendations").click().run()
+
+
+def submit_soil_form(at, rng, images):
+    _find(at.number_input, "pH Level").set_value(round(rng.uniform(4.5, 8.5), 1))
+    _find(at.number_input, "Organic Matter (%)").set_value(round(rng.uniform(0.5, 6.0), 1))
+    _find(at.number_input, "Nitrogen (N)").set_value(rng.randint(5, 80))
+    _find(at.number_input, "Phosphorus (P)").set_value(rng.randint(5, 60))
+    _find(at.number_input, "Potassium (K)").set_value(rng.randint(50, 400))
+    _choose(rng, _find(at.selectbox, "Target Crop"))
+    _find(at.button, "🔍 Assess Soil Health").click().run()
+
+
+def submit_scheme_form(at, rng, images):
+    for label in ("Farmer Type", "State", "Primary Crop Type", "Annual Income Range", "Bank Account"):
+        _choose(rng, _find(at.selectbox, label))
+    _find(at.number_input, "Landholding (acres)").set_value(round(rng.uniform(0.2, 10.0), 1))
+    _find(at.button, "🔍 Find Eligible Schemes").click().run()
+
+
+def upload_leaf(at, rng, images):
+    _find(at.file_uploader, LEAF_UPLOADER).set_value(("leaf.jpg", rng.choice(images), "image/jpeg"))
+    at.run()
+
+
+def detect_disease(at, rng, images):
+    _find(at.button, "🔍 Detect Disease").click().run()
+
+
+# Steps taken on a page after opening it, as (step name, action)
+ACTIONS = {
+    "crops": [("crops.submit", submit_crop_form)],
+    "soil": [("soil.submit", submit_soil_form)],
+    "schemes": [("schemes.submit", submit_scheme_form)],
+    "disease": [("disease.upload", upload_leaf), ("disease.detect", detect_disease)]
+}
+
+
+def discover_routes(timeout=DEFAULT_TIMEOUT):
+    """
+    Get the label of every sidebar button by the page it opens, by clicking
+    each one in turn
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    routes = {}
+    for label in [button.label for button in at.sidebar.button]:
+        _find(at.sidebar.button, label).click().run()
+        routes[at.session_state["current_page"]] = label
+    return routes
+
+
+class SessionError(Exception):
+    """
+    A step that raised or left an exception on the page
+    """
+
+    def __init__(self, step, message):
+        super().__init__(f"{step}: {message}")
+        self.step = step
+        self.message = message
+
+
+class LoadTest:
+    """
+    Runs farmer sessions and collects the latency of every step
+    """
+
+    def __init__(self, routes, images, think=DEFAULT_THINK_SECONDS, timeout=DEFAULT_TIMEOUT, seed=DEFAULT_SEED):
+        self.routes = routes
+        self.images = images
+        self.think = think
+        self.timeout = timeout
+        self.seed = seed
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _pause(self, rng):
+        if self.think > 0:
+            time.sleep(self.think * rng.uniform(0.5, 1.5))
+
+    def _step(self, at, name, action):
+        started = time.perf_counter()
+        with _page_runs:
+            running = time.perf_counter()
+            try:
+                action()
+                error = at.exception[0].value if at.exception else None
+            except Exception as raised:
+                error = f"{type(raised).__name__}: {raised}"
+            finished = time.perf_counter()
+        with self._lock:
+            self.busy_seconds += finished - running
+            if error is None:
+                self.latencies[name].append(finished - started)
+        if error is not None:
+            raise SessionError(name, error)
+
+    def run_session(self, session_id):
+        """
+        Run one farmer's visit; a failing step ends the session
+        """
+        from streamlit.testing.v1 import AppTest
+
+        rng = random.Random(f"{self.seed}-{session_id}")
+        at = AppTest.from_file(APP_PATH, default_timeout=self.timeout)
+        try:
+            self._step(at, "open", at.run)
+            for page in rng.sample(list(self.routes), len(self.routes)):
+                self._pause(rng)
+                self._step(at, f"{page}.open", lambda: navigate(at, self.routes[page], page))
+                for name, action in ACTIONS.get(page, ()):
+                    self._pause(rng)
+                    self._step(at, name, lambda: action(at, rng, self.images))
+        except SessionError as error:
+            with self._lock:
+                self.failed += 1
+                self.errors[str(error)] += 1
+        else:
+            with self._lock:
+                self.completed += 1
+
+
+def percentiles(values, points=PERCENTILES):
+    """
+    Get the given percentiles of latencies in seconds, in milliseconds
+    """
+    return {f"p{point}": round(float(np.percentile(values, point)) * 1000, 2) for point in points}
+
+
+def _megabytes(size):
+    return None if size is None else round(size / 2 ** 20, 1)
+
+
+def merge_results(results):
+    """
+    Combine the raw results of the worker processes
+
+    Latencies and counts add up; the run lasted as long as the slowest
+    process, and the memory figures are totals over the processes.
+    """
+    merged = {
+        "latencies": defaultdict(list), "errors": Counter(), "completed": 0, "failed": 0,
+        "busy_seconds": 0.0, "elapsed": 0.0, "memory_baseline": None, "memory_peak": None, "backend_calls": 0
+    }
+    for result in results:
+        for name, values in result["latencies"].items():
+            merged["latencies"][name].extend(values)
+        merged["errors"].update(result["errors"])
+        for field in ("completed", "failed", "busy_seconds", "backend_calls"):
+            merged[field] += result[field]
+        merged["elapsed"] = max(merged["elapsed"], result["elapsed"])
+        for field in ("memory_baseline", "memory_peak"):
+            if result[field] is not None:
+                merged[field] = (merged[field] or 0) + result[field]
+    return merged
+
+
+def summarize(results, concurrency, think, backend_latency):
+    """
+    Get the report of a finished load test from the results of its
+    processes
+    """
+    processes = len(results)
+    merged = merge_results(results)
+    elapsed = merged["elapsed"]
+    steps = {
+        name: {"count": len(values), **percentiles(values), "max_ms": round(max(values) * 1000, 2)}
+        for name, values in sorted(merged["latencies"].items())
+    }
+    all_values = [value for values in merged["latencies"].values() for value in values]
+    if all_values:
+        steps["all"] = {"count": len(all_values), **percentiles(all_values),
+                        "max_ms": round(max(all_values) * 1000, 2)}
+    baseline, peak = merged["memory_baseline"], merged["memory_peak"]
+    grown = None if baseline is None else max(peak - baseline, 0)
+    return {
+        "concurrency": concurrency,
+        "processes": processes,
+        # AppTest runs one page at a time per process
+        "parallel_page_runs": processes,
+        "think_seconds": think,
+        "backend_latency_seconds": backend_latency,
+        "duration_seconds": round(elapsed, 2),
+        "sessions": merged["completed"],
+        "failed_sessions": merged["failed"],
+        "sessions_per_second": round(merged["completed"] / elapsed, 3),
+        "steps_per_second": round(len(all_values) / elapsed, 3),
+        "utilization": round(merged["busy_seconds"] / (elapsed * processes), 3),
+        "latency_ms": steps,
+        "memory_mb": {
+            "baseline": _megabytes(baseline),
+            "peak": _megabytes(peak),
+            "per_session": _megabytes(None if grown is None else grown / concurrency)
+        },
+        "backend_calls": merged["backend_calls"],
+        "errors": dict(merged["errors"].most_common())
+    }
+
+
+def _stop_scheduler():
+    # The app starts the refresh scheduler; stop it before the stubs go
+    if "modules.refresh_scheduler" in sys.modules:
+        sys.modules["modules.refresh_scheduler"].get_scheduler().stop()
+
+
+def _quiet_streamlit():
+    # Streamlit warns on every run of a page using a deprecated argument, and
+    # whenever the harness touches st outside of a page run
+    for name in ["streamlit.deprecation_util", "streamlit.runtime.scriptrunner_utils.script_run_context"]:
+        logging.getLogger(name).disabled = True
+
+
+def _init_worker_process(start_barrier):
+    global _start_barrier
+    _start_barrier = start_barrier
+    _quiet_streamlit()
+
+
+def run_share(routes, photos, options, index=0, processes=1):
+    """
+    Run one process's share of the sessions and get its raw results
+
+    The process takes session ids index, index + processes, ... and its
+    share of the concurrency, so the shares of all processes make up the
+    whole test. One unmeasured session first warms up the process's
+    imports, engines and caches.
+    """
+    sessions, duration, ramp_up = options["sessions"], options["duration"], options["ramp_up"]
+    concurrency = options["concurrency"] // processes + (index < options["concurrency"] % processes)
+
+    backends = StubBackends(options["backend_latency"], options["seed"])
+    with mock.patch("requests.sessions.Session.request", backends.request), \
+            mock.patch("socket.create_connection", _refuse):
+        try:
+            LoadTest(routes, photos, think=0, timeout=options["timeout"], seed=options["seed"]).run_session("warm-up")
+            gc.collect()
+            if _start_barrier is not None:
+                _start_barrier.wait(DEFAULT_START_TIMEOUT)
+
+            test = LoadTest(routes, photos, options["think"], options["timeout"], options["seed"])
+            session_ids = itertools.count(index, processes)
+            ids_lock = threading.Lock()
+            started = time.perf_counter()
+            deadline = None if duration is None else started + duration
+
+            def worker(worker_index):
+                time.sleep(ramp_up * worker_index / concurrency)
+                while deadline is None or time.perf_counter() < deadline:
+                    with ids_lock:
+                        session_id = next(session_ids)
+                    if sessions is not None and session_id >= sessions:
+                        return
+                    test.run_session(session_id)
+
+            with MemorySampler() as memory, \
+                    ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="farmer") as pool:
+                list(pool.map(worker, range(concurrency)))
+            elapsed = time.perf_counter() - started
+        finally:
+            _stop_scheduler()
+    return {
+        "latencies": dict(test.latencies),
+        "errors": dict(test.errors),
+        "completed": test.completed,
+        "failed": test.failed,
+        "busy_seconds": test.busy_seconds,
+        "elapsed": elapsed,
+        "memory_baseline": memory.baseline,
+        "memory_peak": memory.peak,
+        "backend_calls": backends.calls
+    }
+
+
+def run_load_test(sessions=None, concurrency=DEFAULT_CONCURRENCY, think=DEFAULT_THINK_SECONDS, duration=None,
+                  ramp_up=0.0, backend_latency=DEFAULT_BACKEND_LATENCY, pages=None, images=DEFAULT_IMAGES,
+                  seed=DEFAULT_SEED, timeout=DEFAULT_TIMEOUT, processes=1):
+    """
+    Run concurrent farmer sessions against stubbed backends and get the
+    report
+
+    Sessions start until sessions have run or duration seconds have passed,
+    whichever comes first; without either, DEFAULT_SESSIONS run. Workers
+    start evenly over ramp_up seconds. pages limits the visits to some
+    sidebar pages. With processes above 1 the sessions are shared out to
+    that many worker processes, which start measuring together once all
+    have warmed up.
+    """
+    if sessions is None and duration is None:
+        sessions = DEFAULT_SESSIONS
+    if not 1 <= processes <= concurrency:
+        raise ValueError("processes must be from 1 to the concurrency")
+    options = dict(sessions=sessions, concurrency=concurrency, think=think, duration=duration, ramp_up=ramp_up,
+                   backend_latency=backend_latency, seed=seed, timeout=timeout)
+
+    with tempfile.TemporaryDirectory() as directory, mock.patch.dict(os.environ, {
+        # Read when the feature modules are first imported, which keeps the
+        # stores out of the real data directory; the keys make the engines
+        # call the stubbed APIs instead of their offline fallbacks. Worker
+        # processes inherit them and share the databases.
+        "KERALA_FARMERS_DB": os.path.join(directory, "kerala_farmers.db"),
+        "KERALA_INTENT_MODEL": os.path.join(directory, "intent_model.npz"),
+        "OPENWEATHER_API_KEY": "load-test",
+        "HUGGINGFACE_API_KEY": "load-test"
+    }):
+        # AppTest leaves app.py as __main__, which spawned workers would run;
+        # it is put back before they start
+        main_module = sys.modules["__main__"]
+        backends = StubBackends(backend_latency, seed)
+        with mock.patch("requests.sessions.Session.request", backends.request), \
+                mock.patch("socket.create_connection", _refuse):
+            try:
+                # Opening every page also seeds the sample data before any
+                # worker process starts
+                routes = discover_routes(timeout)
+                if pages:
+                    unknown = [page for page in pages if page not in routes]
+                    if unknown:
+                        raise ValueError(f"Unknown pages: {', '.join(unknown)}")
+                    routes = {page: routes[page] for page in pages}
+                photos = leaf_images(images, seed)
+
+                if processes == 1:
+                    results = [run_share(routes, photos, options)]
+                else:
+                    # This process only waits for the workers from here on
+                    _stop_scheduler()
+                    sys.modules["__main__"] = main_module
+                    context = multiprocessing.get_context("spawn")
+                    with context.Pool(processes, _init_worker_process, (context.Barrier(processes),)) as pool:
+                        results = pool.starmap(
+                            run_share, [(routes, photos, options, index, processes) for index in range(processes)],
+                            chunksize=1
+                        )
+            finally:
+                _stop_scheduler()
+    return summarize(results, concurrency, think, backend_latency)
+
+
+def print_report(report):
+    print(
+        f"{report['sessions']} sessions ({report['failed_sessions']} failed) in "
+        f"{report['duration_seconds']:.1f} s at concurrency {report['concurrency']} over "
+        f"{report['processes']} process(es), think time {report['think_seconds']} s, "
+        f"backend latency {report['backend_latency_seconds']} s"
+    )
+    print(
+        f"Page runs take turns within a process, so at most {report['parallel_page_runs']} ran in parallel; "
+        "the concurrency within a process is simulated"
+    )
+    print(f"Throughput: {report['sessions_per_second']:.3f} sessions/s, {report['steps_per_second']:.2f} steps/s")
+    print(f"Workers busy running pages {report['utilization']:.0%} of the time")
+    print()
+    print(f"{'step':<20} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for name, step in report["latency_ms"].items():
+        print(f"{name:<20} {step['count']:>7} {step['p50']:>10.1f} {step['p95']:>10.1f} "
+              f"{step['p99']:>10.1f} {step['max_ms']:>10.1f}")
+    memory = report["memory_mb"]
+    if memory["baseline"] is not None:
+        print()
+        print(f"Memory over all processes: {memory['baseline']} MB at start, {memory['peak']} MB peak, "
+              f"~{memory['per_session']} MB per live session")
+    print(f"Stubbed backend calls: {report['backend_calls']}")
+    for error, count in report["errors"].items():
+        print(f"ERROR x{count} {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent farmer sessions against app processes")
+    parser.add_argument("--sessions", type=int, help=f"sessions to run (default {DEFAULT_SESSIONS} without --duration)")
+    parser.add_argument("--duration", type=float, help="stop starting sessions after this many seconds")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="simultaneous sessions")
+    parser.add_argument("--think", type=float, default=DEFAULT_THINK_SECONDS,
+                        help="mean pause between the steps of a session, in seconds")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes sharing the sessions; page runs are parallel only across processes")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which the sessions start")
+    parser.add_argument("--backend-latency", type=float, default=DEFAULT_BACKEND_LATENCY,
+                        help="seconds each stubbed weather or model API call takes")
+    parser.add_argument("--pages", help="comma-separated pages to visit (default: every sidebar page)")
+    parser.add_argument("--images", type=int, default=DEFAULT_IMAGES, help="distinct leaf photos uploaded")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="seed for the sessions' choices")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds one page run may take")
+    parser.add_argument("--save", help="write the report as a JSON file")
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if not 1 <= args.processes <= args.concurrency:
+        parser.error("--processes must be from 1 to --concurrency")
+    if args.images < 1:
+        parser.error("--images must be at least 1")
+    pages = [page.strip() for page in args.pages.split(",") if page.strip()] if args.pages else None
+
+    _quiet_streamlit()
+    try:
+        report = run_load_test(
+            args.sessions, args.concurrency, args.think, args.duration, args.ramp_up,
+            args.backend_latency, pages, args.images, args.seed, args.timeout, args.processes
+        )
+    except ValueError as error:
+        parser.error(str(error))
+
+    print_report(report)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"Wrote {args.save}")
+    if report["failed_sessions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,23 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import numpy as np
 import json
+import uuid
+
+from modules.cache import cached, get_cache
+from modules.charts import MAX_POINTS, apply_layout, cached_figure, downsample
+from modules.instrumentation import timed
+from modules.refresh_scheduler import get_published
+
+# The sample prices are generated once per process and day and shared by
+# every instance, with one version, so that results cached for them are
+# reused across page reruns
+_sample_prices = get_cache("market.sample_prices", maxsize=1)
 
 class MarketPrices:
+    @timed()
     def __init__(self):
         self.kerala_markets = [
             "Thiruvananthapuram",
@@ -31,8 +43,22 @@ class MarketPrices:
             "Tea", "Coffee", "Cocoa", "Arecanut", "Tamarind"
         ]
         
-        self.price_data = self._generate_sample_price_data()
+        self._price_data, self.data_version = _sample_prices.get_or_compute(
+            date.today().isoformat(),
+            lambda: (self._generate_sample_price_data(), uuid.uuid4().hex)
+        )
+    
+    @property
+    def price_data(self):
+        return self._price_data
+    
+    @price_data.setter
+    def price_data(self, rows):
+        # Results cached from the previous rows are keyed by the old version
+        self._price_data = rows
+        self.data_version = uuid.uuid4().hex
     
+    @timed()
     def _generate_sample_price_data(self):
         """
         Generate sample price data for demonstration
@@ -104,6 +130,8 @@ class MarketPrices:
         
         return latest_df
     
+    @timed()
+    @cached("market.price_trends", key=lambda self, crop, market=None, days=30: (self.data_version, crop, market, days))
     def get_price_trends(self, crop, market=None, days=30):
         """
         Get price trends for a specific crop
@@ -125,6 +153,7 @@ class MarketPrices:
         
         return trend_df
     
+    @timed()
     def predict_prices(self, crop, days_ahead=7):
         """
         Simple price prediction using trend analysis
@@ -162,6 +191,7 @@ class MarketPrices:
         
         return predictions
     
+    @timed()
     def get_market_insights(self):
         """
         Get market insights and recommendations
@@ -189,6 +219,32 @@ class MarketPrices:
         
         return insights
     
+    def _build_price_trend_chart(self, trend_df, crop):
+        """
+        Build a price trend figure, downsampling long histories
+        """
+        fig = px.line(
+            downsample(trend_df, "date", "price_per_kg"),
+            x="date",
+            y="price_per_kg",
+            title=f"{crop} Price Trend",
+            markers=len(trend_df) <= MAX_POINTS
+        )
+        return apply_layout(fig, height=400, xaxis_title="Date", yaxis_title="Price (₹/kg)")
+    
+    def _build_prediction_chart(self, predictions, crop):
+        """
+        Build the price prediction figure
+        """
+        fig = px.line(
+            pd.DataFrame(predictions),
+            x="date",
+            y="predicted_price",
+            title=f"{crop} Price Prediction (Next 7 Days)",
+            markers=True
+        )
+        return apply_layout(fig, height=300, xaxis_title="Date", yaxis_title="Predicted Price (₹/kg)")
+    
     def render_market_dashboard(self):
         """
         Render the market prices dashboard
@@ -244,24 +300,13 @@ class MarketPrices:
             trend_df = self.get_price_trends(selected_crop, market_filter if selected_market != "All Markets" else None)
             
             if not trend_df.empty:
-                fig = px.line(
-                    trend_df,
-                    x="date",
-                    y="price_per_kg",
-                    title=f"{selected_crop} Price Trend",
-                    markers=True
-                )
-                
-                fig.update_layout(
-                    height=400,
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font_color='white',
-                    title_font_color='white',
-                    xaxis_title="Date",
-                    yaxis_title="Price (₹/kg)"
+                fig = cached_figure(
+                    "market.price_trend",
+                    self.data_version,
+                    lambda: self._build_price_trend_chart(trend_df, selected_crop),
+                    crop=selected_crop,
+                    market=market_filter
                 )
-                
                 st.plotly_chart(fig, use_container_width=True)
                 
                 # Price prediction
@@ -270,26 +315,9 @@ class MarketPrices:
                 predictions = self.predict_prices(selected_crop, 7)
                 
                 if predictions:
-                    pred_df = pd.DataFrame(predictions)
-                    
-                    fig = px.line(
-                        pred_df,
-                        x="date",
-                        y="predicted_price",
-                        title=f"{selected_crop} Price Prediction (Next 7 Days)",
-                        markers=True
-                    )
-                    
-                    fig.update_layout(
-                        height=300,
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font_color='white',
-                        title_font_color='white',
-                        xaxis_title="Date",
-                        yaxis_title="Predicted Price (₹/kg)"
-                    )
-                    
+                    # Predictions carry fresh noise on every call, so their
+                    # figure is not cached
+                    fig = self._build_prediction_chart(predictions, selected_crop)
                     st.plotly_chart(fig, use_container_width=True)
                     
                     # Show prediction details
@@ -309,7 +337,8 @@ class MarketPrices:
         # Market insights
         st.markdown("### 💡 Market Insights")
         
-        insights = self.get_market_insights()
+        # Computed by the background refresh; before its first run, here
+        insights = get_published(("market", "insights")) or self.get_market_insights()
         
         col1, col2, col3 = st.columns(3)
         
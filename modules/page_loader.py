@@ -0,0 +1,177 @@
+"""
+Lazy loading of page modules, and a cold-start import report
+
+Page modules and their heavy dependencies (pandas, plotly, PIL,
+requests) are imported on first navigation to the page rather than when
+a worker starts.
+
+Usage:
+    python -m modules.page_loader                    # per-import cost of startup and each page
+    python -m modules.page_loader --check --budget-ms 1500
+
+--check runs the module-level code of app.py in fresh interpreters,
+measures its imports and exits with status 1 when the median exceeds the
+budget or a page module is imported at startup.
+"""
+import argparse
+import importlib
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from modules.cache import get_cache
+from modules.instrumentation import timer
+
+# Page key -> (module, class, render method)
+PAGE_MODULES = {
+    "disease": ("modules.disease_detection", "DiseaseDetection", "render_disease_detection_ui"),
+    "crops": ("modules.crop_recommendation", "CropRecommendation", "render_crop_recommendation_ui"),
+    "weather": ("modules.weather_analytics", "WeatherAnalytics", "render_weather_dashboard"),
+    "farm": ("modules.farm_management", "FarmManagement", "render_farm_dashboard"),
+    "market": ("modules.market_prices", "MarketPrices", "render_market_dashboard"),
+    "soil": ("modules.soil_health", "SoilHealthAssessment", "render_soil_health_ui"),
+    "schemes": ("modules.government_schemes", "GovernmentSchemes", "render_schemes_dashboard"),
+    "community": ("modules.community_platform", "CommunityPlatform", "render_community_dashboard"),
+    "chatbot": ("modules.ai_chatbot", "AIChatbot", "render_chatbot_ui")
+}
+
+# What a worker runs before any page is drawn: app.py without the main()
+# call at its bottom, which only runs as __main__
+APP_STARTUP = "import runpy; runpy.run_path('app.py')"
+
+# Default cold-start budget for --check
+DEFAULT_BUDGET_MS = 1500
+
+def load_page_class(page):
+    """
+    Get the class behind a page, importing its module on first use
+
+    The first import of each module is timed as "import <module>".
+    """
+    module_name, class_name, _ = PAGE_MODULES[page]
+    # Sessions run in parallel threads. import_module always goes through
+    # the module's import lock, so a thread never sees a module another
+    # thread is still executing; once it is loaded the call is a lookup.
+    if module_name in sys.modules:
+        module = importlib.import_module(module_name)
+    else:
+        with timer(f"import {module_name}"):
+            module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+_engines = get_cache("page_loader.engines", maxsize=None)
+
+
+def get_engine(page):
+    """
+    Get a shared instance of a page's class, built once per process
+
+    For computation outside the page itself (the dashboard widgets, the
+    API); a page render still builds its own instance.
+    """
+    return _engines.get_or_compute(page, lambda: load_page_class(page)())
+
+
+def render_page(page):
+    """
+    Construct a page's class and render it
+    """
+    _, _, render_method = PAGE_MODULES[page]
+    getattr(load_page_class(page)(), render_method)()
+
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_imports(modules=(), startup=True):
+    """
+    Run the app's startup, then import modules, in a fresh interpreter with
+    -X importtime
+
+    Returns (total microseconds, {module: (self us, cumulative us)}).
+    """
+    statements = ([APP_STARTUP] if startup else []) + [f"import {module}" for module in modules]
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "; ".join(statements)],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    imports, total = {}, 0
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports[module] = (int(self_us), int(cumulative_us))
+            if len(indent) == 1:
+                total += int(cumulative_us)
+    return total, imports
+
+
+def startup_report(top=10, report=print):
+    """
+    Print the cold-start import cost, then the extra cost of opening each page
+    """
+    total, startup = measure_imports()
+    report(f"Startup imports: {total / 1000:.0f} ms")
+    for module, cumulative in _top_level(startup, top):
+        report(f"  {cumulative / 1000:>8.1f} ms  {module}")
+
+    for page, (module_name, _, _) in PAGE_MODULES.items():
+        page_total, imports = measure_imports([module_name])
+        extra = {module: cost for module, cost in imports.items() if module not in startup}
+        report(f"\nPage {page} ({module_name}): {(page_total - total) / 1000:+.0f} ms on first open")
+        for module, cumulative in _top_level(extra, top):
+            report(f"  {cumulative / 1000:>8.1f} ms  {module}")
+
+
+def _top_level(imports, top):
+    """
+    Get the most expensive packages, counting each package once
+    """
+    packages = {}
+    for module, (_, cumulative) in imports.items():
+        package = module.split(".")[0] if not module.startswith("modules.") else module
+        packages[package] = max(packages.get(package, 0), cumulative)
+    return sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+
+def check_cold_start(budget_ms=DEFAULT_BUDGET_MS, runs=5, report=print):
+    """
+    Check the startup imports against a time budget and for eager page
+    imports; returns True when both pass
+    """
+    totals = []
+    for _ in range(runs):
+        total, imports = measure_imports()
+        totals.append(total / 1000)
+    median = statistics.median(totals)
+
+    eager = sorted(module for module, _, _ in PAGE_MODULES.values() if module in imports)
+    passed = median <= budget_ms and not eager
+    report(f"Cold start: median {median:.0f} ms over {runs} runs (budget {budget_ms} ms)")
+    if eager:
+        report(f"Page modules imported at startup: {', '.join(eager)}")
+    report("PASS" if passed else "FAIL")
+    return passed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report or check the app's cold-start import cost")
+    parser.add_argument("--check", action="store_true", help="fail when startup exceeds the budget")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="cold-start budget in ms")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time for --check")
+    parser.add_argument("--top", type=int, default=10, help="imports listed per section of the report")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        if not check_cold_start(args.budget_ms, args.runs):
+            sys.exit(1)
+    else:
+        startup_report(args.top)
+
+
+if __name__ == "__main__":
+    main()
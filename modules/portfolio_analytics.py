@@ -0,0 +1,241 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+
+from modules.cache import get_cache
+from modules.charts import apply_layout
+from modules.farm_store import get_farm_store
+
+# Columnar extracts of the whole ledger, joined once to their farm and crop
+EXPENSES_SQL = """
+SELECT e.farm_id, e.date, e.category, e.amount, f.location
+FROM expenses e JOIN farms f ON f.id = e.farm_id
+"""
+
+HARVESTS_SQL = """
+SELECT h.farm_id, h.harvest_date AS date, h.total_value, c.crop_name, f.location
+FROM harvests h
+JOIN farms f ON f.id = h.farm_id
+LEFT JOIN crops c ON c.id = h.crop_id
+"""
+
+CROPS_SQL = """
+SELECT c.farm_id, c.crop_name, c.yield_expected, c.yield_actual
+FROM crops c
+WHERE c.yield_actual IS NOT NULL AND c.yield_expected > 0
+"""
+
+FARM_TOTALS_SQL = """
+SELECT f.id AS farm_id, f.location, t.total_expenses, t.total_revenue
+FROM farms f JOIN farm_totals t ON t.farm_id = f.id
+"""
+
+PERCENTILES = [10, 25, 50, 75, 90]
+
+
+class PortfolioAnalytics:
+    """
+    Cooperative-wide rollups over every farm in the store
+    """
+
+    # Results are shared by every session in the process and keyed by the
+    # store's data version, so they are recomputed only after a write
+    _rollups = get_cache("portfolio.rollups", maxsize=8)
+
+    def __init__(self, store=None):
+        self.store = store or get_farm_store()
+
+    def _load_frames(self):
+        """
+        Read the ledger tables as DataFrames from one consistent snapshot
+        """
+        conn = self.store.connection()
+        conn.execute("BEGIN")
+        try:
+            version = self.store.get_data_version()
+            frames = {
+                "expenses": pd.read_sql_query(EXPENSES_SQL, conn),
+                "harvests": pd.read_sql_query(HARVESTS_SQL, conn),
+                "crops": pd.read_sql_query(CROPS_SQL, conn),
+                "farm_totals": pd.read_sql_query(FARM_TOTALS_SQL, conn)
+            }
+        finally:
+            conn.execute("COMMIT")
+        return version, frames
+
+    @staticmethod
+    def _district(location):
+        return location.str.split(",").str[0].str.strip()
+
+    def compute_rollups(self, frames):
+        """
+        Compute all portfolio rollups in one vectorized pass
+        """
+        expenses = frames["expenses"]
+        harvests = frames["harvests"]
+        crops = frames["crops"]
+        farm_totals = frames["farm_totals"]
+
+        expenses = expenses.assign(
+            month=expenses["date"].str[:7],
+            district=self._district(expenses["location"])
+        )
+        harvests = harvests.assign(
+            month=harvests["date"].str[:7],
+            district=self._district(harvests["location"]),
+            crop_name=harvests["crop_name"].fillna("Unknown")
+        )
+
+        revenue_by_crop = (
+            harvests.groupby("crop_name")["total_value"].sum()
+            .sort_values(ascending=False)
+            .rename("revenue")
+            .reset_index()
+        )
+
+        cost_by_category = (
+            expenses.groupby("category")["amount"].sum()
+            .sort_values(ascending=False)
+            .rename("cost")
+            .reset_index()
+        )
+
+        by_month = pd.concat([
+            expenses.groupby("month")["amount"].sum().rename("cost"),
+            harvests.groupby("month")["total_value"].sum().rename("revenue")
+        ], axis=1).fillna(0).sort_index()
+        by_month["net"] = by_month["revenue"] - by_month["cost"]
+        by_month = by_month.rename_axis("month").reset_index()
+
+        by_district = pd.concat([
+            expenses.groupby("district")["amount"].sum().rename("cost"),
+            harvests.groupby("district")["total_value"].sum().rename("revenue")
+        ], axis=1).fillna(0)
+        by_district["net"] = by_district["revenue"] - by_district["cost"]
+        by_district = by_district.sort_values("revenue", ascending=False).rename_axis("district").reset_index()
+
+        # Yield gap: positive means the crop beat its expected yield
+        gap_pct = (crops["yield_actual"] - crops["yield_expected"]) / crops["yield_expected"] * 100
+        crops = crops.assign(gap_pct=gap_pct)
+        yield_gap = {
+            "count": int(len(crops)),
+            "mean_pct": float(gap_pct.mean()) if len(crops) else 0.0,
+            "percentiles": dict(zip(
+                PERCENTILES,
+                np.percentile(gap_pct, PERCENTILES).tolist() if len(crops) else [0.0] * len(PERCENTILES)
+            )),
+            "by_crop": (
+                crops.groupby("crop_name")["gap_pct"].agg(["mean", "min", "max", "count"])
+                .reset_index()
+            ),
+            "values": gap_pct.to_numpy()
+        }
+
+        # Profitability per farm comes straight from the materialized totals
+        revenue = farm_totals["total_revenue"].astype(float).to_numpy()
+        cost = farm_totals["total_expenses"].astype(float).to_numpy()
+        profit = revenue - cost
+        with np.errstate(divide="ignore", invalid="ignore"):
+            margin = np.where(revenue > 0, profit / revenue * 100, 0.0)
+        profitability = {
+            "farms": int(len(farm_totals)),
+            "profitable_farms": int((profit > 0).sum()),
+            "profit_percentiles": dict(zip(
+                PERCENTILES,
+                np.percentile(profit, PERCENTILES).tolist() if len(profit) else [0.0] * len(PERCENTILES)
+            )),
+            "margin_percentiles": dict(zip(
+                PERCENTILES,
+                np.percentile(margin, PERCENTILES).tolist() if len(margin) else [0.0] * len(PERCENTILES)
+            ))
+        }
+
+        return {
+            "total_revenue": float(revenue.sum()),
+            "total_cost": float(cost.sum()),
+            "revenue_by_crop": revenue_by_crop,
+            "cost_by_category": cost_by_category,
+            "by_month": by_month,
+            "by_district": by_district,
+            "yield_gap": yield_gap,
+            "profitability": profitability
+        }
+
+    def get_rollups(self):
+        """
+        Get the portfolio rollups, recomputing only when the data has changed
+        """
+        key = (self.store.db_path, self.store.get_data_version())
+        return self._rollups.get_or_compute(key, lambda: self.compute_rollups(self._load_frames()[1]))
+
+    def render_portfolio_dashboard(self):
+        """
+        Render the cooperative portfolio overview
+        """
+        st.markdown("### 🌐 Cooperative Portfolio")
+
+        rollups = self.get_rollups()
+        profitability = rollups["profitability"]
+
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            st.metric("Farms", profitability["farms"], f"{profitability['profitable_farms']} profitable")
+
+        with col2:
+            st.metric("Total Revenue", f"₹{rollups['total_revenue']:,.0f}")
+
+        with col3:
+            st.metric("Total Costs", f"₹{rollups['total_cost']:,.0f}")
+
+        with col4:
+            st.metric("Median Margin", f"{profitability['margin_percentiles'][50]:.1f}%")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            if not rollups["revenue_by_crop"].empty:
+                fig = px.bar(rollups["revenue_by_crop"], x="crop_name", y="revenue", title="Revenue by Crop")
+                apply_layout(
+                    fig,
+                    height=350,
+                    xaxis_title="Crop",
+                    yaxis_title="Revenue (₹)"
+                )
+                st.plotly_chart(fig, use_container_width=True)
+
+        with col2:
+            if not rollups["cost_by_category"].empty:
+                fig = px.pie(rollups["cost_by_category"], names="category", values="cost", title="Costs by Category")
+                apply_layout(fig, height=350)
+                st.plotly_chart(fig, use_container_width=True)
+
+        if not rollups["by_month"].empty:
+            fig = px.bar(
+                rollups["by_month"],
+                x="month",
+                y=["revenue", "cost"],
+                barmode="group",
+                title="Monthly Revenue vs Costs",
+                color_discrete_map={"cost": "#FF6B6B", "revenue": "#4ECDC4"}
+            )
+            apply_layout(
+                fig,
+                height=350,
+                xaxis_title="Month",
+                yaxis_title="Amount (₹)"
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.markdown("**By District**")
+        st.dataframe(rollups["by_district"], use_container_width=True)
+
+        yield_gap = rollups["yield_gap"]
+        if yield_gap["count"]:
+            st.markdown("**Yield Gap (actual vs expected)**")
+            st.markdown(
+                f"Mean gap: {yield_gap['mean_pct']:.1f}% across {yield_gap['count']} harvested crops "
+                f"(median {yield_gap['percentiles'][50]:.1f}%)"
+            )
+            st.dataframe(yield_gap["by_crop"], use_container_width=True)
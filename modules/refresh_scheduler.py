@@ -0,0 +1,289 @@
+"""
+Background refresh of external and precomputed data
+
+District weather, market aggregates and the dashboard KPI snapshot are
+refreshed by worker threads on their own intervals and published into a
+shared in-process store. Page renders and API requests read the published
+values, so their latency does not depend on the upstream services.
+
+Every job runs single-flight (a run never overlaps another run of the same
+job), its intervals carry random jitter so jobs started together drift
+apart, and a failing job is retried with exponential backoff while readers
+keep the last published value.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from modules.cache import get_cache, get_shared_store
+from modules.instrumentation import timer
+from modules.kpi_engine import KPI_REFRESH_SECONDS
+
+# Refresh intervals in seconds; the KPI interval is KERALA_KPI_REFRESH_SECONDS
+WEATHER_REFRESH_SECONDS = float(os.getenv("KERALA_WEATHER_REFRESH_SECONDS", "600"))
+MARKET_REFRESH_SECONDS = float(os.getenv("KERALA_MARKET_REFRESH_SECONDS", "900"))
+
+# Share of an interval added or removed at random
+JITTER = 0.1
+
+# First retry after a failure, doubled on each further failure up to the cap
+RETRY_SECONDS = 15
+MAX_BACKOFF_SECONDS = 900
+
+# First runs after start are spread over this many seconds
+STARTUP_SPREAD_SECONDS = 5
+
+# Expired shared cache entries are deleted this often
+CACHE_PRUNE_SECONDS = 3600
+
+# A published value expires after this many of its job's intervals, so
+# that readers fall back to a live fetch instead of serving data left by
+# a previous run or by a job that keeps failing
+PUBLISHED_TTL_INTERVALS = 3
+
+# Published values reach the other worker processes through the shared tier,
+# so a process that has just started serves them before its first refresh
+_published = get_cache("published", maxsize=None, shared=True)
+
+
+def publish(key, value, ttl=None):
+    """
+    Make a refreshed value available to every session, for ttl seconds
+    when given
+    """
+    _published.set(key, (time.time(), value), ttl=ttl)
+
+
+def get_published(key, default=None):
+    """
+    Get the latest published value for a key
+    """
+    entry = _published.get(key)
+    return default if entry is None else entry[1]
+
+
+def published_at(key):
+    """
+    Get the time a key was last published, or None
+    """
+    entry = _published.get(key)
+    return None if entry is None else entry[0]
+
+
+def jittered(seconds, jitter=JITTER):
+    """
+    Spread a delay by up to +/- jitter of its length
+    """
+    return seconds * (1 + random.uniform(-jitter, jitter))
+
+
+class Job:
+    """
+    A function run every interval seconds, and its run history
+    """
+
+    def __init__(self, name, func, interval, jitter=JITTER):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.next_run = 0.0
+        self.runs = 0
+        self.failures = 0
+        self.last_success = None
+        self.last_error = None
+        self.running = None
+
+    def delay(self):
+        """
+        Get the wait before the next run: the interval after a success, an
+        exponential backoff after failures
+        """
+        if self.failures:
+            backoff = min(RETRY_SECONDS * 2 ** (self.failures - 1), MAX_BACKOFF_SECONDS)
+            return jittered(min(backoff, self.interval), self.jitter)
+        return jittered(self.interval, self.jitter)
+
+
+class RefreshScheduler:
+    """
+    Runs jobs on their intervals in a small thread pool
+    """
+
+    def __init__(self, max_workers=4):
+        self.jobs = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refresh")
+        self._wakeup = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def add_job(self, name, func, interval, jitter=JITTER):
+        """
+        Register a job; its first run is spread over the first seconds
+        after start
+        """
+        job = Job(name, func, interval, jitter)
+        job.next_run = time.monotonic() + random.uniform(0, STARTUP_SPREAD_SECONDS)
+        with self._wakeup:
+            self.jobs[name] = job
+            self._wakeup.notify()
+        return job
+
+    def start(self):
+        """
+        Start the scheduling thread; calling it again does nothing
+        """
+        with self._wakeup:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name="refresh-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def trigger(self, name):
+        """
+        Run a job now and get a future for the run
+
+        When the job is already running no second run is started; the
+        future of the running one is returned.
+        """
+        with self._wakeup:
+            return self._submit(self.jobs[name])
+
+    def _submit(self, job):
+        # Called with self._wakeup held
+        if job.running is None:
+            job.running = Future()
+            self._executor.submit(self._run, job, job.running)
+        return job.running
+
+    def _run(self, job, future):
+        try:
+            with timer(f"refresh.{job.name}"):
+                result = job.func()
+        except Exception as error:
+            job.failures += 1
+            job.last_error = f"{type(error).__name__}: {error}"
+            outcome = error
+        else:
+            job.failures = 0
+            job.last_success = time.time()
+            job.last_error = None
+            outcome = None
+
+        with self._wakeup:
+            job.runs += 1
+            job.running = None
+            job.next_run = time.monotonic() + job.delay()
+            self._wakeup.notify()
+        if outcome is None:
+            future.set_result(result)
+        else:
+            future.set_exception(outcome)
+
+    def _loop(self):
+        with self._wakeup:
+            while not self._stopped:
+                now = time.monotonic()
+                for job in self.jobs.values():
+                    if job.running is None and job.next_run <= now:
+                        self._submit(job)
+                waiting = [job.next_run for job in self.jobs.values() if job.running is None]
+                self._wakeup.wait(timeout=max(min(waiting, default=60) - now, 0.05))
+
+    def status(self):
+        """
+        Get one row per job with its last run, for the diagnostics page
+        """
+        now = time.monotonic()
+        with self._wakeup:
+            return [
+                {
+                    "job": job.name,
+                    "interval_s": job.interval,
+                    "runs": job.runs,
+                    "running": job.running is not None,
+                    "failures": job.failures,
+                    "last_success": time.strftime("%H:%M:%S", time.localtime(job.last_success))
+                    if job.last_success else None,
+                    "next_run_in_s": None if job.running else round(max(job.next_run - now, 0), 1),
+                    "last_error": job.last_error
+                }
+                for job in self.jobs.values()
+            ]
+
+
+def refresh_weather(district):
+    """
+    Fetch a district's current weather and forecast and publish both
+    """
+    from modules.page_loader import get_engine
+
+    publish(
+        ("weather", district),
+        get_engine("weather").fetch_weather(district),
+        ttl=WEATHER_REFRESH_SECONDS * PUBLISHED_TTL_INTERVALS
+    )
+
+
+def refresh_market():
+    """
+    Publish the market insights and the price trend of every crop
+    """
+    from modules.page_loader import get_engine
+
+    market = get_engine("market")
+    ttl = MARKET_REFRESH_SECONDS * PUBLISHED_TTL_INTERVALS
+    publish(("market", "trends"), {crop: market.get_price_trends(crop) for crop in market.crops}, ttl=ttl)
+    publish(("market", "insights"), market.get_market_insights(), ttl=ttl)
+
+
+def refresh_kpis():
+    from modules.kpi_engine import get_kpi_engine
+
+    get_kpi_engine().refresh()
+
+
+# Mirrors WeatherAnalytics.kerala_districts without importing the page module
+WEATHER_DISTRICTS = [
+    "Thiruvananthapuram", "Kollam", "Pathanamthitta", "Alappuzha", "Kottayam",
+    "Idukki", "Ernakulam", "Thrissur", "Palakkad", "Malappuram",
+    "Kozhikode", "Wayanad", "Kannur", "Kasaragod"
+]
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Get the process-wide scheduler with the default jobs, started on first
+    use
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                scheduler = RefreshScheduler()
+                for district in WEATHER_DISTRICTS:
+                    scheduler.add_job(
+                        f"weather.{district}",
+                        lambda district=district: refresh_weather(district),
+                        WEATHER_REFRESH_SECONDS
+                    )
+                scheduler.add_job("market", refresh_market, MARKET_REFRESH_SECONDS)
+                scheduler.add_job("kpi", refresh_kpis, KPI_REFRESH_SECONDS)
+                scheduler.add_job("cache.prune", lambda: get_shared_store().prune(), CACHE_PRUNE_SECONDS)
+                scheduler.start()
+                _scheduler = scheduler
+    return _scheduler
@@ -0,0 +1,201 @@
+"""
+Bulk scheme-eligibility screening for farmer registries
+
+Usage:
+    python -m modules.scheme_screening registry.csv -o eligibility.npz --workers 4
+
+The registry is a CSV with a farmer_id column and any of the profile fields
+used by the scheme rules (farmer_type, landholding, state, crop_type,
+annual_income, has_bank_account). Empty cells do not count against a scheme.
+The output is a farmer x scheme matrix in compressed sparse row form.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.eligibility_rules import CATEGORICAL_RULES, EligibilityIndex
+
+DEFAULT_CHUNK_SIZE = 20000
+
+
+class BatchScreener:
+    """
+    Vectorised eligibility screening over many profiles at once
+
+    The bitset masks of an EligibilityIndex are unpacked into boolean tables
+    with one row per profile value and one column per scheme, plus a final
+    all-true row for missing values. A chunk of profiles is encoded into row
+    numbers per field, and its farmer x scheme matrix is the AND of the
+    table rows gathered for each field.
+    """
+
+    def __init__(self, schemes):
+        index = EligibilityIndex(schemes)
+        self.scheme_ids = np.array([scheme["id"] for scheme in index.schemes])
+        self.all_true = np.ones(len(index.schemes), dtype=bool)
+
+        self.values = {}
+        self.tables = {}
+        for field in CATEGORICAL_RULES:
+            values = list(index.masks[field])
+            rows = [index.unpack_mask(index.masks[field][value]) for value in values]
+            rows.append(index.unpack_mask(index.default_masks[field]))
+            rows.append(self.all_true)
+            self.values[field] = pd.Index(values)
+            self.tables[field] = np.array(rows, dtype=bool).reshape(len(rows), len(index.schemes))
+
+        self.landholding_points = np.array(index.landholding_points, dtype=float)
+        self.landholding_table = np.array(
+            [index.unpack_mask(mask) for mask in index.landholding_masks] + [self.all_true],
+            dtype=bool
+        ).reshape(len(index.landholding_masks) + 1, len(index.schemes))
+
+    def _field_rows(self, field, column):
+        # Unknown values fall back to the schemes without a rule for the field
+        rows = self.values[field].get_indexer(column.astype(object))
+        default_row, missing_row = len(self.values[field]), len(self.values[field]) + 1
+        rows = np.where(rows < 0, default_row, rows)
+        return np.where(column.isna().to_numpy(), missing_row, rows)
+
+    def _landholding_rows(self, column):
+        values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=float)
+        points = self.landholding_points
+        if not len(points):
+            segments = np.zeros(len(values), dtype=np.int64)
+        else:
+            # Same segments as EligibilityIndex: 2i below point i, 2i + 1 on it
+            i = np.searchsorted(points, values, side="left")
+            on_point = (i < len(points)) & (points[np.minimum(i, len(points) - 1)] == values)
+            segments = 2 * i + on_point
+        return np.where(np.isnan(values), len(self.landholding_table) - 1, segments)
+
+    def screen(self, profiles):
+        """
+        Get the farmer x scheme eligibility matrix for a DataFrame of profiles
+        """
+        eligible = np.ones((len(profiles), len(self.scheme_ids)), dtype=bool)
+        if "landholding" in profiles:
+            eligible &= self.landholding_table[self._landholding_rows(profiles["landholding"])]
+        for field in CATEGORICAL_RULES:
+            if field in profiles:
+                eligible &= self.tables[field][self._field_rows(field, profiles[field])]
+        return eligible
+
+
+_worker_screener = None
+
+
+def _init_worker(schemes):
+    global _worker_screener
+    _worker_screener = BatchScreener(schemes)
+
+
+def _screen_chunk(profiles):
+    eligible = _worker_screener.screen(profiles)
+    farmers, schemes = np.nonzero(eligible)
+    counts = np.bincount(farmers, minlength=len(profiles))
+    return profiles["farmer_id"].to_numpy(), counts, schemes.astype(np.int32)
+
+
+def _read_registry(path, chunk_size):
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype={"farmer_id": str}):
+        if "farmer_id" not in chunk:
+            raise ValueError("Registry must have a farmer_id column")
+        yield chunk
+
+
+def screen_registry(path, schemes, chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+    """
+    Screen a registry CSV against every scheme
+
+    The registry is streamed in chunks that are screened in parallel worker
+    processes, so memory stays bounded by the chunk size times the number
+    of workers. Returns the farmer ids, the scheme ids and the eligibility
+    matrix as CSR arrays (indptr, indices).
+    """
+    workers = workers or os.cpu_count() or 1
+    farmer_ids, counts, indices = [], [], []
+
+    chunks = _read_registry(path, chunk_size)
+    if workers == 1:
+        _init_worker(schemes)
+        results = map(_screen_chunk, chunks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(schemes,))
+        results = pool.imap(_screen_chunk, chunks)
+
+    try:
+        for chunk_farmers, chunk_counts, chunk_indices in results:
+            farmer_ids.append(chunk_farmers)
+            counts.append(chunk_counts)
+            indices.append(chunk_indices)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    counts = np.concatenate(counts) if counts else np.zeros(0, dtype=np.int64)
+    indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return {
+        "farmer_ids": np.concatenate(farmer_ids) if farmer_ids else np.zeros(0, dtype=object),
+        "scheme_ids": np.array([scheme["id"] for scheme in schemes]),
+        "indptr": indptr,
+        "indices": np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32)
+    }
+
+
+def save_matrix(matrix, path):
+    """
+    Write a screening result as a compressed .npz file
+
+    Row r of the matrix lists the scheme columns
+    indices[indptr[r]:indptr[r + 1]] the farmer farmer_ids[r] is eligible for.
+    """
+    np.savez_compressed(
+        path,
+        farmer_ids=matrix["farmer_ids"].astype(str),
+        scheme_ids=matrix["scheme_ids"],
+        indptr=matrix["indptr"],
+        indices=matrix["indices"]
+    )
+
+
+def load_matrix(path):
+    """
+    Read a screening result written by save_matrix
+    """
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen a farmer registry against every government scheme")
+    parser.add_argument("registry", help="CSV file with farmer_id and profile columns")
+    parser.add_argument("-o", "--output", default="eligibility.npz", help="output .npz file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="profiles per chunk")
+    args = parser.parse_args(argv)
+
+    from modules.government_schemes import GovernmentSchemes
+    schemes = GovernmentSchemes().schemes
+
+    started = time.perf_counter()
+    matrix = screen_registry(args.registry, schemes, args.chunk_size, args.workers)
+    save_matrix(matrix, args.output)
+    elapsed = time.perf_counter() - started
+
+    per_scheme = np.bincount(matrix["indices"], minlength=len(schemes))
+    print(f"Screened {len(matrix['farmer_ids'])} farmers against {len(schemes)} schemes in {elapsed:.1f}s")
+    for scheme, count in zip(schemes, per_scheme):
+        print(f"  {count:>8}  {scheme['name']}")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,12 @@ import plotly.graph_objects as go
 import numpy as np
 from datetime import datetime
 
+from modules.cache import cached
+from modules.charts import apply_layout
+from modules.instrumentation import timed
+
 class SoilHealthAssessment:
+    @timed()
     def __init__(self):
         self.nutrient_ranges = {
             "pH": {"optimal": (6.0, 7.5), "acceptable": (5.5, 8.0)},
@@ -56,6 +61,8 @@ class SoilHealthAssessment:
             }
         }
     
+    @timed()
+    @cached("soil.assessment", key=lambda self, soil_data: soil_data)
     def assess_soil_health(self, soil_data):
         """
         Assess soil health based on test results
@@ -379,6 +386,7 @@ class SoilHealthAssessment:
                 else:
                     st.error(f"{score:.1f}%")
     
+    @timed()
     def _render_nutrient_chart(self, nutrient_df):
         """
         Render nutrient analysis chart
@@ -392,12 +400,9 @@ class SoilHealthAssessment:
             title="Nutrient Health Scores"
         )
         
-        fig.update_layout(
+        apply_layout(
+            fig,
             height=400,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white',
-            title_font_color='white',
             xaxis_title="Nutrient",
             yaxis_title="Health Score (%)"
         )
@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_DB_PATH = os.getenv("KERALA_FARMERS_DB", os.path.join("data", "kerala_farmers.db"))
+
+
+class SQLiteStore:
+    """
+    Base class for the local SQLite stores.
+
+    Every Streamlit session runs in its own thread and several worker processes
+    may share the same file, so each thread gets its own connection. The
+    database runs in WAL mode: readers never wait for a writer and a writer
+    only holds the lock for the length of one short transaction.
+    """
+
+    schema = ""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self._local = threading.local()
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        if self.schema:
+            # Create tables in one locked script so racing workers do not interleave
+            try:
+                conn.executescript("BEGIN IMMEDIATE;\n" + self.schema + "\nCOMMIT;")
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def connection(self):
+        """
+        Get the connection owned by the calling thread
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly in transaction()
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=30,
+                isolation_level=None,
+                cached_statements=256
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run a block of writes as one transaction
+
+        BEGIN IMMEDIATE takes the write lock up front, so concurrent writers
+        queue on busy_timeout instead of failing halfway through.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            # Nested use joins the outer transaction
+            yield conn
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def query(self, sql, params=()):
+        """
+        Run a read query and return the rows as dictionaries
+        """
+        return [dict(row) for row in self.connection().execute(sql, params)]
+
+    def query_one(self, sql, params=()):
+        """
+        Run a read query and return the first row as a dictionary
+        """
+        row = self.connection().execute(sql, params).fetchone()
+        return dict(row) if row else None
+
+    def close(self):
+        """
+        Close the calling thread's connection
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(store_class, db_path=None):
+    """
+    Get the process-wide instance of a store class for a database file
+    """
+    key = (store_class, db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = store_class(db_path)
+            _stores[key] = store
+        return store
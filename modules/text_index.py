@@ -0,0 +1,183 @@
+import bisect
+import functools
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+# Letters and digits plus the combining signs of the Devanagari, Tamil and
+# Malayalam blocks, which \w alone would split words on. The danda marks
+# (U+0964, U+0965) are punctuation and stay word separators.
+TOKEN_PATTERN = re.compile(
+    r"(?:[^\W_]|[\u0900-\u0963\u0966-\u097F\u0B80-\u0BFF\u0D00-\u0D7F])+"
+)
+
+# Zero-width joiners are an encoding detail of Malayalam chillu letters
+# and Devanagari half forms, not part of the word
+ZERO_WIDTH = dict.fromkeys([0x200C, 0x200D], None)
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "my", "of", "on", "or", "should", "the",
+    "this", "to", "what", "when", "which", "with", "you", "your", "we", "me",
+    "और", "का", "की", "के", "को", "में", "है", "हैं", "से", "पर", "क्या"
+}
+
+# Longest suffix first so the most specific ending is removed
+SUFFIXES = {
+    "latin": ["ations", "ation", "ments", "ment", "ness", "ings", "ing", "ers", "er", "ed", "ly"],
+    "malayalam": ["ത്തിന്റെ", "ത്തിൽ", "ങ്ങളുടെ", "ങ്ങൾ", "ിന്റെ", "ന്റെ", "ുടെ", "ിലെ", "ിൽ", "ിന്", "ുകൾ", "കൾ", "ിനെ", "യെ", "ം"],
+    "tamil": ["களுக்கு", "களில்", "களின்", "கள்", "த்தில்", "த்தின்", "ுக்கு", "ில்", "ின்", "ிற்கு", "ை"],
+    "devanagari": ["ियों", "ियां", "ियाँ", "ाएं", "ाओं", "ों", "ें", "ां", "ाँ", "ी", "ा", "े"]
+}
+
+
+def _script(token):
+    first = token[0]
+    if "\u0D00" <= first <= "\u0D7F":
+        return "malayalam"
+    if "\u0B80" <= first <= "\u0BFF":
+        return "tamil"
+    if "\u0900" <= first <= "\u097F":
+        return "devanagari"
+    return "latin"
+
+
+@functools.lru_cache(maxsize=200000)
+def stem(token):
+    """
+    Light suffix-stripping stemmer for English, Malayalam, Tamil and Hindi
+
+    At most a plural ending and one suffix are removed, and a short stem is
+    always kept, which is enough to fold plurals and common case endings
+    together.
+    """
+    script = _script(token)
+    if script == "latin":
+        # Plurals first, as in Porter's step 1a
+        if token.endswith("sses"):
+            token = token[:-2]
+        elif token.endswith("ies") and len(token) > 4:
+            token = token[:-3] + "y"
+        elif token.endswith("s") and not token.endswith(("ss", "us", "is")) and len(token) > 3:
+            token = token[:-1]
+
+    for suffix in SUFFIXES[script]:
+        if token.endswith(suffix) and len(token) - len(suffix) >= (3 if script == "latin" else 2):
+            return token[:-len(suffix)]
+    return token
+
+
+def normalize(text):
+    """
+    Normalize text to NFC, drop zero-width joiners and casefold it
+    """
+    return unicodedata.normalize("NFC", text).translate(ZERO_WIDTH).casefold()
+
+
+def tokenize(text, keep_stopwords=False):
+    """
+    Split text into normalized, stemmed tokens
+    """
+    tokens = TOKEN_PATTERN.findall(normalize(text or ""))
+    return [stem(token) for token in tokens if keep_stopwords or token not in STOPWORDS]
+
+
+class InvertedIndex:
+    """
+    Incrementally updatable inverted index with BM25 ranking
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)
+        self.doc_terms = {}
+        self.doc_lengths = {}
+        self.total_length = 0
+        self.vocabulary = []
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_terms
+
+    def add(self, doc_id, tokens):
+        """
+        Add tokens to a document, creating the document if needed
+
+        Extending an existing document only touches the postings of the new
+        tokens, so appending an answer to a question is cheap.
+        """
+        counts = Counter(tokens)
+        terms = self.doc_terms.setdefault(doc_id, Counter())
+        for term, count in counts.items():
+            if term not in self.postings:
+                bisect.insort(self.vocabulary, term)
+            terms[term] += count
+            self.postings[term][doc_id] = terms[term]
+        added = sum(counts.values())
+        self.doc_lengths[doc_id] = self.doc_lengths.get(doc_id, 0) + added
+        self.total_length += added
+
+    def remove(self, doc_id):
+        """
+        Remove a document from the index
+        """
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            docs = self.postings[term]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[term]
+                index = bisect.bisect_left(self.vocabulary, term)
+                if index < len(self.vocabulary) and self.vocabulary[index] == term:
+                    del self.vocabulary[index]
+        self.total_length -= self.doc_lengths.pop(doc_id, 0)
+
+    def expand_prefix(self, prefix, limit=20):
+        """
+        Get up to limit indexed terms starting with prefix
+        """
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        matches = []
+        for term in self.vocabulary[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def score(self, query_terms, candidates=None):
+        """
+        Get BM25 scores for every document matching any query term
+        """
+        doc_count = len(self.doc_terms)
+        if not doc_count:
+            return {}
+
+        avg_length = self.total_length / doc_count
+        scores = defaultdict(float)
+
+        for term, weight in Counter(query_terms).items():
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                if candidates is not None and doc_id not in candidates:
+                    continue
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += weight * idf * tf * (self.k1 + 1) / norm
+
+        return scores
+
+    def search(self, query_terms, limit=10, candidates=None):
+        """
+        Get the top documents for the query terms as (doc_id, score) pairs
+        """
+        scores = self.score(query_terms, candidates)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
@@ -7,7 +7,12 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import os
 
+from modules.charts import apply_layout, cached_figure, fingerprint
+from modules.instrumentation import timed
+from modules.refresh_scheduler import get_published
+
 class WeatherAnalytics:
+    @timed()
     def __init__(self):
         self.api_key = os.getenv('OPENWEATHER_API_KEY')
         self.base_url = "http://api.openweathermap.org/data/2.5"
@@ -30,10 +35,40 @@ class WeatherAnalytics:
             "Kasaragod": {"lat": 12.4991, "lon": 74.9891}
         }
     
+    def fetch_weather(self, district, days=7):
+        """
+        Fetch a district's current weather and forecast for the background
+        refresh, raising on upstream errors instead of falling back
+        """
+        if not (self.api_key and district in self.kerala_districts):
+            return {"current": self._get_mock_current_weather(), "forecast": self._get_mock_forecast(days)}
+        
+        coords = self.kerala_districts[district]
+        params = {
+            "lat": coords["lat"],
+            "lon": coords["lon"],
+            "appid": self.api_key,
+            "units": "metric"
+        }
+        weather = {}
+        for key, endpoint in [("current", "weather"), ("forecast", "forecast")]:
+            response = requests.get(f"{self.base_url}/{endpoint}", params=params, timeout=10)
+            response.raise_for_status()
+            weather[key] = response.json()
+        return weather
+    
+    @timed()
     def get_current_weather(self, district):
         """
         Get current weather for a specific district
+        
+        Reads the data published by the background refresh when there is
+        any, so the upstream API is only called before the first refresh.
         """
+        published = get_published(("weather", district))
+        if published:
+            return published["current"]
+        
         try:
             if self.api_key and district in self.kerala_districts:
                 coords = self.kerala_districts[district]
@@ -56,10 +91,15 @@ class WeatherAnalytics:
             st.error(f"Error fetching weather data: {str(e)}")
             return self._get_mock_current_weather()
     
+    @timed()
     def get_weather_forecast(self, district, days=7):
         """
         Get weather forecast for a specific district
         """
+        published = get_published(("weather", district))
+        if published and days == 7:
+            return published["forecast"]
+        
         try:
             if self.api_key and district in self.kerala_districts:
                 coords = self.kerala_districts[district]
@@ -283,6 +323,7 @@ class WeatherAnalytics:
         # Weather alerts
         self._render_weather_alerts(current_weather)
     
+    @timed()
     def _process_forecast_data(self, forecast_data):
         """
         Process forecast data to get daily summaries
@@ -318,10 +359,22 @@ class WeatherAnalytics:
         
         return daily_forecast[:7]  # Return first 7 days
     
+    @timed()
     def _render_weather_chart(self, daily_forecast):
         """
         Render weather chart
         """
+        fig = cached_figure(
+            "weather.temperature",
+            fingerprint(daily_forecast),
+            lambda: self._build_weather_chart(daily_forecast)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    def _build_weather_chart(self, daily_forecast):
+        """
+        Build the temperature forecast figure
+        """
         df = pd.DataFrame(daily_forecast)
         
         fig = go.Figure()
@@ -346,15 +399,12 @@ class WeatherAnalytics:
             fill='tonexty'
         ))
         
-        fig.update_layout(
+        return apply_layout(
+            fig,
             title="Temperature Forecast",
             xaxis_title="Day",
             yaxis_title="Temperature (°C)",
             height=400,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white',
-            title_font_color='white',
             legend=dict(
                 orientation="h",
                 yanchor="bottom",
@@ -363,8 +413,6 @@ class WeatherAnalytics:
                 x=1
             )
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
     
     def _render_weather_alerts(self, weather_data):
         """